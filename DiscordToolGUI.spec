@@ -17,7 +17,7 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=['tqdm'],  # no longer used; keeps it out of the onefile archive
     noarchive=False,
     optimize=0,
 )
@@ -1,17 +1,288 @@
-import requests
+import re
+import threading
 import time
-import random
+from collections import deque
+from metrics import RequestMetrics, route_label
+from retry import RetryPolicy, CircuitBreaker
 from utils import logger, print_warning, print_error
 
+# Values accepted by the search 'has' filter
+SEARCH_HAS_FILTERS = ('file', 'image', 'link', 'embed', 'video', 'sound', 'sticker')
+
+# Messages per channel history page (the API maximum)
+HISTORY_PAGE_SIZE = 100
+
+# Messages per bulk delete request (the API accepts 2 to 100)
+BULK_DELETE_MAX = 100
+
+# Wait after a 429 that says nothing about how long to wait
+DEFAULT_RETRY_AFTER = 1.0
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+
+class _Bucket:
+    """
+    Known state of one Discord rate limit bucket.
+    """
+    __slots__ = ('limit', 'remaining', 'reset_at', 'window')
+
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.window = None
+
+
+class RateLimitScheduler:
+    """
+    Paces requests using Discord's X-RateLimit-* response headers.
+
+    Every route is mapped to the bucket Discord reports for it, and a request
+    is only released once its bucket (and the global limit) has room, so the
+    client sends as fast as allowed without running into 429s.
+    """
+    # Path segments that make a route its own bucket, per Discord's docs
+    MAJOR_PARAMS = ('channels', 'guilds', 'webhooks')
+    GLOBAL_LIMIT = 50  # requests per second
+    DISCOVERY_POLL = 0.05
+
+    def __init__(self, global_limit=GLOBAL_LIMIT, clock=time.monotonic):
+        self.global_limit = global_limit
+        self._clock = clock  # planner.py runs a scheduler on a simulated clock
+        self._lock = threading.Lock()
+        self._route_buckets = {}   # route key -> bucket key
+        self._buckets = {}         # bucket key -> _Bucket
+        self._discovering = set()  # routes with a first request in flight
+        self._global_sent = deque()
+        self._global_reset_at = 0.0
+        self.total_wait = 0.0
+
+    @classmethod
+    def route_key(cls, method, endpoint):
+        """
+        Reduces an endpoint to its rate limit route, keeping only the major ID.
+        e.g. DELETE /channels/1/messages/2 -> DELETE /channels/1/messages/{id}
+        """
+        parts = endpoint.split('?')[0].strip('/').split('/')
+        route = []
+        for i, part in enumerate(parts):
+            if part.isdigit() and not (i == 1 and parts[0] in cls.MAJOR_PARAMS):
+                route.append('{id}')
+            else:
+                route.append(part)
+        return f"{method} /{'/'.join(route)}"
+
+    @staticmethod
+    def _major_id(endpoint):
+        match = re.match(r'/(?:channels|guilds|webhooks)/(\d+)', endpoint)
+        return match.group(1) if match else ''
+
+    def reserve(self, method, endpoint):
+        """
+        Tries to take a slot for the request without blocking.
+        Returns 0 if the request may be sent now, otherwise seconds to wait.
+        """
+        route = self.route_key(method, endpoint)
+        now = self._clock()
+        with self._lock:
+            # Global limit
+            if now < self._global_reset_at:
+                return self._global_reset_at - now
+            while self._global_sent and now - self._global_sent[0] >= 1.0:
+                self._global_sent.popleft()
+            if len(self._global_sent) >= self.global_limit:
+                return 1.0 - (now - self._global_sent[0])
+
+            bucket_key = self._route_buckets.get(route)
+            if bucket_key is None:
+                # First request on this route: let one through to learn its bucket
+                if route in self._discovering:
+                    return self.DISCOVERY_POLL
+                self._discovering.add(route)
+            else:
+                bucket = self._buckets[bucket_key]
+                if bucket.remaining is not None:
+                    if now >= bucket.reset_at and bucket.window:
+                        # Window has passed, assume a fresh allowance until headers say otherwise
+                        bucket.remaining = bucket.limit
+                        bucket.reset_at = now + bucket.window
+                    if bucket.remaining <= 0:
+                        if now < bucket.reset_at:
+                            return bucket.reset_at - now
+                        # Unknown window length: wait for the reset Discord told us about
+                        bucket.remaining = 1
+                    bucket.remaining -= 1
+
+            self._global_sent.append(now)
+            return 0
+
+    def acquire(self, method, endpoint):
+        """
+        Blocks until the request may be sent.
+        """
+        while True:
+            delay = self.reserve(method, endpoint)
+            if delay <= 0:
+                return
+            self.add_wait(delay)
+            time.sleep(delay)
+
+    def add_wait(self, seconds):
+        """
+        Adds to total_wait; acquire loops run in several threads at once.
+        """
+        with self._lock:
+            self.total_wait += seconds
+
+    def release(self, method, endpoint):
+        """
+        Ends a route's discovery when its first request got no answer at
+        all (it was interrupted), so the next request may discover the bucket.
+        """
+        with self._lock:
+            self._discovering.discard(self.route_key(method, endpoint))
+
+    def update(self, method, endpoint, headers):
+        """
+        Records the bucket state reported in a response's headers.
+        """
+        route = self.route_key(method, endpoint)
+        bucket_hash = headers.get('X-RateLimit-Bucket')
+        with self._lock:
+            self._discovering.discard(route)
+            if not bucket_hash:
+                return
+            bucket_key = f"{bucket_hash}:{self._major_id(endpoint)}"
+            self._route_buckets[route] = bucket_key
+            bucket = self._buckets.setdefault(bucket_key, _Bucket())
+            try:
+                limit = int(headers['X-RateLimit-Limit'])
+                remaining = int(headers['X-RateLimit-Remaining'])
+                reset_after = float(headers['X-RateLimit-Reset-After'])
+            except (KeyError, ValueError):
+                return
+
+            reset_at = self._clock() + reset_after
+            same_window = bucket.remaining is not None and abs(reset_at - bucket.reset_at) < 1.0
+            # Requests still in flight already took their slot, so never raise remaining within a window
+            bucket.remaining = min(bucket.remaining, remaining) if same_window else remaining
+            bucket.limit = limit
+            bucket.reset_at = reset_at
+            bucket.window = max(bucket.window or 0, reset_after)
+
+    def penalize(self, method, endpoint, retry_after, is_global=False):
+        """
+        Blocks a route (or everything) for retry_after seconds after a 429.
+        """
+        route = self.route_key(method, endpoint)
+        until = self._clock() + retry_after
+        with self._lock:
+            self._discovering.discard(route)
+            if is_global:
+                self._global_reset_at = max(self._global_reset_at, until)
+                return
+            bucket_key = self._route_buckets.get(route)
+            if bucket_key is None:
+                bucket_key = f"route:{route}"
+                self._route_buckets[route] = bucket_key
+            bucket = self._buckets.setdefault(bucket_key, _Bucket())
+            bucket.remaining = 0
+            bucket.reset_at = max(bucket.reset_at, until)
+
+    def observed_limits(self):
+        """
+        Returns {route label: (limit, window seconds)} for every route whose
+        bucket has reported its limit, e.g. {'DELETE /channels/{id}/messages/{id}': (5, 5.0)}.
+        """
+        limits = {}
+        with self._lock:
+            for route, bucket_key in self._route_buckets.items():
+                bucket = self._buckets.get(bucket_key)
+                if bucket and bucket.limit and bucket.window:
+                    method, endpoint = route.split(' ', 1)
+                    limits[route_label(method, endpoint)] = (bucket.limit, bucket.window)
+        return limits
+
+
 class DiscordClient:
-    def __init__(self, token):
+    def __init__(self, token, pool_size=10, timeout=30, base_url="https://discord.com/api/v9", retry_policy=None,
+                 breaker=None, recorder=None):
         self.token = token
         self.headers = {
             "Authorization": token,
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+            "User-Agent": USER_AGENT
         }
-        self.base_url = "https://discord.com/api/v9"
+        self.base_url = base_url.rstrip('/')
         self.user_id = None
+        self.timeout = timeout
+        self.scheduler = RateLimitScheduler()
+        # Per-route counts, statuses, latencies, retries and bytes (see metrics.py)
+        self.metrics = RequestMetrics(self.scheduler)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        # Opt-in: a cassette.CassetteRecorder receiving every request and response
+        self.recorder = recorder
+        # Context ID -> scan upper bound to use instead of the clock (set for cassette replays)
+        self.scan_ceilings = {}
+
+        # One keep-alive session for every call, so search pages and deletes
+        # reuse the same TLS connection instead of handshaking each time.
+        # requests is only loaded here, not when the module is imported.
+        import transport
+        self._transport = transport
+        self.session = transport.open_session(self.headers, pool_size)
+
+        # Timing of the most recent request and running totals
+        self.last_timing = None
+        self.timing_totals = {'requests': 0, 'connections': 0, 'connect': 0.0, 'server': 0.0, 'total': 0.0}
+        self._timing_lock = threading.Lock()
+
+    def close(self):
+        """
+        Closes the pooled connections (and the cassette being recorded).
+        """
+        self.session.close()
+        if self.recorder:
+            self.recorder.close()
+
+    def timing_summary(self):
+        """
+        Returns averaged request timings (seconds) over the client's lifetime.
+        """
+        with self._timing_lock:
+            totals = dict(self.timing_totals)
+        count = totals['requests'] or 1
+        return {
+            'requests': totals['requests'],
+            'new_connections': totals['connections'],
+            'avg_connect': totals['connect'] / count,
+            'avg_server': totals['server'] / count,
+            'avg_total': totals['total'] / count,
+        }
+
+    def _record_timing(self, method, endpoint, response, connect_time, total_time):
+        """
+        Splits a request's wall time into connection setup and server/transfer time.
+        """
+        timing = {
+            'method': method,
+            'endpoint': endpoint,
+            'status': response.status_code if response is not None else None,
+            'connect': connect_time,
+            'server': max(total_time - connect_time, 0.0),
+            'total': total_time,
+        }
+        with self._timing_lock:
+            self.last_timing = timing
+            self.timing_totals['requests'] += 1
+            if connect_time > 0:
+                self.timing_totals['connections'] += 1
+            self.timing_totals['connect'] += timing['connect']
+            self.timing_totals['server'] += timing['server']
+            self.timing_totals['total'] += timing['total']
+        logger.debug(f"{method} {endpoint} connect={connect_time:.3f}s server={timing['server']:.3f}s")
+        return timing
 
     def validate_token(self):
         """
@@ -27,66 +298,96 @@ class DiscordClient:
 
     def _request(self, method, endpoint, params=None, json_data=None):
         """
-        Internal request wrapper with Rate Limit handling.
+        Internal request wrapper with rate limit, retry and circuit breaker handling.
+        Returns the response, or None if the request failed for good.
         """
         url = f"{self.base_url}{endpoint}"
-        retries = 3
-        
-        for i in range(retries):
+        attempt = 0
+
+        while True:
+            # Held here while Discord is unreachable (see retry.CircuitBreaker)
+            if not self.breaker.wait():
+                print_error(f"Discord has been unreachable for too long, giving up on {method} {endpoint}.")
+                return None
+            self.scheduler.acquire(method, endpoint)
+            self._transport.reset_connect_time()
+            start = time.perf_counter()
             try:
-                response = requests.request(
+                response = self.session.request(
                     method, 
                     url, 
-                    headers=self.headers, 
                     params=params, 
-                    json=json_data
+                    json=json_data,
+                    timeout=self.timeout
                 )
-                
-                # Check for Rate Limit
-                if response.status_code == 429:
-                    retry_after = response.json().get('retry_after', 1)
-                    print_warning(f"Rate limited. Sleeping for {retry_after} seconds...")
-                    time.sleep(retry_after + 0.5) # Add a small buffer
-                    continue
-                
-                # Check for Unauthorized
-                if response.status_code == 401:
-                    print_error("Unauthorized: Invalid Token.")
-                    return None
-                    
-                return response
-                
-            except requests.RequestException as e:
-                print_error(f"Request failed: {e}")
-                time.sleep(2) # Wait before retry on network error
-                
-        return None
+            except self._transport.RequestException as e:
+                self.scheduler.update(method, endpoint, {})
+                elapsed = time.perf_counter() - start
+                self.metrics.observe_request(method, endpoint, None, elapsed)
+                reason = self._transport.error_reason(e)
+                if self.recorder:
+                    self.recorder.record(method, endpoint, params, json_data, None, {}, b'', elapsed, error=reason)
+                print_error(f"Request failed ({reason}): {e}")
+            except BaseException:
+                # Interrupted (Ctrl+C) before any answer: update() never runs for it
+                self.scheduler.release(method, endpoint)
+                raise
+            else:
+                self.scheduler.update(method, endpoint, response.headers)
+                elapsed = time.perf_counter() - start
+                if self.recorder:
+                    self.recorder.record(method, endpoint, params, json_data, response.status_code, response.headers,
+                                         response.content, elapsed)
+                self._record_timing(method, endpoint, response, self._transport.connect_time(), elapsed)
+                self.metrics.observe_request(method, endpoint, response.status_code, elapsed,
+                                             _body_size(response.request.body), len(response.content))
+                reason = self.retry_policy.classify_status(response.status_code)
 
-    def search_messages(self, guild_id=None, channel_id=None, author_id=None, content=None, min_id=None, max_id=None, offset=0):
+                if reason is None:
+                    self.breaker.record_success()
+
+                    # Check for Rate Limit (the scheduler holds the route until it resets)
+                    if response.status_code == 429:
+                        retry_after, is_global = rate_limit_info(response)
+                        print_warning(f"Rate limited{' (global)' if is_global else ''}. Sleeping for {retry_after} seconds...")
+                        self.scheduler.penalize(method, endpoint, retry_after + 0.5, is_global=is_global)
+                        self.metrics.observe_rate_limit(retry_after + 0.5)
+                        attempt += 1
+                        if attempt >= self.retry_policy.max_attempts:
+                            return None
+                        self.metrics.observe_retry(method, endpoint, '429')
+                        continue
+
+                    # Check for Unauthorized
+                    if response.status_code == 401:
+                        print_error("Unauthorized: Invalid Token.")
+                        return None
+
+                    return response
+
+                print_error(f"Server error {response.status_code} on {method} {endpoint}")
+
+            # While the circuit is open the attempt is not used up: the request waits it out
+            if self.breaker.record_failure() and reason in self.retry_policy.retry_on:
+                self.metrics.observe_retry(method, endpoint, reason)
+                continue
+            if not self.retry_policy.should_retry(reason, attempt):
+                return None
+            self.metrics.observe_retry(method, endpoint, reason)
+            time.sleep(self.retry_policy.backoff(attempt))
+            attempt += 1
+
+    def search_messages(self, guild_id=None, channel_id=None, author_id=None, content=None, min_id=None, max_id=None, offset=0,
+                        has=None, channel_ids=None):
         """
         Search for messages using Discord's search API.
         This is much more efficient than iterating history for specific users.
+        has: attachment/content kinds the message must have (see SEARCH_HAS_FILTERS).
+        channel_ids: for guild searches, only these channels.
         """
-        params = {}
-        if author_id:
-            params['author_id'] = author_id
-        if content:
-            params['content'] = content
-        if min_id:
-            params['min_id'] = min_id
-        if max_id:
-            params['max_id'] = max_id
-        params['offset'] = offset
-        
-        # Determine strict endpoint
-        if guild_id:
-            endpoint = f"/guilds/{guild_id}/messages/search"
-        elif channel_id:
-            endpoint = f"/channels/{channel_id}/messages/search"
-        else:
-             # Global DM search not easily supported without iterating all channels, 
-             # so we force channel_id for DMs or guild_id for servers.
-            print_error("Must specify guild_id or channel_id for search.")
+        endpoint, params = search_request(guild_id, channel_id, author_id, content, min_id, max_id, offset,
+                                          has, channel_ids)
+        if endpoint is None:
             return None
 
         response = self._request("GET", endpoint, params=params)
@@ -94,6 +395,17 @@ class DiscordClient:
             return response.json()
         return None
 
+    def get_channel_messages(self, channel_id, before=None, limit=HISTORY_PAGE_SIZE):
+        """
+        Fetches up to `limit` (max 100) messages of a channel older than
+        `before`, newest first. Returns the list, or None on failure.
+        """
+        endpoint, params = history_request(channel_id, before, limit)
+        response = self._request("GET", endpoint, params=params)
+        if response and response.status_code == 200:
+            return response.json()
+        return None
+
     def delete_message(self, channel_id, message_id):
         """
         Deletes a single message.
@@ -105,19 +417,209 @@ class DiscordClient:
         if response is None:
             logger.error(f"Failed to delete {message_id}: No response from server")
             return False
-        
-        if response.status_code == 204:
-            return True
-        elif response.status_code == 403:
-             # Often means message is too old or missing perms (though for own messages in DM, 403 usually means something else)
-             # actually 403 on own message delete usually means "Cannot delete this message" (e.g. system message)
-             # OR strictly for bots trying to delete >2 weeks old messages.
-             # For USERS deleting OWN messages, 204 is expected unless rate limited.
-            logger.warning(f"Failed to delete {message_id}: 403 Forbidden")
-            return False
-        elif response.status_code == 404:
-            logger.warning(f"Message {message_id} not found/already deleted")
-            return True # Treat as success
-        else:
-            logger.error(f"Failed to delete {message_id}: Status {response.status_code}")
-            return False
+        return delete_succeeded(message_id, response.status_code)
+
+    def bulk_delete_messages(self, channel_id, message_ids):
+        """
+        Deletes 2 to BULK_DELETE_MAX messages of one channel in a single
+        request. Needs Manage Messages in the channel, and Discord refuses the
+        whole request if any message is older than 14 days. Returns True if
+        every message was deleted.
+        """
+        endpoint, body = bulk_delete_request(channel_id, message_ids)
+        response = self._request("POST", endpoint, json_data=body)
+        return bulk_delete_succeeded(channel_id, len(message_ids), response)
+
+    def get_channel(self, channel_id):
+        """
+        Fetches a channel object (guild_id, permission_overwrites...), or None.
+        """
+        response = self._request("GET", f"/channels/{channel_id}")
+        if response and response.status_code == 200:
+            return response.json()
+        return None
+
+    def get_guild(self, guild_id):
+        """
+        Fetches a guild object (owner_id, roles...), or None.
+        """
+        response = self._request("GET", f"/guilds/{guild_id}")
+        if response and response.status_code == 200:
+            return response.json()
+        return None
+
+    def get_guild_member(self, guild_id, user_id):
+        """
+        Fetches a member of a guild (their role IDs), or None.
+        """
+        response = self._request("GET", f"/guilds/{guild_id}/members/{user_id}")
+        if response and response.status_code == 200:
+            return response.json()
+        return None
+
+
+def history_request(channel_id, before=None, limit=HISTORY_PAGE_SIZE):
+    """
+    Builds the (endpoint, params) of a channel history page.
+    """
+    params = {'limit': max(1, min(int(limit), HISTORY_PAGE_SIZE))}
+    if before:
+        params['before'] = before
+    return f"/channels/{channel_id}/messages", params
+
+
+def bulk_delete_request(channel_id, message_ids):
+    """
+    Builds the (endpoint, JSON body) of a bulk delete call.
+    """
+    if not 2 <= len(message_ids) <= BULK_DELETE_MAX:
+        raise ValueError(f"A bulk delete takes 2 to {BULK_DELETE_MAX} messages, got {len(message_ids)}")
+    return f"/channels/{channel_id}/messages/bulk-delete", {'messages': [str(m) for m in message_ids]}
+
+
+def bulk_delete_succeeded(channel_id, count, response):
+    """
+    Interprets the response (or None) of a bulk delete call.
+    """
+    if response is None:
+        logger.error(f"Bulk delete of {count} messages in {channel_id} failed: No response from server")
+        return False
+    if response.status_code == 204:
+        return True
+    logger.warning(f"Bulk delete of {count} messages in {channel_id} refused: Status {response.status_code}")
+    return False
+
+
+# Search tokenizes content into words; local filters match the same way
+_WORD = re.compile(r'\w+')
+# A URL as has:link finds it: http(s):// starting a word, followed by a host
+_LINK = re.compile(r'\bhttps?://[^\s/$.?#]', re.IGNORECASE)
+
+
+def content_matches(content, query):
+    """
+    Whether message content matches a search content query, for sources
+    that filter locally (channel history). Like the search API, every word
+    of the query must appear as a whole word, ignoring case: 'cat' does not
+    match 'category'.
+    """
+    words = set(_WORD.findall((content or '').lower()))
+    return all(word in words for word in _WORD.findall(query.lower()))
+
+
+def message_has(msg, kind):
+    """
+    Whether an API message object matches a search 'has' filter, for
+    sources that filter locally (channel history).
+    """
+    attachments = msg.get('attachments') or []
+    embeds = msg.get('embeds') or []
+    types = [a.get('content_type') or '' for a in attachments]
+    if kind == 'file':
+        return bool(attachments)
+    if kind == 'image':
+        return any(t.startswith('image/') for t in types) or any(e.get('type') == 'image' for e in embeds)
+    if kind == 'video':
+        return any(t.startswith('video/') for t in types) or any(e.get('type') in ('video', 'gifv') for e in embeds)
+    if kind == 'sound':
+        return any(t.startswith('audio/') for t in types)
+    if kind == 'embed':
+        return bool(embeds)
+    if kind == 'link':
+        return _LINK.search(msg.get('content') or '') is not None
+    if kind == 'sticker':
+        return bool(msg.get('sticker_items') or msg.get('stickers'))
+    raise ValueError(f"Unknown 'has' filter: {kind}")
+
+
+def search_request(guild_id=None, channel_id=None, author_id=None, content=None, min_id=None, max_id=None, offset=0,
+                   has=None, channel_ids=None):
+    """
+    Builds the (endpoint, params) of a search call, shared by the blocking
+    and async clients. Returns (None, None) without a guild or channel.
+    List values (has, channel_ids) are sent as repeated query parameters.
+    """
+    params = {}
+    if author_id:
+        params['author_id'] = author_id
+    if content:
+        params['content'] = content
+    if min_id:
+        params['min_id'] = min_id
+    if max_id:
+        params['max_id'] = max_id
+    if has:
+        unknown = set(has) - set(SEARCH_HAS_FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown 'has' filter: {', '.join(sorted(unknown))}")
+        params['has'] = list(has)
+    if channel_ids and guild_id:
+        params['channel_id'] = [str(c) for c in channel_ids]
+    params['offset'] = offset
+    
+    # Determine strict endpoint
+    if guild_id:
+        endpoint = f"/guilds/{guild_id}/messages/search"
+    elif channel_id:
+        endpoint = f"/channels/{channel_id}/messages/search"
+    else:
+         # Global DM search not easily supported without iterating all channels, 
+         # so we force channel_id for DMs or guild_id for servers.
+        print_error("Must specify guild_id or channel_id for search.")
+        return None, None
+    return endpoint, params
+
+
+def rate_limit_info(response):
+    """
+    Returns (retry_after, is_global) of a 429 response. Discord sends them
+    as JSON, but a 429 from Cloudflare or a proxy may be HTML, so the
+    Retry-After and X-RateLimit-* headers are used as a fallback.
+    """
+    try:
+        data = response.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        data = {}
+    headers = response.headers
+    retry_after = data.get('retry_after')
+    if retry_after is None:
+        retry_after = headers.get('Retry-After') or headers.get('X-RateLimit-Reset-After')
+    try:
+        retry_after = max(float(retry_after), 0.0)
+    except (TypeError, ValueError):
+        retry_after = DEFAULT_RETRY_AFTER
+    is_global = (bool(data.get('global')) or headers.get('X-RateLimit-Global', '').lower() == 'true'
+                 or headers.get('X-RateLimit-Scope') == 'global')
+    return retry_after, is_global
+
+
+def _body_size(body):
+    """
+    Length in bytes of a request body (str, bytes or None).
+    """
+    if body is None:
+        return 0
+    return len(body.encode('utf-8')) if isinstance(body, str) else len(body)
+
+
+def delete_succeeded(message_id, status_code):
+    """
+    Interprets the status of a delete call. 404 counts as success.
+    """
+    if status_code == 204:
+        return True
+    elif status_code == 403:
+         # Often means message is too old or missing perms (though for own messages in DM, 403 usually means something else)
+         # actually 403 on own message delete usually means "Cannot delete this message" (e.g. system message)
+         # OR strictly for bots trying to delete >2 weeks old messages.
+         # For USERS deleting OWN messages, 204 is expected unless rate limited.
+        logger.warning(f"Failed to delete {message_id}: 403 Forbidden")
+        return False
+    elif status_code == 404:
+        logger.warning(f"Message {message_id} not found/already deleted")
+        return True # Treat as success
+    else:
+        logger.error(f"Failed to delete {message_id}: Status {status_code}")
+        return False
@@ -0,0 +1,310 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+import aiohttp
+from api_client import (DiscordClient, RateLimitScheduler, USER_AGENT, HISTORY_PAGE_SIZE, search_request, history_request,
+                        delete_succeeded, rate_limit_info, bulk_delete_request, bulk_delete_succeeded)
+from metrics import RequestMetrics
+from retry import RetryPolicy, CircuitBreaker, TIMEOUT, CONNECTION, OTHER
+from utils import logger, print_warning, print_error
+
+
+class _AsyncResponse:
+    """
+    Body and headers of a finished aiohttp response, read while the
+    connection was held so it can go straight back to the pool.
+    """
+    __slots__ = ('status_code', 'headers', 'content')
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        # Raises ValueError on a non-JSON body, like requests does
+        return json.loads(self.content) if self.content else None
+
+
+async def _on_connection_create_start(session, ctx, params):
+    ctx.connect_start = time.perf_counter()
+
+
+async def _on_connection_create_end(session, ctx, params):
+    ctx.trace_request_ctx.connect += time.perf_counter() - ctx.connect_start
+
+
+def _error_reason(exc):
+    """Failure kind (see retry.py) of an aiohttp exception."""
+    if isinstance(exc, asyncio.TimeoutError):
+        return TIMEOUT
+    if isinstance(exc, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)):
+        return CONNECTION
+    return OTHER
+
+
+class AsyncDiscordClient:
+    """
+    asyncio counterpart of DiscordClient with the same surface
+    (validate_token, search_messages, delete_message, bulk_delete_messages...),
+    as coroutines.
+
+    All calls share one aiohttp session and connection pool. Rate limit
+    waits go through the same RateLimitScheduler but sleep with
+    asyncio.sleep, so cancelling the calling task stops it at once instead
+    of after the current backoff.
+    """
+    def __init__(self, token, pool_size=10, timeout=30, base_url="https://discord.com/api/v9", scheduler=None,
+                 metrics=None, retry_policy=None, breaker=None, recorder=None):
+        self.token = token
+        self.headers = {
+            "Authorization": token,
+            "User-Agent": USER_AGENT
+        }
+        self.base_url = base_url.rstrip('/')
+        self.user_id = None
+        self.pool_size = pool_size
+        self.timeout = timeout
+        # Pass the blocking client's scheduler to share its buckets
+        self.scheduler = scheduler or RateLimitScheduler()
+        # Pass the blocking client's metrics to count both clients together
+        self.metrics = metrics or RequestMetrics(self.scheduler)
+        # Sharing the breaker pauses both clients during an outage
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        # A cassette.CassetteRecorder, may be shared with the blocking client
+        self.recorder = recorder
+        # Context ID -> scan upper bound to use instead of the clock (see DiscordClient)
+        self.scan_ceilings = {}
+        self.session = None
+
+        self.last_timing = None
+        self.timing_totals = {'requests': 0, 'connections': 0, 'connect': 0.0, 'server': 0.0, 'total': 0.0}
+        self._timing_lock = threading.Lock()
+
+    # Same timing bookkeeping as the blocking client
+    timing_summary = DiscordClient.timing_summary
+    _record_timing = DiscordClient._record_timing
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _get_session(self):
+        # Created lazily, a ClientSession must belong to the running loop
+        if self.session is None or self.session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_start.append(_on_connection_create_start)
+            trace.on_connection_create_end.append(_on_connection_create_end)
+            self.session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[trace],
+            )
+        return self.session
+
+    async def close(self):
+        """
+        Closes the pooled connections.
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def acquire(self, method, endpoint):
+        """
+        Waits until the scheduler lets the request through, without blocking the loop.
+        """
+        while True:
+            delay = self.scheduler.reserve(method, endpoint)
+            if delay <= 0:
+                return
+            self.scheduler.add_wait(delay)
+            await asyncio.sleep(delay)
+
+    async def wait_breaker(self):
+        """
+        Waits while the circuit breaker is open. False if the outage outlasted its limit.
+        """
+        while True:
+            delay = self.breaker.reserve()
+            if delay is None:
+                return False
+            if delay <= 0:
+                return True
+            await asyncio.sleep(delay)
+
+    async def validate_token(self):
+        """
+        Validates the token by fetching user info.
+        """
+        response = await self._request("GET", "/users/@me")
+        if response and response.status_code == 200:
+            data = response.json()
+            self.user_id = data['id']
+            return data
+        return None
+
+    async def _request(self, method, endpoint, params=None, json_data=None):
+        """
+        Internal request wrapper with rate limit, retry and circuit breaker
+        handling, following the same rules as DiscordClient._request.
+        """
+        url = f"{self.base_url}{endpoint}"
+        session = self._get_session()
+        attempt = 0
+
+        while True:
+            if not await self.wait_breaker():
+                print_error(f"Discord has been unreachable for too long, giving up on {method} {endpoint}.")
+                return None
+            await self.acquire(method, endpoint)
+            trace_ctx = SimpleNamespace(connect=0.0)
+            start = time.perf_counter()
+            try:
+                async with session.request(method, url, params=params, json=json_data,
+                                           trace_request_ctx=trace_ctx) as raw:
+                    response = _AsyncResponse(raw.status, raw.headers, await raw.read())
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.scheduler.update(method, endpoint, {})
+                elapsed = time.perf_counter() - start
+                self.metrics.observe_request(method, endpoint, None, elapsed)
+                reason = _error_reason(e)
+                if self.recorder:
+                    self.recorder.record(method, endpoint, params, json_data, None, {}, b'', elapsed, error=reason)
+                print_error(f"Request failed ({reason}): {str(e) or type(e).__name__}")
+            except BaseException:
+                # Cancelled (the GUI's STOP) before any answer: update() never runs for it
+                self.scheduler.release(method, endpoint)
+                raise
+            else:
+                self.scheduler.update(method, endpoint, response.headers)
+                elapsed = time.perf_counter() - start
+                if self.recorder:
+                    self.recorder.record(method, endpoint, params, json_data, response.status_code, response.headers,
+                                         response.content, elapsed)
+                self._record_timing(method, endpoint, response, trace_ctx.connect, elapsed)
+                self.metrics.observe_request(method, endpoint, response.status_code, elapsed,
+                                             len(json.dumps(json_data)) if json_data is not None else 0,
+                                             len(response.content))
+                reason = self.retry_policy.classify_status(response.status_code)
+
+                if reason is None:
+                    self.breaker.record_success()
+
+                    # Check for Rate Limit (the scheduler holds the route until it resets)
+                    if response.status_code == 429:
+                        retry_after, is_global = rate_limit_info(response)
+                        print_warning(f"Rate limited{' (global)' if is_global else ''}. Sleeping for {retry_after} seconds...")
+                        self.scheduler.penalize(method, endpoint, retry_after + 0.5, is_global=is_global)
+                        self.metrics.observe_rate_limit(retry_after + 0.5)
+                        attempt += 1
+                        if attempt >= self.retry_policy.max_attempts:
+                            return None
+                        self.metrics.observe_retry(method, endpoint, '429')
+                        continue
+
+                    # Check for Unauthorized
+                    if response.status_code == 401:
+                        print_error("Unauthorized: Invalid Token.")
+                        return None
+
+                    return response
+
+                print_error(f"Server error {response.status_code} on {method} {endpoint}")
+
+            if self.breaker.record_failure() and reason in self.retry_policy.retry_on:
+                self.metrics.observe_retry(method, endpoint, reason)
+                continue
+            if not self.retry_policy.should_retry(reason, attempt):
+                return None
+            self.metrics.observe_retry(method, endpoint, reason)
+            await asyncio.sleep(self.retry_policy.backoff(attempt))
+            attempt += 1
+
+    async def search_messages(self, guild_id=None, channel_id=None, author_id=None, content=None, min_id=None, max_id=None, offset=0,
+                              has=None, channel_ids=None):
+        """
+        Search for messages using Discord's search API.
+        """
+        endpoint, params = search_request(guild_id, channel_id, author_id, content, min_id, max_id, offset,
+                                          has, channel_ids)
+        if endpoint is None:
+            return None
+
+        response = await self._request("GET", endpoint, params=params)
+        if response and response.status_code == 200:
+            return response.json()
+        return None
+
+    async def get_channel_messages(self, channel_id, before=None, limit=HISTORY_PAGE_SIZE):
+        """
+        Fetches up to `limit` messages of a channel older than `before`, newest first.
+        """
+        endpoint, params = history_request(channel_id, before, limit)
+        response = await self._request("GET", endpoint, params=params)
+        if response and response.status_code == 200:
+            return response.json()
+        return None
+
+    async def delete_message(self, channel_id, message_id):
+        """
+        Deletes a single message.
+        """
+        endpoint = f"/channels/{channel_id}/messages/{message_id}"
+        response = await self._request("DELETE", endpoint)
+
+        if response is None:
+            logger.error(f"Failed to delete {message_id}: No response from server")
+            return False
+        return delete_succeeded(message_id, response.status_code)
+
+    async def bulk_delete_messages(self, channel_id, message_ids):
+        """
+        Deletes 2 to 100 messages of one channel in a single request.
+        """
+        endpoint, body = bulk_delete_request(channel_id, message_ids)
+        response = await self._request("POST", endpoint, json_data=body)
+        return bulk_delete_succeeded(channel_id, len(message_ids), response)
+
+    async def get_channel(self, channel_id):
+        response = await self._request("GET", f"/channels/{channel_id}")
+        if response and response.status_code == 200:
+            return response.json()
+        return None
+
+    async def get_guild(self, guild_id):
+        response = await self._request("GET", f"/guilds/{guild_id}")
+        if response and response.status_code == 200:
+            return response.json()
+        return None
+
+    async def get_guild_member(self, guild_id, user_id):
+        response = await self._request("GET", f"/guilds/{guild_id}/members/{user_id}")
+        if response and response.status_code == 200:
+            return response.json()
+        return None
+
+
+class LoopThread:
+    """
+    Runs an asyncio event loop in a daemon thread, for callers that are not
+    async themselves (the GUI). submit() returns a concurrent.futures.Future;
+    cancelling it cancels the task inside the loop right away.
+    """
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self, timeout=5):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
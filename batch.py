@@ -0,0 +1,149 @@
+"""
+Batch mode: clean many DMs and servers in one run.
+
+Every context gets its own job and pipeline, run side by side on one
+DiscordClient. The client's RateLimitScheduler is shared, so contexts whose
+routes map to different buckets never wait on each other, while every
+request still counts against its bucket and the global limit.
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from deleter import MessageDeleter, SOURCE_AUTO
+from planner import format_duration
+from utils import print_info, print_success, print_warning, print_error, logger
+
+DEFAULT_WORKERS = 4
+
+_CONTEXT_LINE = re.compile(r'^(dm|guild|server)\s*:\s*(\d+)$', re.IGNORECASE)
+
+
+class BatchCancelled(Exception):
+    pass
+
+
+def parse_contexts(entries):
+    """
+    Parses context entries like 'dm:<channel_id>' or 'guild:<guild_id>'
+    ('server:' is accepted too) into a list of (context_id, is_dm).
+    Blank entries and '#' comments are skipped, duplicates are dropped.
+    Raises ValueError on anything else.
+    """
+    contexts = []
+    seen = set()
+    for number, entry in enumerate(entries, 1):
+        entry = entry.split('#', 1)[0].strip()
+        if not entry:
+            continue
+        match = _CONTEXT_LINE.match(entry)
+        if not match:
+            raise ValueError(f"Entry {number}: expected 'dm:<id>' or 'guild:<id>', got '{entry}'")
+        context = (match.group(2), match.group(1).lower() == 'dm')
+        if context not in seen:
+            seen.add(context)
+            contexts.append(context)
+    return contexts
+
+
+def load_contexts(path):
+    """
+    Reads contexts from a file, one entry per line.
+    """
+    with open(path, encoding='utf-8') as f:
+        return parse_contexts(f)
+
+
+def run_batch(client, contexts, journal=None, content_query=None, workers=DEFAULT_WORKERS, dry_run=False,
+              progress_callback=None, min_id=None, max_id=None, has=None, channel_ids=None, source=SOURCE_AUTO):
+    """
+    Runs every (context_id, is_dm) concurrently through the shared client.
+    Each context streams its matches into deletes (run_pipeline); with
+    dry_run it is only scanned and its deletes are planned (planner.py).
+    There is no confirmation prompt.
+    min_id, max_id, has and channel_ids are search filters applied to every
+    context (channel_ids only to servers). source picks how DMs are
+    enumerated (see deleter.SCAN_SOURCES).
+
+    progress_callback(context_id, scanned, deleted, failed) is called per
+    search page and per delete.
+    Returns {context_id: {'is_dm', 'job_id', 'scanned', 'deleted', 'failed', 'error'}}, plus 'plan'
+    (a DeletionPlan) per context with dry_run.
+    """
+    results = {}
+    stop = threading.Event()
+
+    def check_stop():
+        # Raised from the scan/delete callbacks, which unwinds that context's pipeline
+        if stop.is_set():
+            raise BatchCancelled()
+
+    def run_one(context_id, is_dm):
+        result = {'is_dm': is_dm, 'job_id': None, 'scanned': 0, 'deleted': 0, 'failed': 0, 'error': None}
+        deleter = MessageDeleter(client, journal)
+        filters = {'min_id': min_id, 'max_id': max_id, 'has': has, 'channel_ids': None if is_dm else channel_ids,
+                   'source': source if is_dm else None}
+        if journal and not dry_run:
+            result['job_id'] = journal.create_job(context_id, is_dm, content_query, filters)
+
+        def report():
+            if progress_callback:
+                progress_callback(context_id, result['scanned'], result['deleted'], result['failed'])
+
+        def on_scan(batch):
+            check_stop()
+            result['scanned'] += len(batch)
+            report()
+
+        def on_delete(deleted, failed, scanned):
+            check_stop()
+            result.update(deleted=deleted, failed=failed)
+            report()
+
+        if dry_run:
+            messages = deleter.scan_messages(context_id, is_dm, content_query=content_query,
+                                             progress_callback=on_scan, **filters)
+            result['plan'] = deleter.plan_deletes(messages)
+        else:
+            deleter.run_pipeline(context_id, is_dm, content_query=content_query, progress_callback=on_delete,
+                                 scan_callback=on_scan, job_id=result['job_id'], **filters)
+        return result
+
+    print_info(f"Batch: {len(contexts)} contexts, {min(workers, len(contexts)) or 1} at a time...")
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(run_one, context_id, is_dm): (context_id, is_dm) for context_id, is_dm in contexts}
+        try:
+            completed = list(as_completed(futures))
+        except KeyboardInterrupt:
+            # Let running contexts stop at their next request, then re-raise
+            stop.set()
+            for future in futures:
+                future.cancel()
+            raise
+        for future in completed:
+            context_id, is_dm = futures[future]
+            try:
+                results[context_id] = future.result()
+            except Exception as e:
+                logger.error(f"Batch context {context_id} failed: {e}", exc_info=True)
+                print_error(f"{'DM' if is_dm else 'Server'} {context_id} failed: {e}")
+                results[context_id] = {'is_dm': is_dm, 'job_id': None, 'scanned': 0, 'deleted': 0, 'failed': 0,
+                                       'error': str(e)}
+
+    print_batch_summary(results, dry_run)
+    return results
+
+
+def print_batch_summary(results, dry_run=False):
+    print_success("Batch complete.")
+    for context_id, result in results.items():
+        kind = "DM" if result['is_dm'] else "Server"
+        if result['error']:
+            print_warning(f"{kind} {context_id}: error: {result['error']}")
+        elif dry_run:
+            plan = result.get('plan')
+            estimate = f" (~{plan.total_requests} requests, ~{format_duration(plan.seconds)})" if plan else ""
+            print_info(f"{kind} {context_id}: {result['scanned']} messages would be deleted{estimate}")
+        else:
+            job = f" (job #{result['job_id']})" if result['job_id'] else ""
+            print_info(f"{kind} {context_id}{job}: deleted {result['deleted']}, failed {result['failed']}")
@@ -0,0 +1,178 @@
+"""
+End-to-end benchmark of the scan and delete pipelines against the local
+mock API (mock_server.py), so throughput regressions show up without a
+live account.
+
+    python benchmark.py --messages 10000 --latency 0.02 --rate-scale 0.01
+
+Each scenario runs in its own process against a freshly seeded server and
+reports messages/sec, p50/p99 request latency, time spent waiting on rate
+limits (idle) and the scenario process's peak RSS. The cli scenario also
+plans its deletes first (planner.py), so planned_s can be compared with the
+measured delete_s.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import subprocess
+import sys
+import time
+
+SCENARIOS = {
+    'cli': "scan_messages, then execute_deletion (the main.py flow)",
+    'pipeline': "run_pipeline, deleting while scanning (streaming / headless flow)",
+}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_scenario(name, base_url, context_id, is_dm, rate_scale=1.0):
+    """
+    Runs one scenario in this process and returns its result dict.
+    """
+    from api_client import DiscordClient
+    from deleter import MessageDeleter
+    from mock_server import MOCK_TOKEN, DEFAULT_LIMITS
+    from planner import plan_deletion
+
+    class TimedClient(DiscordClient):
+        # Keeps every request's wall time for the latency percentiles
+        def _record_timing(self, *args):
+            timing = super()._record_timing(*args)
+            latencies.append(timing['total'])
+            return timing
+
+    latencies = []
+    client = TimedClient(MOCK_TOKEN, base_url=base_url)
+    client.validate_token()
+    deleter = MessageDeleter(client)
+
+    start = time.perf_counter()
+    scanned = 0
+    planned = delete_elapsed = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        if name == 'cli':
+            messages = deleter.scan_messages(context_id, is_dm=is_dm)
+            scanned = len(messages)
+            # No delete has been answered yet, so give the planner the mock's delete bucket
+            limit, window = DEFAULT_LIMITS['delete']
+            planned = plan_deletion(messages, client, limit=limit, window=window * rate_scale).seconds
+            delete_start = time.perf_counter()
+            deleted, failed = deleter.execute_deletion(messages, skip_confirm=True) or (0, 0)
+            delete_elapsed = time.perf_counter() - delete_start
+        else:
+            counted = []
+            deleted, failed = deleter.run_pipeline(context_id, is_dm=is_dm,
+                                                   scan_callback=lambda batch: counted.append(len(batch)))
+            scanned = sum(counted)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'scenario': name,
+        'scanned': scanned,
+        'deleted': deleted,
+        'failed': failed,
+        'elapsed_s': round(elapsed, 3),
+        'delete_s': round(delete_elapsed, 3) if delete_elapsed is not None else None,
+        'planned_s': round(planned, 3) if planned is not None else None,
+        'messages_per_s': round(deleted / elapsed, 2) if elapsed else None,
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        'idle_s': round(client.scheduler.total_wait, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1) if peak_rss_mb() is not None else None,
+    }
+
+
+def run_child(args):
+    result = run_scenario(args.child, args.base_url, args.context_id, args.dm, args.rate_scale)
+    print(json.dumps(result))
+
+
+def run_all(args):
+    from mock_server import MockDiscordState, start_server, DM_CHANNEL_ID, GUILD_ID
+
+    context_id = DM_CHANNEL_ID if args.context == 'dm' else GUILD_ID
+    results = []
+    for name in args.scenarios:
+        # Fresh history per scenario, since deletes consume it
+        state = MockDiscordState(args.messages, args.own_ratio, args.guild_channels, args.seed,
+                                 args.latency, args.jitter, args.rate_scale)
+        server, base_url = start_server(state)
+        try:
+            cmd = [sys.executable, __file__, '--child', name, '--base-url', base_url, '--context-id', context_id,
+                   '--rate-scale', str(args.rate_scale)]
+            if args.context == 'dm':
+                cmd.append('--dm')
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        lines = [line for line in proc.stdout.splitlines() if line.startswith('{')]
+        if proc.returncode != 0 or not lines:
+            print(f"{name}: failed\n{proc.stderr}", file=sys.stderr)
+            continue
+        result = json.loads(lines[-1])
+        result['rate_limited'] = state.stats['rate_limited']
+        results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.messages} messages per context, context={args.context}, latency={args.latency}s, "
+          f"rate_scale={args.rate_scale}")
+    header = ('scenario', 'deleted', 'elapsed_s', 'delete_s', 'planned_s', 'messages_per_s', 'requests', 'p50_ms',
+              'p99_ms', 'idle_s', 'rate_limited', 'peak_rss_mb')
+    print("  ".join(f"{h:>14}" for h in header))
+    for result in results:
+        print("  ".join(f"{str(result.get(h)):>14}" for h in header))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scan/delete throughput against the mock Discord API.")
+    parser.add_argument('--messages', type=int, default=1000, help="seeded messages per context (1k to 1M)")
+    parser.add_argument('--own-ratio', type=float, default=0.5)
+    parser.add_argument('--guild-channels', type=int, default=5)
+    parser.add_argument('--context', choices=('dm', 'guild'), default='dm')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.01, help="injected seconds per request")
+    parser.add_argument('--jitter', type=float, default=0.005)
+    parser.add_argument('--rate-scale', type=float, default=0.01,
+                        help="multiplier for the mock's rate limit windows (1.0 = real timings)")
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    # Internal: run a single scenario in a child process
+    parser.add_argument('--child', choices=sorted(SCENARIOS), help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    parser.add_argument('--context-id', help=argparse.SUPPRESS)
+    parser.add_argument('--dm', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+    else:
+        run_all(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Cassettes: recorded Discord traffic, for profiling real sessions offline.
+
+CassetteRecorder is handed to a client (DiscordClient(..., recorder=...))
+and writes one gzip'd JSON line per request: method, endpoint, parameters,
+status, duration, the rate limit headers and the response body. The token
+is never written (request headers are not recorded). Only structural
+fields (IDs, timestamps, types, flags, sizes, permissions, paging) are kept
+as they are: every other string, from message content and search keywords
+to file names, CDN links, embeds and user names, is replaced by 'x's of
+the same length, so payload sizes stay realistic.
+
+CassettePlayer answers requests from a cassette, in the recorded order per
+request, after the recorded duration (divided by `speed`). By default the
+recorded buckets are enforced live rather than replaying the original
+run's 429s, so a changed scheduler meets the same limits and is measured
+on its own pacing. replay_client() returns a DiscordClient whose session
+is served by a player (transport.ReplayAdapter), for MessageDeleter or the
+CLI (--replay).
+"""
+
+import gzip
+import json
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from metrics import route_label
+from planner import SimulatedBucket
+from utils import logger, datetime_to_snowflake
+
+CASSETTE_VERSION = 1
+
+# Keys whose string values are kept, in bodies and query parameters; so are
+# those ending in _id or _ids. Any other string is masked.
+KEPT_KEYS = frozenset((
+    'id', 'type', 'flags', 'timestamp', 'edited_timestamp', 'content_type', 'size', 'width', 'height',
+    'hit', 'total_results', 'messages', 'roles', 'permissions', 'permission_overwrites', 'allow', 'deny',
+    'code', 'message', 'retry_after', 'global', 'offset', 'limit', 'before', 'after', 'around', 'has',
+    'sort_by', 'sort_order', 'include_nsfw',
+))
+# Response headers kept in the cassette
+RECORDED_HEADERS = ('X-RateLimit-Bucket', 'X-RateLimit-Limit', 'X-RateLimit-Remaining', 'X-RateLimit-Reset-After',
+                    'X-RateLimit-Global', 'X-RateLimit-Scope', 'Retry-After', 'Content-Type')
+# Bodies that are not JSON (e.g. a proxy's error page) are cut to this many characters
+MAX_TEXT_BODY = 2048
+
+_MAJOR = re.compile(r'/(?:channels|guilds|webhooks)/(\d+)')
+
+
+def redact(value, key=None):
+    """
+    Copy of a decoded JSON value with every string not under a kept key
+    (see KEPT_KEYS) masked. List items are judged by the list's key.
+    """
+    if isinstance(value, dict):
+        return {k: redact(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v, key) for v in value]
+    if isinstance(value, str) and not _kept(key):
+        return 'x' * len(value)
+    return value
+
+
+def _kept(key):
+    return key is not None and (key in KEPT_KEYS or key.endswith(('_id', '_ids')))
+
+
+def query_pairs(params):
+    """
+    Request parameters (a dict, values may be lists) as redacted (key, str) pairs.
+    """
+    pairs = []
+    for key, value in (params or {}).items():
+        for item in (value if isinstance(value, (list, tuple)) else [value]):
+            pairs.append((key, str(item)))
+    return redact_pairs(pairs)
+
+
+def redact_pairs(pairs):
+    return [(k, v if _kept(k) else 'x' * len(v)) for k, v in pairs]
+
+
+def request_key(method, endpoint, pairs, body):
+    """
+    What a replayed request is matched on: method, endpoint, sorted
+    (redacted) parameters and the redacted JSON body.
+    """
+    body = json.dumps(redact(body), sort_keys=True, separators=(',', ':')) if body is not None else None
+    return method, endpoint, tuple(sorted(tuple(p) for p in pairs)), body
+
+
+class CassetteRecorder:
+    """
+    Writes a cassette while a client runs. Thread-safe; close() when done
+    (DiscordClient.close does).
+    """
+    def __init__(self, path, base_url=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        self._started = time.monotonic()
+        self.count = 0
+        self._write({'cassette': CASSETTE_VERSION, 'base_url': base_url, 'recorded_at': round(time.time(), 3)})
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, separators=(',', ':')) + "\n")
+
+    def record(self, method, endpoint, params, json_data, status, headers, content, seconds, error=None):
+        """
+        Records one request. status is None (and error the failure kind,
+        see retry.py) when no response arrived.
+        """
+        record = {
+            't': round(time.monotonic() - self._started, 4),
+            'd': round(seconds, 4),
+            'm': method,
+            'e': endpoint,
+            'q': query_pairs(params),
+            'b': redact(json_data),
+            's': status,
+        }
+        if error:
+            record['x'] = error
+        else:
+            record['h'] = {k: headers[k] for k in RECORDED_HEADERS if k in headers}
+            record['r'] = _redact_body(content)
+        with self._lock:
+            if self._file is None:
+                return
+            self._write(record)
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _redact_body(content):
+    if not content:
+        return ''
+    text = content.decode('utf-8', 'replace') if isinstance(content, bytes) else content
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return text[:MAX_TEXT_BODY]
+    return json.dumps(redact(data), separators=(',', ':'))
+
+
+class Cassette:
+    """
+    A loaded cassette: its header and the recorded interactions, in order.
+    """
+    def __init__(self, header, interactions):
+        self.header = header
+        self.interactions = interactions
+
+    @property
+    def base_url(self):
+        return self.header.get('base_url') or "https://discord.com/api/v9"
+
+    def scan_ceilings(self):
+        """
+        Context ID -> the upper bound (max_id) the recorded scans of that
+        context started from. A scan without a max_id takes it from the
+        clock, so a replay must reuse it to send the recorded searches.
+        Bounds below the recording time were given explicitly and are left out.
+        """
+        recorded_at = datetime.fromtimestamp(self.header.get('recorded_at') or 0, timezone.utc)
+        now = datetime_to_snowflake(recorded_at)
+        ceilings = {}
+        for interaction in self.interactions:
+            match = _MAJOR.match(interaction['e'])
+            if not match or not interaction['e'].endswith('/messages/search'):
+                continue
+            for key, value in interaction['q']:
+                if key == 'max_id' and value.isdigit() and int(value) > now:
+                    ceilings[match.group(1)] = max(ceilings.get(match.group(1), 0), int(value))
+        return ceilings
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a cassette file. Raises ValueError if it is not one.
+        """
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            try:
+                header = json.loads(f.readline())
+                interactions = [json.loads(line) for line in f if line.strip()]
+            except (OSError, ValueError) as e:
+                raise ValueError(f"{path} is not a cassette: {e}") from None
+        if not isinstance(header, dict) or header.get('cassette') != CASSETTE_VERSION:
+            raise ValueError(f"{path} is not a version {CASSETTE_VERSION} cassette")
+        return cls(header, interactions)
+
+
+class CassettePlayer:
+    """
+    Answers requests from a Cassette.
+
+    Each request takes the next unused interaction recorded for the same
+    request_key; if there is none left, one of the same route (IDs aside)
+    is reused, so a changed pipeline still gets realistic answers and
+    timings. speed divides every recorded duration.
+    With enforce_rate_limits, recorded 429s are dropped and the recorded
+    buckets (limit and window per X-RateLimit-Bucket, windows divided by
+    speed too) are applied to the replayed requests instead. Without it the
+    recorded responses, 429s and rate limit headers are played back as they
+    were.
+    """
+    def __init__(self, cassette, speed=1.0, enforce_rate_limits=True):
+        if speed <= 0:
+            raise ValueError("Replay speed must be positive")
+        self.cassette = cassette
+        self.speed = speed
+        self.enforce_rate_limits = enforce_rate_limits
+        self._lock = threading.Lock()
+        self._queues = {}  # request_key -> deque of interactions
+        self._routes = {}  # route label -> [interactions], for requests not recorded as such
+        self._route_turn = {}
+        self._windows = {}  # bucket hash -> (limit, window)
+        self._buckets = {}  # (bucket hash, major ID) -> SimulatedBucket
+        self.unmatched = 0
+        self.reused = 0  # answered with another request's interaction of the same route
+        self.rate_limited = 0
+
+        for interaction in cassette.interactions:
+            headers = interaction.get('h') or {}
+            bucket_hash = headers.get('X-RateLimit-Bucket')
+            if bucket_hash and 'X-RateLimit-Limit' in headers:
+                limit, window = self._windows.get(bucket_hash, (0, 0.0))
+                try:
+                    self._windows[bucket_hash] = (int(headers['X-RateLimit-Limit']),
+                                                  max(window, float(headers['X-RateLimit-Reset-After'])))
+                except (KeyError, ValueError):
+                    pass
+            if enforce_rate_limits and interaction['s'] == 429:
+                continue
+            key = request_key(interaction['m'], interaction['e'], interaction['q'], interaction['b'])
+            self._queues.setdefault(key, deque()).append(interaction)
+            self._routes.setdefault(route_label(interaction['m'], interaction['e']), []).append(interaction)
+
+    def respond(self, method, endpoint, pairs, body):
+        """
+        Returns (status, headers, text, delay, error) for a request; pairs
+        are its query parameters. status is None and error the failure kind
+        for a recorded network failure. The caller waits `delay` seconds.
+        """
+        key = request_key(method, endpoint, redact_pairs(pairs), body)
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue:
+                interaction = queue[0]
+                exact = True
+            else:
+                interaction = self._reuse(route_label(method, endpoint))
+                exact = False
+                if interaction is not None:
+                    self.reused += 1
+            if interaction is None:
+                self.unmatched += 1
+                logger.warning(f"Replay: {method} {endpoint} is not in the cassette")
+                return 404, {'Content-Type': 'application/json'}, '{"message":"Not in cassette","code":0}', 0.0, None
+
+            delay = interaction['d'] / self.speed
+            if interaction.get('x'):
+                if exact:
+                    queue.popleft()
+                return None, {}, '', delay, interaction['x']
+
+            headers = dict(interaction.get('h') or {})
+            bucket_hash = headers.get('X-RateLimit-Bucket')
+            if self.enforce_rate_limits and bucket_hash in self._windows:
+                allowed, live = self._bucket(bucket_hash, endpoint).take(time.monotonic())
+                headers.update(live)
+                if not allowed:
+                    # Not consumed: the retry gets this interaction
+                    self.rate_limited += 1
+                    retry_after = float(live['X-RateLimit-Reset-After'])
+                    headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+                    body = {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': False}
+                    headers['Content-Type'] = 'application/json'
+                    return 429, headers, json.dumps(body), delay, None
+            if exact:
+                queue.popleft()
+            return interaction['s'], headers, interaction.get('r') or '', delay, None
+
+    def _reuse(self, route):
+        candidates = self._routes.get(route)
+        if not candidates:
+            return None
+        # Cycle through the route's interactions to keep its status and latency mix
+        turn = self._route_turn.get(route, 0)
+        self._route_turn[route] = turn + 1
+        return candidates[turn % len(candidates)]
+
+    def _bucket(self, bucket_hash, endpoint):
+        match = _MAJOR.match(endpoint)
+        key = (bucket_hash, match.group(1) if match else '')
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            limit, window = self._windows[bucket_hash]
+            bucket = self._buckets[key] = SimulatedBucket(bucket_hash, limit, window / self.speed)
+        return bucket
+
+
+def replay_client(path, speed=1.0, enforce_rate_limits=True):
+    """
+    A DiscordClient answered entirely from the cassette at path: nothing is
+    sent over the network. Its `player` attribute holds the CassettePlayer.
+    """
+    from api_client import DiscordClient
+    cassette = Cassette.load(path)
+    player = CassettePlayer(cassette, speed, enforce_rate_limits)
+    client = DiscordClient("replay", base_url=cassette.base_url)
+    client._transport.mount_replay(client.session, player, client.base_url)
+    client.player = player
+    client.scan_ceilings = cassette.scan_ceilings()
+    return client
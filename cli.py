@@ -0,0 +1,291 @@
+"""
+Headless entry point for scheduled cleanups (cron, systemd timers).
+
+Never prompts: the token comes from --token, --token-file or the
+DISCORD_TOKEN environment variable, and deletion starts without a
+confirmation. With --format json, progress is written to stdout as one JSON
+object per line and the usual colored output is silenced.
+
+Examples:
+    python cli.py --dm 123 --guild 456 --keyword "hello" --after 2021-01-01 --dry-run
+    python cli.py --guild 456 --channel 789 --has image --format json
+    python cli.py --contexts-file contexts.txt --format json
+    python cli.py --resume 12 --format json
+    python cli.py --guild 456 --format json --metrics-file /var/lib/node_exporter/discord_tool.prom
+    python cli.py --guild 456 --record run.cassette.gz
+    python cli.py --guild 456 --replay run.cassette.gz --replay-speed 10 --format json
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from api_client import DiscordClient, SEARCH_HAS_FILTERS
+from batch import parse_contexts, load_contexts, run_batch, DEFAULT_WORKERS
+from cassette import CassetteRecorder, replay_client
+from deleter import MessageDeleter, SCAN_SOURCES, SOURCE_AUTO
+from journal import JobJournal, DEFAULT_JOURNAL
+from utils import print_info, print_error, set_quiet, set_log_levels, parse_date, date_bounds
+
+EXIT_OK = 0
+EXIT_FAILURES = 1  # some deletes or contexts failed
+EXIT_ERROR = 2  # bad arguments, login failure
+
+
+class ProgressReporter:
+    """
+    Writes progress either as JSON lines or as plain text. Progress of a
+    context is throttled to one line per `interval` seconds; start, done and
+    error events are always written. With metrics_file, the client's request
+    metrics are rewritten there in Prometheus text format with every line.
+    """
+    def __init__(self, client, fmt="text", interval=1.0, stream=None, metrics_file=None):
+        self.client = client
+        self.metrics_file = metrics_file
+        self.fmt = fmt
+        self.interval = interval
+        self.stream = stream or sys.stdout
+        self.started = time.monotonic()
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def event(self, name, **fields):
+        record = {
+            'event': name,
+            'time': round(time.time(), 3),
+            'elapsed': round(time.monotonic() - self.started, 3),
+            'rate_limit_wait': round(self.client.scheduler.total_wait, 3),
+        }
+        record.update(fields)
+        with self._lock:
+            if self.fmt == "json":
+                self.stream.write(json.dumps(record) + "\n")
+            else:
+                details = ", ".join(f"{k}={v}" for k, v in record.items() if k not in ('event', 'time'))
+                self.stream.write(f"[{name}] {details}\n")
+            self.stream.flush()
+            if self.metrics_file:
+                self.write_metrics()
+
+    def write_metrics(self):
+        try:
+            self.client.metrics.write_prometheus(self.metrics_file)
+        except OSError as e:
+            print_error(f"Could not write {self.metrics_file}: {e}")
+            self.metrics_file = None
+
+    def progress(self, context_id, scanned, deleted, failed, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last.get(context_id, 0) < self.interval:
+                return
+            self._last[context_id] = now
+        self.event("progress", context=context_id, scanned=scanned, deleted=deleted, failed=failed)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Delete your own Discord messages without any prompts.",
+        epilog="Automating user accounts is against Discord TOS. Use at your own risk."
+    )
+    target = parser.add_argument_group("targets")
+    target.add_argument("--dm", action="append", default=[], metavar="CHANNEL_ID", help="DM channel to clean (repeatable)")
+    target.add_argument("--guild", action="append", default=[], metavar="GUILD_ID", help="server to clean (repeatable)")
+    target.add_argument("--contexts-file", metavar="PATH", help="file with one 'dm:<id>' or 'guild:<id>' per line")
+    target.add_argument("--resume", type=int, metavar="JOB_ID", help="continue a journaled job instead")
+
+    filters = parser.add_argument_group("filters")
+    filters.add_argument("--keyword", help="only messages containing this text")
+    filters.add_argument("--after", metavar="DATE", help="only messages sent after this date (YYYY-MM-DD)")
+    filters.add_argument("--before", metavar="DATE", help="only messages sent before this date (YYYY-MM-DD)")
+    filters.add_argument("--has", action="append", choices=SEARCH_HAS_FILTERS, help="only messages with this (repeatable)")
+    filters.add_argument("--channel", action="append", metavar="CHANNEL_ID",
+                         help="in servers, only this channel (repeatable)")
+    filters.add_argument("--source", choices=SCAN_SOURCES, default=SOURCE_AUTO,
+                         help="how DMs are scanned: search API, channel history, or whichever needs fewer requests")
+
+    parser.add_argument("--dry-run", action="store_true",
+                        help="scan and estimate the requests and time the deletes would take, delete nothing")
+    parser.add_argument("--format", choices=("text", "json"), default="text", help="progress output format")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between progress lines per context")
+    parser.add_argument("--quiet", action="store_true", help="only write progress lines")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="contexts processed at once")
+    parser.add_argument("--token", help="account token (default: $DISCORD_TOKEN)")
+    parser.add_argument("--token-file", metavar="PATH", help="read the token from this file")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="keep request metrics in this file (Prometheus text format)")
+    parser.add_argument("--journal", default=DEFAULT_JOURNAL, metavar="PATH", help="job journal database")
+    traffic = parser.add_mutually_exclusive_group()
+    traffic.add_argument("--record", metavar="PATH",
+                         help="write this run's requests and responses to a cassette (token and all non-structural text redacted)")
+    traffic.add_argument("--replay", metavar="PATH",
+                         help="answer every request from a recorded cassette instead of Discord (offline, no token)")
+    parser.add_argument("--replay-speed", type=float, default=1.0, metavar="FACTOR",
+                        help="with --replay, run this many times faster than recorded")
+    levels = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+    parser.add_argument("--log-level", choices=levels, help="discord_tool.log level (default INFO)")
+    parser.add_argument("--audit-level", choices=levels,
+                        help="discord_audit.log level: INFO logs every delete, WARNING only failures")
+    return parser
+
+
+def load_token(args):
+    if args.token:
+        return args.token.strip()
+    if args.token_file:
+        with open(args.token_file, encoding='utf-8') as f:
+            return f.read().strip()
+    return os.environ.get("DISCORD_TOKEN", "").strip()
+
+
+def collect_contexts(args):
+    """
+    Returns the (context_id, is_dm) list from --dm, --guild and --contexts-file.
+    """
+    entries = [f"dm:{c}" for c in args.dm] + [f"guild:{g}" for g in args.guild]
+    contexts = parse_contexts(entries)
+    if args.contexts_file:
+        contexts += [c for c in load_contexts(args.contexts_file) if c not in contexts]
+    return contexts
+
+
+def parse_day(parser, value, name):
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        parser.error(f"{name}: invalid date '{value}', use YYYY-MM-DD")
+    return parsed
+
+
+def plan_fields(plan):
+    """
+    The estimate a dry run adds to its 'done' event.
+    """
+    if plan is None:
+        return {}
+    return {'planned_requests': plan.total_requests, 'planned_seconds': round(plan.seconds, 1)}
+
+
+def run_resume(deleter, journal, reporter, job_id, dry_run):
+    job = journal.get_job(job_id)
+    if not job:
+        reporter.event("error", job=job_id, message="job not found")
+        return EXIT_ERROR
+
+    context_id = job['context_id']
+    scanned = [0]
+
+    def on_scan(batch):
+        scanned[0] += len(batch)
+        reporter.progress(context_id, scanned[0], 0, 0)
+
+    messages = deleter.resume_job(job_id, progress_callback=on_scan)
+    reporter.event("scanned", job=job_id, context=context_id, remaining=len(messages))
+    if dry_run or not messages:
+        if not messages:
+            journal.finish_if_done(job_id)
+        plan = deleter.plan_deletes(messages) if messages else None
+        reporter.event("done", job=job_id, context=context_id, scanned=len(messages), deleted=0, failed=0,
+                       **plan_fields(plan))
+        return EXIT_OK
+
+    def on_delete(deleted, failed, total):
+        reporter.progress(context_id, total, deleted, failed)
+
+    deleted, failed = deleter.execute_deletion(messages, progress_callback=on_delete, skip_confirm=True,
+                                               job_id=job_id)
+    reporter.event("done", job=job_id, context=context_id, scanned=len(messages), deleted=deleted, failed=failed)
+    return EXIT_FAILURES if failed else EXIT_OK
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.quiet or args.format == "json":
+        set_quiet()
+    set_log_levels(args.log_level, args.audit_level)
+
+    # Every filter is sent to the search API as a parameter
+    min_id, max_id = date_bounds(parse_day(parser, args.after, "--after"), parse_day(parser, args.before, "--before"))
+    if args.channel and not all(c.isdigit() for c in args.channel):
+        parser.error("--channel: IDs must be numeric")
+    try:
+        contexts = [] if args.resume else collect_contexts(args)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not args.resume and not contexts:
+        parser.error("nothing to do: give --dm, --guild, --contexts-file or --resume")
+
+    if args.replay:
+        if args.resume:
+            # Replayed deletes would mark the journaled job's messages deleted
+            parser.error("--replay cannot be combined with --resume")
+        if args.replay_speed <= 0:
+            parser.error("--replay-speed must be positive")
+        try:
+            client = replay_client(args.replay, args.replay_speed)
+        except (OSError, ValueError) as e:
+            parser.error(f"--replay: {e}")
+        # A replayed run deletes nothing, so its jobs are not kept
+        args.journal = ":memory:"
+    else:
+        try:
+            token = load_token(args)
+        except OSError as e:
+            parser.error(f"--token-file: {e}")
+        if not token:
+            parser.error("no token: use --token, --token-file or set DISCORD_TOKEN")
+        client = DiscordClient(token)
+        if args.record:
+            try:
+                client.recorder = CassetteRecorder(args.record, client.base_url)
+            except OSError as e:
+                parser.error(f"--record: {e}")
+
+    reporter = ProgressReporter(client, args.format, args.interval, metrics_file=args.metrics_file)
+    user = client.validate_token()
+    if not user:
+        reporter.event("error", message="login failed")
+        return EXIT_ERROR
+    print_info(f"Logged in as {user['username']}")
+
+    journal = JobJournal(args.journal)
+    try:
+        if args.resume:
+            return run_resume(MessageDeleter(client, journal), journal, reporter, args.resume, args.dry_run)
+
+        reporter.event("start", contexts=[c for c, _ in contexts], dry_run=args.dry_run, keyword=args.keyword)
+        results = run_batch(client, contexts, journal, content_query=args.keyword, workers=args.workers,
+                            dry_run=args.dry_run, progress_callback=reporter.progress, min_id=min_id, max_id=max_id,
+                            has=args.has, channel_ids=args.channel, source=args.source)
+        exit_code = EXIT_OK
+        for context_id, result in results.items():
+            if result['error']:
+                reporter.event("error", context=context_id, message=result['error'])
+                exit_code = EXIT_FAILURES
+                continue
+            reporter.event("done", context=context_id, job=result['job_id'], scanned=result['scanned'],
+                           deleted=result['deleted'], failed=result['failed'], **plan_fields(result.get('plan')))
+            if result['failed']:
+                exit_code = EXIT_FAILURES
+        return exit_code
+    except KeyboardInterrupt:
+        reporter.event("interrupted")
+        print_error("Interrupted. Progress is saved in the job journal.")
+        return EXIT_FAILURES
+    finally:
+        reporter.event("metrics", **client.metrics.snapshot())
+        if args.replay:
+            player = client.player
+            print_info(f"Replay: {player.rate_limited} requests rate limited by the recorded buckets, "
+                       f"{player.reused} answered from a similar request, {player.unmatched} not in the cassette")
+        journal.close()
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Reader for Discord's "Request my data" package.
+Lists every message the account has sent straight from the zip, without
+extracting it and without any API calls. messages.json files are decoded
+incrementally, a chunk at a time.
+"""
+
+import csv
+import io
+import json
+import re
+import zipfile
+from records import MessageRecord
+from utils import logger
+
+# Channel types as stored in channel.json
+DM_CHANNEL_TYPES = (1, 3)  # DM, Group DM
+
+# Characters of messages.json decoded at a time
+CHUNK_SIZE = 1 << 16
+
+_CHANNEL_DIR = re.compile(r'(?:^|/)messages/c?(\d+)/$')
+_SPACE = re.compile(r'\s*')
+_DECODER = json.JSONDecoder()
+
+
+def _channel_dirs(archive):
+    """
+    Maps channel ID -> folder path inside the archive. Handles both the
+    current 'messages/c<id>/' layout and the older 'messages/<id>/' one, and
+    packages that were re-zipped with a top-level folder.
+    """
+    dirs = {}
+    for name in archive.namelist():
+        folder = name.rsplit('/', 1)[0] + '/'
+        match = _CHANNEL_DIR.search(folder)
+        if match:
+            dirs.setdefault(match.group(1), folder)
+    return dirs
+
+
+def _read_json(archive, name):
+    try:
+        with archive.open(name) as f:
+            return json.load(f)
+    except (KeyError, ValueError):
+        return None
+
+
+def _iter_json_array(raw):
+    """
+    Yields the items of a file holding one JSON array, decoding CHUNK_SIZE
+    characters at a time, so a channel with years of messages is never
+    loaded whole. Raises ValueError if the file is not a JSON array.
+    """
+    reader = io.TextIOWrapper(raw, encoding='utf-8-sig')
+    buffer, pos, eof = '', 0, False
+    state = '['  # next: '[', then an item or ']' (']?'), then ',' or ']' (','), an item after ','
+    while True:
+        pos = _SPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("JSON array is not closed")
+            buffer, pos = reader.read(CHUNK_SIZE), 0
+            eof = not buffer
+            continue
+
+        if state == 'item' or (state == ']?' and buffer[pos] != ']'):
+            try:
+                item, end = _DECODER.raw_decode(buffer, pos)
+            except ValueError:
+                end = None
+            if end is None or (end == len(buffer) and not eof):
+                # The item (or a number) may go on in the next chunk
+                chunk = '' if eof else reader.read(CHUNK_SIZE)
+                if not chunk:
+                    if end is None:
+                        raise ValueError(f"Invalid JSON array item: {buffer[pos:pos + 40]!r}")
+                    eof = True
+                    continue
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            yield item
+            pos, state = end, ','
+        elif state == '[':
+            if buffer[pos] != '[':
+                raise ValueError("Expected a JSON array")
+            pos, state = pos + 1, ']?'
+        elif buffer[pos] == ']':
+            return
+        elif state == ',' and buffer[pos] == ',':
+            pos, state = pos + 1, 'item'
+        else:
+            raise ValueError(f"Unexpected '{buffer[pos]}' in JSON array")
+
+
+def _iter_channel_rows(archive, names, folder):
+    """
+    Yields (id, contents, attachments) for one channel folder,
+    from messages.json (current format) or messages.csv (older packages).
+    """
+    if folder + 'messages.json' in names:
+        try:
+            with archive.open(folder + 'messages.json') as raw:
+                for row in _iter_json_array(raw):
+                    if isinstance(row, dict):
+                        yield row.get('ID'), row.get('Contents') or '', row.get('Attachments') or ''
+        except ValueError as e:
+            logger.warning(f"Data package: {folder}messages.json is damaged, stopped reading it ({e})")
+    elif folder + 'messages.csv' in names:
+        with archive.open(folder + 'messages.csv') as raw:
+            reader = csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8', newline=''))
+            for row in reader:
+                yield row.get('ID'), row.get('Contents') or '', row.get('Attachments') or ''
+
+
+def list_channels(path):
+    """
+    Returns a list of channel info dicts found in the package:
+    {id, name, type, guild_id, is_dm}.
+    """
+    with zipfile.ZipFile(path) as archive:
+        return list(_iter_channel_info(archive))
+
+
+def _iter_channel_info(archive):
+    dirs = _channel_dirs(archive)
+    index = {}
+    for name in archive.namelist():
+        if name.endswith('messages/index.json'):
+            index = _read_json(archive, name) or {}
+            break
+
+    for channel_id, folder in dirs.items():
+        meta = _read_json(archive, folder + 'channel.json') or {}
+        guild = meta.get('guild') or {}
+        channel_type = meta.get('type')
+        yield {
+            'id': channel_id,
+            'name': index.get(channel_id) or meta.get('name') or '',
+            'type': channel_type,
+            'guild_id': str(guild['id']) if guild.get('id') else None,
+            'is_dm': channel_type in DM_CHANNEL_TYPES or (channel_type is None and not guild),
+            'folder': folder,
+        }
+
+
+def iter_package_messages(path, is_dm=None, guild_id=None, channel_ids=None, content_query=None):
+    """
+    Yields one list of MessageRecords per channel, like
+    MessageDeleter.iter_scan does per window.
+
+    is_dm: True for DMs/group DMs only, False for server channels only, None for both.
+    guild_id: only channels of this server.
+    channel_ids: only these channels.
+    content_query: case-insensitive substring the content must contain.
+    """
+    wanted = {str(c) for c in channel_ids} if channel_ids else None
+    query = content_query.lower() if content_query else None
+
+    with zipfile.ZipFile(path) as archive:
+        names = set(archive.namelist())
+        for info in _iter_channel_info(archive):
+            if wanted is not None and info['id'] not in wanted:
+                continue
+            if is_dm is not None and info['is_dm'] != is_dm:
+                continue
+            if guild_id and info['guild_id'] != str(guild_id):
+                continue
+
+            batch = []
+            for message_id, contents, attachments in _iter_channel_rows(archive, names, info['folder']):
+                if not message_id:
+                    continue
+                if query and query not in contents.lower():
+                    continue
+                batch.append(MessageRecord(message_id, info['id'], contents, bool(str(attachments).strip())))
+            if batch:
+                yield batch
@@ -1,109 +1,505 @@
-from api_client import DiscordClient
-from utils import print_info, print_success, print_warning, print_error, logger, get_snowflake_time
-import time
-import random
-from tqdm import tqdm
+import logging
+import queue
+import threading
+from datetime import datetime, timezone
+from api_client import DiscordClient, HISTORY_PAGE_SIZE, content_matches, message_has
+from journal import JobJournal, KIND_DATA_PACKAGE
+from message_index import MessageIndex
+from permissions import can_bulk_delete
+from planner import plan_deletion, split_deletes, bulk_candidates
+from records import MessageRecord
+from utils import print_info, print_success, print_warning, print_error, logger, audit, datetime_to_snowflake
+
+# Steps yielded by MessageDeleter._scan_steps
+_SEARCH = "search"
+_HISTORY = "history"
+_WINDOW = "window"
+
+# Where a DM scan enumerates messages from: the search API (25 of your
+# messages per request) or the channel history (100 messages of anyone per
+# request, filtered locally). "auto" picks whichever needs fewer requests.
+SOURCE_AUTO = "auto"
+SOURCE_SEARCH = "search"
+SOURCE_HISTORY = "history"
+SCAN_SOURCES = (SOURCE_AUTO, SOURCE_SEARCH, SOURCE_HISTORY)
 
 class MessageDeleter:
-    def __init__(self, client: DiscordClient):
+    PAGE_SIZE = 25  # hits per search page
+    WINDOW_MAX_RESULTS = 500  # split a search window above this many hits
+    MIN_WINDOW = 1 << 22  # one millisecond of snowflakes; never split below this
+
+    def __init__(self, client: DiscordClient, journal: JobJournal = None, index: MessageIndex = None):
         self.client = client
+        self.journal = journal
+        self.index = index
+        self.last_scan_complete = False
+        self.last_scan_reanchors = 0  # times the last scan restarted paging after results shifted
+        self.last_scan_source = None
+        # Recent messages go out as bulk deletes where the account has Manage Messages
+        self.bulk_delete = True
+        self._bulk_allowed = {}  # channel ID -> bulk delete permitted
+        self._guild_access = {}  # guild ID -> (guild, member) objects for permission checks
 
-    def scan_messages(self, context_id, is_dm=False, author_id=None, content_query=None, progress_callback=None):
+    def scan_messages(self, context_id, is_dm=False, author_id=None, content_query=None, progress_callback=None,
+                      min_id=None, max_id=None, job_id=None, has=None, channel_ids=None, source=SOURCE_AUTO):
         """
         Scans for messages matching criteria.
         context_id: guild_id if server, channel_id if DM.
+        min_id / max_id: only return messages between these IDs (exclusive),
+        see utils.date_bounds for dates.
+        job_id: journal job to checkpoint scanned pages into.
+        has / channel_ids: search filters (attachment kinds, server channels).
+        Every filter is sent to the search API, so non-matching messages are
+        never paged through.
+        source: for DMs, SOURCE_SEARCH, SOURCE_HISTORY or SOURCE_AUTO (see
+        SCAN_SOURCES). Servers are always searched.
         """
         all_messages = []
-        offset = 0
-        total_results = 0
+        for window in self.iter_scan(context_id, is_dm, author_id, content_query, progress_callback,
+                                     min_id=min_id, max_id=max_id, job_id=job_id, has=has, channel_ids=channel_ids,
+                                     source=source):
+            all_messages.extend(window)
+        return all_messages
+
+    def iter_scan(self, context_id, is_dm=False, author_id=None, content_query=None, progress_callback=None,
+                  min_id=None, max_id=None, job_id=None, has=None, channel_ids=None, source=SOURCE_AUTO):
+        """
+        Generator behind scan_messages. Yields the messages of one completed
+        search window at a time, newest window first.
+
+        The ID range is walked as snowflake windows. A window whose
+        total_results exceeds WINDOW_MAX_RESULTS is split in half, so offsets
+        stay small and the search offset ceiling is never reached. Windows
+        never overlap, so messages of a yielded window can be deleted while
+        the next one is paged without shifting its offsets.
+
+        A DM read from its channel history yields one window per page instead.
+        """
+        steps = self._scan_steps(context_id, is_dm, author_id, content_query, progress_callback,
+                                 min_id, max_id, job_id, has, channel_ids, source)
+        reply = None
+        while True:
+            try:
+                kind, payload = steps.send(reply)
+            except StopIteration:
+                return
+            if kind == _SEARCH:
+                reply = self.client.search_messages(**payload)
+            elif kind == _HISTORY:
+                reply = self.client.get_channel_messages(**payload)
+            else:
+                reply = None
+                yield payload
+
+    async def aiter_scan(self, context_id, is_dm=False, author_id=None, content_query=None, progress_callback=None,
+                         min_id=None, max_id=None, job_id=None, has=None, channel_ids=None, source=SOURCE_AUTO):
+        """
+        iter_scan for an AsyncDiscordClient: same windows, awaited requests.
+        """
+        steps = self._scan_steps(context_id, is_dm, author_id, content_query, progress_callback,
+                                 min_id, max_id, job_id, has, channel_ids, source)
+        reply = None
+        while True:
+            try:
+                kind, payload = steps.send(reply)
+            except StopIteration:
+                return
+            if kind == _SEARCH:
+                reply = await self.client.search_messages(**payload)
+            elif kind == _HISTORY:
+                reply = await self.client.get_channel_messages(**payload)
+            else:
+                reply = None
+                yield payload
+
+    def _scan_steps(self, context_id, is_dm, author_id, content_query, progress_callback, min_id, max_id, job_id,
+                    has, channel_ids, source=SOURCE_AUTO):
+        """
+        The window walk itself, without any I/O. Yields (_SEARCH, kwargs) or
+        (_HISTORY, kwargs) and expects the API result to be sent back, and
+        (_WINDOW, messages) when a window is done. iter_scan and aiter_scan drive it.
+        """
+        source = source or SOURCE_AUTO
+        if source not in SCAN_SOURCES:
+            raise ValueError(f"Unknown scan source '{source}', expected one of {', '.join(SCAN_SOURCES)}")
+        found = 0
+        complete = True
+        self.last_scan_reanchors = 0
+        
+        # For servers we pass guild_id, for DMs we pass channel_id
+        guild_id = context_id if not is_dm else None
+        channel_id = context_id if is_dm else None
         
+        # Author ID defaults to self if not provided (safety default)
+        target_author = author_id if author_id else self.client.user_id
+
+        first_page = None
+        if not is_dm:
+            if source == SOURCE_HISTORY:
+                print_warning("Channel history is only read for DMs, searching this server instead.")
+            source = SOURCE_SEARCH
+        elif source == SOURCE_AUTO:
+            source, first_page = yield from self._choose_source(channel_id, target_author, content_query,
+                                                                min_id, max_id, has)
+        self.last_scan_source = source
+
+        if source == SOURCE_HISTORY:
+            found, complete = yield from self._history_steps(channel_id, target_author, content_query,
+                                                             progress_callback, min_id, max_id, job_id, has)
+            self._scan_finished(job_id, complete, found)
+            return
+
         print_info("Scanning for messages... (This relies on Discord Search API)")
         
-        while True:
-            # For servers we pass guild_id, for DMs we pass channel_id
-            guild_id = context_id if not is_dm else None
-            channel_id = context_id if is_dm else None
-            
-            # Author ID defaults to self if not provided (safety default)
-            target_author = author_id if author_id else self.client.user_id
-            
-            data = self.client.search_messages(
-                guild_id=guild_id, 
-                channel_id=channel_id, 
-                author_id=target_author,
-                content=content_query,
-                offset=offset
-            )
+        # Stack of (lower, upper) snowflake bounds; the newest window is on top
+        upper = int(max_id) if max_id else self._scan_ceiling(context_id)
+        lower = int(min_id) if min_id else 0
+        windows = [(lower, upper)]
+        
+        while windows and complete:
+            lower, upper = windows.pop()
+            offset = 0
+            window_messages = []
+            # Windows are disjoint, so IDs only need to be unique within one
+            seen = set()
+            anchor_total = None  # total_results when paging from `upper` started
+            floor = None  # oldest hit ID of the previous page
             
-            if not data:
-                break
+            while True:
+                if first_page is not None:
+                    # The source probe already fetched the first page of the whole range
+                    data, first_page = first_page, None
+                else:
+                    data = yield _SEARCH, dict(
+                        guild_id=guild_id, 
+                        channel_id=channel_id, 
+                        author_id=target_author,
+                        content=content_query,
+                        min_id=lower or None,
+                        max_id=upper,
+                        offset=offset,
+                        has=has,
+                        channel_ids=channel_ids
+                    )
                 
-            messages = data.get('messages', [])
-            total_results = data.get('total_results', 0)
-            
-            if not messages:
-                break
+                if not data:
+                    complete = False
+                    break
+                    
+                messages = data.get('messages', [])
+                total_results = data.get('total_results', 0)
+                
+                if anchor_total is None and total_results > self.WINDOW_MAX_RESULTS and upper - lower > self.MIN_WINDOW:
+                    # Too many hits to page through cheaply: split the window.
+                    # min_id/max_id are exclusive, so the older half ends at mid + 1.
+                    mid = (lower + upper) // 2
+                    windows.append((lower, mid + 1))
+                    windows.append((mid, upper))
+                    break
+                
+                if not messages:
+                    break
+                    
+                # 'messages' in search result is a list of lists (conversations). 
+                # We flatten and filter for our target message; context
+                # messages around a hit are flagged hit=False.
+                hits = [msg for group in messages for msg in group if msg.get('hit', True)]
+                page_ids = [int(msg['id']) for msg in hits]
+                
+                # Pages come newest first, so a page must start below the last
+                # one and the total must not move. Otherwise messages were sent
+                # or deleted under the offset cursor and offsets now skip or repeat.
+                drift = anchor_total is not None and (
+                    total_results != anchor_total or (floor is not None and page_ids and max(page_ids) >= floor)
+                )
                 
-            # 'messages' in search result is a list of lists (conversations). 
-            # We flatten and filter for our target message.
-            for group in messages:
-                for msg in group:
-                    # Double check author to be sure
-                    if msg['author']['id'] == target_author:
-                        # Append minimal data needed
-                        all_messages.append({
-                            'id': msg['id'],
-                            'channel_id': msg['channel_id'],
-                            'content': msg['content'],
-                            'timestamp': msg['timestamp'],
-                            'attachments': len(msg['attachments']) > 0
-                        })
-            
-            print_info(f"Found {len(all_messages)} messages so far...")
-            
-            if progress_callback:
-                # Send the batch of newly found messages to the GUI
-                # extracting just the new ones from this batch
                 new_batch = []
-                for group in messages:
-                     for msg in group:
-                        if msg['author']['id'] == target_author:
-                             new_batch.append({
-                                'id': msg['id'],
-                                'channel_id': msg['channel_id'],
-                                'content': msg['content'],
-                                'timestamp': msg['timestamp'],
-                                'attachments': len(msg['attachments']) > 0
-                             })
-                if new_batch:
-                    progress_callback(new_batch)
-            
-            offset += 25
-            if offset >= total_results:
-                break
-            
-            # Search API has strict rate limits, take it slow
-            time.sleep(1.5) 
+                for msg, message_id in zip(hits, page_ids):
+                    # Double check author to be sure, and never return an ID twice
+                    if msg['author']['id'] == target_author and message_id not in seen:
+                        seen.add(message_id)
+                        # Keep only a compact record of what is needed
+                        new_batch.append(MessageRecord.from_api(msg))
+                window_messages.extend(new_batch)
+                found += len(new_batch)
+                
+                if job_id is not None and self.journal:
+                    self.journal.record_scanned(job_id, new_batch)
+                
+                print_info(f"Found {found} messages so far...")
+                
+                if progress_callback:
+                    # Send the batch of newly found messages to the GUI
+                    if new_batch:
+                        progress_callback(new_batch)
+                
+                if drift:
+                    # Re-anchor below the last consistent page with max_id and
+                    # page from offset 0 again; repeats are dropped by `seen`
+                    logger.info(f"Search results shifted, re-anchoring below message {floor or upper}")
+                    self.last_scan_reanchors += 1
+                    upper = floor or upper
+                    offset = 0
+                    anchor_total = None
+                    continue
+                
+                if anchor_total is None:
+                    anchor_total = total_results
+                if page_ids:
+                    floor = min(page_ids)
+                offset += self.PAGE_SIZE
+                if offset >= total_results:
+                    break
             
+            if window_messages:
+                yield _WINDOW, window_messages
+
+        self._scan_finished(job_id, complete, found)
+
+    def _scan_ceiling(self, context_id):
+        """
+        Default upper bound of a search walk: just above any message sent
+        so far. A replayed client (cassette.replay_client) supplies the
+        recorded bound instead, so the replay asks for the recorded windows.
+        """
+        recorded = self.client.scan_ceilings.get(str(context_id))
+        return recorded or datetime_to_snowflake(datetime.now(timezone.utc)) + (1 << 22)
+
+    def _scan_finished(self, job_id, complete, found):
+        self.last_scan_complete = complete
+        if not complete:
+            print_warning(f"Scan stopped early after {found} messages, some matches may be missing.")
+            return
+        if job_id is not None and self.journal:
+            self.journal.mark_scan_complete(job_id)
+
+        print_success(f"Scan complete. Found {found} total messages matches.")
+
+    def _choose_source(self, channel_id, author_id, content_query, min_id, max_id, has):
+        """
+        Step generator picking SOURCE_SEARCH or SOURCE_HISTORY for a DM,
+        whichever needs fewer requests: a search page holds PAGE_SIZE of your
+        matches, a history page HISTORY_PAGE_SIZE messages of anyone. Two
+        search probes give both counts. Returns (source, first_page), where
+        first_page is the probe's first search page of your matches, reused
+        by the search walk.
+        """
+        mine = yield _SEARCH, dict(channel_id=channel_id, author_id=author_id, content=content_query,
+                                   min_id=min_id, max_id=max_id, has=has)
+        if not mine:
+            # Search unavailable (e.g. a DM Discord has not indexed yet); history always works
+            print_info("Search is unavailable for this DM, reading its channel history instead.")
+            return SOURCE_HISTORY, None
+        own_total = mine.get('total_results', 0)
+        if own_total <= self.PAGE_SIZE:
+            return SOURCE_SEARCH, mine
+        everyone = yield _SEARCH, dict(channel_id=channel_id, min_id=min_id, max_id=max_id)
+        if not everyone:
+            return SOURCE_SEARCH, mine
+        total = max(everyone.get('total_results', 0), own_total)
+
+        search_requests = -(-own_total // self.PAGE_SIZE)
+        history_requests = -(-total // HISTORY_PAGE_SIZE)
+        if history_requests < search_requests:
+            print_info(f"{own_total} of {total} messages match, reading the channel history "
+                       f"(~{history_requests} requests instead of ~{search_requests} searches)...")
+            return SOURCE_HISTORY, None
+        return SOURCE_SEARCH, mine
+
+    def _history_steps(self, channel_id, author_id, content_query, progress_callback, min_id, max_id, job_id, has):
+        """
+        Step generator walking a channel's history from max_id down to
+        min_id, HISTORY_PAGE_SIZE messages per request. Author, content and
+        'has' filters are applied locally, matching words and links the way
+        search does; each page's matches are one window. Returns (found, complete).
+        """
+        print_info("Scanning for messages... (reading the channel history)")
+        found = 0
+        lower = int(min_id) if min_id else 0
+        before = max_id
+
+        while True:
+            page = yield _HISTORY, dict(channel_id=channel_id, before=before, limit=HISTORY_PAGE_SIZE)
+            if page is None:
+                return found, False
+
+            batch = []
+            reached_lower = False
+            for msg in page:
+                # Pages come newest first
+                if int(msg['id']) <= lower:
+                    reached_lower = True
+                    break
+                if msg['author']['id'] != author_id:
+                    continue
+                if content_query and not content_matches(msg.get('content'), content_query):
+                    continue
+                if has and not all(message_has(msg, kind) for kind in has):
+                    continue
+                batch.append(MessageRecord.from_api(msg))
+            found += len(batch)
+
+            if batch:
+                if job_id is not None and self.journal:
+                    self.journal.record_scanned(job_id, batch)
+                print_info(f"Found {found} messages so far...")
+                if progress_callback:
+                    progress_callback(batch)
+                yield _WINDOW, batch
+
+            if reached_lower or len(page) < HISTORY_PAGE_SIZE:
+                return found, True
+            before = page[-1]['id']
+
+    def index_scan(self, context_id, is_dm=False, progress_callback=None):
+        """
+        Incremental scan into the local index. Only messages newer than the
+        context's high-water mark are requested (via min_id); filters are then
+        applied locally with MessageIndex.query. Returns the number of new messages.
+
+        When the index is due a re-sync (MessageIndex.needs_resync) the whole
+        context is scanned instead, and indexed messages it no longer
+        returns are pruned.
+        """
+        author_id = self.client.user_id
+        high_water = self._index_start(author_id, context_id)
+        seen = set() if high_water is None else None
+        
+        fetched = 0
+        newest = high_water or 0
+        for window in self.iter_scan(context_id, is_dm, progress_callback=progress_callback, min_id=high_water):
+            self.index.add_messages(author_id, context_id, window)
+            fetched += len(window)
+            newest = max(newest, max(m.id for m in window))
+            if seen is not None:
+                seen.update(m.id for m in window)
+        
+        self._index_finish(author_id, context_id, newest, seen)
+        return fetched
+
+    async def index_scan_async(self, context_id, is_dm=False, progress_callback=None):
+        """
+        index_scan for an AsyncDiscordClient.
+        """
+        author_id = self.client.user_id
+        high_water = self._index_start(author_id, context_id)
+        seen = set() if high_water is None else None
+        
+        fetched = 0
+        newest = high_water or 0
+        async for window in self.aiter_scan(context_id, is_dm, progress_callback=progress_callback, min_id=high_water):
+            self.index.add_messages(author_id, context_id, window)
+            fetched += len(window)
+            newest = max(newest, max(m.id for m in window))
+            if seen is not None:
+                seen.update(m.id for m in window)
+        
+        self._index_finish(author_id, context_id, newest, seen)
+        return fetched
+
+    def _index_start(self, author_id, context_id):
+        """
+        Returns the min_id of the next index scan: the high-water mark, or
+        None for a full scan when the context is due a re-sync.
+        """
+        if self.index.needs_resync(author_id, context_id):
+            return None
+        high_water = self.index.high_water(author_id, context_id)
+        if high_water:
+            print_info(f"Context already indexed up to message {high_water}, fetching newer messages only...")
+        return high_water
+
+    def _index_finish(self, author_id, context_id, newest, seen=None):
+        # Only a complete scan may move the mark, otherwise older gaps would be skipped next time
+        if not self.last_scan_complete:
+            return
+        if seen is not None:
+            pruned = self.index.prune(author_id, context_id, seen)
+            if pruned:
+                print_info(f"Removed {pruned} messages from the index that were deleted elsewhere.")
+        if newest:
+            self.index.set_high_water(author_id, context_id, newest, full=seen is not None)
+
+    def scan_data_package(self, path, is_dm=None, guild_id=None, channel_ids=None, content_query=None,
+                          progress_callback=None, job_id=None):
+        """
+        Scans a Discord data package zip instead of the search API.
+        The package only contains the account's own messages, across every
+        DM and server at once, so no API calls are needed to enumerate them.
+        """
+        from data_package import iter_package_messages
+        all_messages = []
+        print_info(f"Reading messages from data package {path}...")
+        
+        for batch in iter_package_messages(path, is_dm=is_dm, guild_id=guild_id, channel_ids=channel_ids,
+                                           content_query=content_query):
+            all_messages.extend(batch)
+            if job_id is not None and self.journal:
+                self.journal.record_scanned(job_id, batch)
+            if progress_callback:
+                progress_callback(batch)
+        
+        # The package is read in full, so a resumed job never needs to rescan it
+        if job_id is not None and self.journal:
+            self.journal.mark_scan_complete(job_id)
+        
         print_success(f"Scan complete. Found {len(all_messages)} total messages matches.")
         return all_messages
 
-    def execute_deletion(self, messages, dry_run=False, progress_callback=None, skip_confirm=False):
+    def resume_job(self, job_id, progress_callback=None):
+        """
+        Picks up a journaled job: finishes its scan below the saved cursor if it
+        was interrupted, then returns every message not yet deleted.
+        """
+        job = self.journal.get_job(job_id) if self.journal else None
+        if not job:
+            print_error(f"Job {job_id} not found.")
+            return []
+
+        if not job['scan_complete'] and job['kind'] == KIND_DATA_PACKAGE:
+            # Data package job; its filters are not journaled, so it cannot be rescanned here
+            print_warning(f"Job {job_id}: data package scan did not finish, only recorded messages will be deleted.")
+        elif not job['scan_complete']:
+            print_info(f"Job {job_id}: resuming scan below message {job['scan_cursor']}...")
+            filters = job['filters']
+            self.scan_messages(
+                context_id=job['context_id'],
+                is_dm=bool(job['is_dm']),
+                content_query=job['content_query'],
+                progress_callback=progress_callback,
+                min_id=filters.get('min_id'),
+                max_id=job['scan_cursor'] or filters.get('max_id'),
+                has=filters.get('has'),
+                channel_ids=filters.get('channel_ids'),
+                source=filters.get('source', SOURCE_AUTO),
+                job_id=job_id
+            )
+
+        remaining = self.journal.remaining_messages(job_id)
+        print_info(f"Job {job_id}: {len(remaining)} messages left to delete.")
+        return remaining
+
+    def execute_deletion(self, messages, dry_run=False, progress_callback=None, skip_confirm=False, job_id=None):
         """
         Deletes the provided list of messages.
+        job_id: journal job to record each delete result into.
+        With dry_run nothing is deleted; the deletes are planned instead and
+        the DeletionPlan (see planner.py) is returned.
         """
         if not messages:
             print_warning("No messages to delete.")
             return
 
         print_info(f"Preparing to delete {len(messages)} messages...")
-        print_info(f"dry_run={dry_run}, skip_confirm={skip_confirm}")  # DEBUG
         
         if dry_run:
             print_info("DRY RUN MODE: No messages will be deleted.")
             for msg in messages[:5]: # Show first 5
-                print(f"[DRY RUN] Would delete: {msg['content'][:50]}... (ID: {msg['id']})")
-            return
+                print(f"[DRY RUN] Would delete: {msg.preview()} (ID: {msg.id})")
+            plan = self.plan_deletes(messages)
+            for line in plan.summary_lines():
+                print_info(line)
+            return plan
 
         if not skip_confirm:
             confirm = input(f"Are you SURE you want to delete {len(messages)} messages? This cannot be undone. (y/N): ")
@@ -114,30 +510,320 @@ class MessageDeleter:
         deleted_count = 0
         failed_count = 0
         
-        # Determine delay based on quantity to stay safe
-        # More messages = slower per message to avoid pattern detection
-        base_delay = 1.2 
-        
-        print_info(f"Starting deletion of {len(messages)} messages...")  # DEBUG
-        
-        for i, msg in enumerate(messages):
-            print_info(f"Deleting message {i+1}/{len(messages)}: {msg['id']} in channel {msg['channel_id']}")  # DEBUG
-            success = self.client.delete_message(msg['channel_id'], msg['id'])
-            
-            if success:
-                deleted_count += 1
-                logger.info(f"Deleted message {msg['id']} in channel {msg['channel_id']}")
-                print_info(f"  -> SUCCESS")  # DEBUG
-            else:
-                failed_count += 1
-                print_warning(f"  -> FAILED")  # DEBUG
-            
-            if progress_callback:
-                progress_callback(deleted_count, failed_count, len(messages))
-            
-            # Variable delay to look human
-            time.sleep(base_delay + random.uniform(0.1, 0.8))
+        # Pacing is handled by the client's rate limit scheduler, which
+        # releases each delete as soon as its bucket allows.
+        print_info(f"Starting deletion of {len(messages)} messages...")
         
-        print_success(f"Deletion complete.")
+        for unit in self._delete_units(messages):
+            for success in self._delete_unit(unit, job_id):
+                if success:
+                    deleted_count += 1
+                else:
+                    failed_count += 1
+
+                if progress_callback:
+                    progress_callback(deleted_count, failed_count, len(messages))
+
+        return self._finish_deletion(job_id, deleted_count, failed_count)
+
+    def _finish_deletion(self, job_id, deleted_count, failed_count):
+        """
+        Closes the journal job if nothing is left and prints the summary
+        shared by every delete loop. Returns (deleted_count, failed_count).
+        """
+        if job_id is not None and self.journal:
+            self.journal.finish_if_done(job_id)
+
+        print_success("Deletion complete.")
         print_info(f"Deleted: {deleted_count}")
         print_info(f"Failed: {failed_count}")
+        return deleted_count, failed_count
+
+    def plan_deletes(self, messages):
+        """
+        Estimates the deletes of messages without sending any (see
+        planner.py), after checking where bulk deletes are allowed.
+        """
+        bulk_channels = self._drive(self._bulk_steps(messages))
+        return plan_deletion(messages, self.client, bulk_channels=bulk_channels)
+
+    # --- Bulk deletes ---
+
+    def _bulk_steps(self, messages):
+        """
+        Step generator returning the IDs of the channels where messages can
+        be bulk deleted. Yields (client method name, args) for the channel,
+        guild and member lookups, each made once per deleter.
+        """
+        allowed = set()
+        if not self.bulk_delete:
+            return allowed
+        for channel_id in bulk_candidates(messages):
+            if channel_id not in self._bulk_allowed:
+                self._bulk_allowed[channel_id] = yield from self._bulk_check(channel_id)
+            if self._bulk_allowed[channel_id]:
+                allowed.add(channel_id)
+        return allowed
+
+    def _bulk_check(self, channel_id):
+        channel = yield 'get_channel', (channel_id,)
+        guild_id = channel.get('guild_id') if channel else None
+        if not guild_id:
+            return False  # DMs have no bulk delete
+        if guild_id not in self._guild_access:
+            guild = yield 'get_guild', (guild_id,)
+            member = yield 'get_guild_member', (guild_id, self.client.user_id)
+            self._guild_access[guild_id] = (guild, member)
+        guild, member = self._guild_access[guild_id]
+        if not guild or not member:
+            return False
+        allowed = can_bulk_delete(guild, member, channel, self.client.user_id)
+        if allowed:
+            print_info(f"Manage Messages in channel {channel_id}: recent messages are deleted in bulk.")
+        return allowed
+
+    def _drive(self, steps):
+        """
+        Runs a lookup step generator with the blocking client.
+        """
+        reply = None
+        while True:
+            try:
+                name, args = steps.send(reply)
+            except StopIteration as done:
+                return done.value
+            reply = getattr(self.client, name)(*args)
+
+    async def _adrive(self, steps):
+        reply = None
+        while True:
+            try:
+                name, args = steps.send(reply)
+            except StopIteration as done:
+                return done.value
+            reply = await getattr(self.client, name)(*args)
+
+    def _delete_units(self, messages):
+        """
+        messages split into single and bulk deletes (planner.split_deletes).
+        """
+        return split_deletes(messages, self._drive(self._bulk_steps(messages)))
+
+    async def _delete_units_async(self, messages):
+        return split_deletes(messages, await self._adrive(self._bulk_steps(messages)))
+
+    def _delete_unit(self, unit, job_id=None):
+        """
+        Deletes one unit of split_deletes, yielding each message's result.
+        If a bulk delete is refused its messages are deleted one by one, and
+        that channel gets no more bulk deletes: its later units go out one
+        message at a time.
+        """
+        if len(unit) > 1 and self._bulk_allowed.get(unit[0].channel_id, True):
+            if self.client.bulk_delete_messages(unit[0].channel_id, [msg.id for msg in unit]):
+                self._record_bulk_delete(unit, job_id)
+                yield from [True] * len(unit)
+                return
+            self._bulk_refused(unit[0].channel_id)
+        for msg in unit:
+            yield self._delete_one(msg, job_id)
+
+    async def _delete_unit_async(self, unit, job_id=None):
+        if len(unit) > 1 and self._bulk_allowed.get(unit[0].channel_id, True):
+            if await self.client.bulk_delete_messages(unit[0].channel_id, [msg.id for msg in unit]):
+                self._record_bulk_delete(unit, job_id)
+                for _ in unit:
+                    yield True
+                return
+            self._bulk_refused(unit[0].channel_id)
+        for msg in unit:
+            yield await self._delete_one_async(msg, job_id)
+
+    def _bulk_refused(self, channel_id):
+        self._bulk_allowed[channel_id] = False
+        print_warning(f"Bulk delete refused in channel {channel_id}, deleting one by one.")
+
+    def _record_bulk_delete(self, unit, job_id):
+        ids = [msg.id for msg in unit]
+        for msg in unit:
+            audit("delete", logging.INFO, id=msg.id, channel=msg.channel_id, ok=True, job=job_id, bulk=True)
+        if self.index:
+            self.index.remove(ids)
+        if job_id is not None and self.journal:
+            self.journal.record_results(job_id, ids, True)
+
+    # --- Single deletes ---
+
+    def _delete_one(self, msg, job_id=None):
+        """
+        Deletes one message and records the result. Returns True on success.
+        """
+        success = self.client.delete_message(msg.channel_id, msg.id)
+        self._record_delete(msg, success, job_id)
+        return success
+
+    async def _delete_one_async(self, msg, job_id=None):
+        success = await self.client.delete_message(msg.channel_id, msg.id)
+        self._record_delete(msg, success, job_id)
+        return success
+
+    def _record_delete(self, msg, success, job_id):
+        # Per-message outcomes go to the compact audit log, not the console
+        audit("delete", logging.INFO if success else logging.WARNING,
+              id=msg.id, channel=msg.channel_id, ok=success, job=job_id)
+        if success and self.index:
+            self.index.remove([msg.id])
+        
+        if job_id is not None and self.journal:
+            self.journal.record_result(job_id, msg.id, success)
+
+    async def delete_messages_async(self, messages, progress_callback=None, job_id=None):
+        """
+        Deletes the given messages through an AsyncDiscordClient, without a
+        confirmation prompt. Cancelling the task stops between two requests
+        (or during a rate limit wait); finished deletes are already journaled.
+        Returns (deleted_count, failed_count).
+        """
+        deleted_count = 0
+        failed_count = 0
+        print_info(f"Starting deletion of {len(messages)} messages...")
+        
+        for unit in await self._delete_units_async(messages):
+            async for success in self._delete_unit_async(unit, job_id):
+                if success:
+                    deleted_count += 1
+                else:
+                    failed_count += 1
+
+                if progress_callback:
+                    progress_callback(deleted_count, failed_count, len(messages))
+        
+        return self._finish_deletion(job_id, deleted_count, failed_count)
+
+    def run_pipeline(self, context_id, is_dm=False, author_id=None, content_query=None, lookahead=2,
+                     progress_callback=None, scan_callback=None, job_id=None, min_id=None, max_id=None,
+                     has=None, channel_ids=None, source=SOURCE_AUTO):
+        """
+        Scans and deletes at the same time: a scanner thread feeds completed
+        search windows through a bounded queue while this thread deletes them.
+        Only `lookahead` windows are held in memory, and total time is roughly
+        max(scan, delete) instead of their sum.
+
+        There is no confirmation prompt, the caller must confirm beforehand.
+        progress_callback(deleted, failed, scanned_so_far) is called per delete,
+        scan_callback(batch) per search page. min_id, max_id, has,
+        channel_ids and source are as for scan_messages.
+        """
+        pages = queue.Queue(maxsize=max(1, lookahead))
+        stop = threading.Event()
+        scan_error = []
+        
+        def put(item):
+            # Give up if the consumer has stopped, rather than block forever
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.2)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def scan():
+            try:
+                for window in self.iter_scan(context_id, is_dm, author_id, content_query, scan_callback,
+                                             min_id=min_id, max_id=max_id, job_id=job_id, has=has,
+                                             channel_ids=channel_ids, source=source):
+                    if not put(window):
+                        return
+            except Exception as e:
+                scan_error.append(e)
+            finally:
+                put(None)
+        
+        scanner = threading.Thread(target=scan, daemon=True)
+        scanner.start()
+        
+        scanned = 0
+        deleted_count = 0
+        failed_count = 0
+        print_info("Streaming mode: deleting messages as they are scanned...")
+        
+        try:
+            while True:
+                window = pages.get()
+                if window is None:
+                    break
+                scanned += len(window)
+                for unit in self._delete_units(window):
+                    for success in self._delete_unit(unit, job_id):
+                        if success:
+                            deleted_count += 1
+                        else:
+                            failed_count += 1
+
+                        if progress_callback:
+                            progress_callback(deleted_count, failed_count, scanned)
+        finally:
+            stop.set()
+        
+        scanner.join()
+        if scan_error:
+            raise scan_error[0]
+        
+        return self._finish_deletion(job_id, deleted_count, failed_count)
+
+    async def run_pipeline_async(self, context_id, is_dm=False, author_id=None, content_query=None, lookahead=2,
+                                 progress_callback=None, scan_callback=None, job_id=None, min_id=None, max_id=None,
+                                 has=None, channel_ids=None, source=SOURCE_AUTO):
+        """
+        run_pipeline for an AsyncDiscordClient. The scanner is a task in the
+        same event loop instead of a thread, feeding an asyncio.Queue of
+        `lookahead` windows. Cancelling the caller also cancels the scanner.
+        """
+        import asyncio
+        pages = asyncio.Queue(maxsize=max(1, lookahead))
+        
+        async def scan():
+            try:
+                async for window in self.aiter_scan(context_id, is_dm, author_id, content_query, scan_callback,
+                                                    min_id=min_id, max_id=max_id, job_id=job_id, has=has,
+                                                    channel_ids=channel_ids, source=source):
+                    await pages.put(window)
+            except asyncio.CancelledError:
+                # The consumer is gone, nobody would read the end marker
+                raise
+            except Exception:
+                await pages.put(None)
+                raise
+            await pages.put(None)
+        
+        scanner = asyncio.ensure_future(scan())
+        
+        scanned = 0
+        deleted_count = 0
+        failed_count = 0
+        print_info("Streaming mode: deleting messages as they are scanned...")
+        
+        try:
+            while True:
+                window = await pages.get()
+                if window is None:
+                    break
+                scanned += len(window)
+                for unit in await self._delete_units_async(window):
+                    async for success in self._delete_unit_async(unit, job_id):
+                        if success:
+                            deleted_count += 1
+                        else:
+                            failed_count += 1
+
+                        if progress_callback:
+                            progress_callback(deleted_count, failed_count, scanned)
+        finally:
+            if not scanner.done():
+                scanner.cancel()
+        
+        # Re-raises a scan error, like the threaded pipeline
+        await scanner
+        
+        return self._finish_deletion(job_id, deleted_count, failed_count)
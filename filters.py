@@ -0,0 +1,264 @@
+"""
+Local filter expressions over scanned messages.
+
+An expression is a list of terms, all of which must match:
+
+    hello "good morning"     content contains every keyword (case-insensitive)
+    -spam                    content does not contain the keyword
+    re:^lol  -re:"\\d{4}"     content matches / does not match a regex
+    after:2021-01-01         sent on or after a date (anything parse_date reads)
+    before:2022-06-01        sent before a date
+    channel:123,456          only these channels
+    -channel:789             not these channels
+    has:attachment           with attachments (-has:attachment: without)
+    len>20  len<=200         content length bounds (>, >=, <, <=, =)
+
+compile_filter() turns it into a MessageFilter once. Scans are evaluated
+over RecordColumns, a column-wise copy of the records: each rule narrows a
+list of candidate rows, cheapest rules (ID ranges, channel sets) first, and
+keywords are found with str.find over one joined text instead of once per
+message. Re-filtering a large scan therefore needs no API calls or index
+queries.
+"""
+
+import re
+import shlex
+from array import array
+from bisect import bisect_right
+from utils import parse_date, date_bounds
+
+# Joins contents in RecordColumns.text; a keyword can never contain it
+_SEPARATOR = '\x00'
+
+_LENGTH_TERM = re.compile(r'^len(>=|<=|>|<|=)(\d+)$')
+
+
+class RecordColumns:
+    """
+    MessageRecords stored column by column. Append-only: extend() adds
+    newly scanned records without rebuilding what is there.
+    """
+    def __init__(self, records=()):
+        self.records = []
+        self.ids = array('q')
+        self.channel_ids = array('q')
+        self.lengths = array('l')
+        self.attachments = bytearray()
+        self.lower = []  # lowercase contents, for keyword rules
+        self._text = None  # joined lowercase contents, built on first keyword
+        self._offsets = None  # start of each row in _text
+        self.extend(records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def extend(self, records):
+        records = list(records)
+        self.records.extend(records)
+        self.ids.extend(r.id for r in records)
+        self.channel_ids.extend(r.channel_id for r in records)
+        self.lengths.extend(len(r.content) for r in records)
+        self.attachments.extend(r.attachments for r in records)
+        self.lower.extend(r.content.lower() for r in records)
+        self._text = None
+
+    def text(self):
+        """
+        All lowercase contents joined by _SEPARATOR, with each row's start offset.
+        """
+        if self._text is None:
+            self._text = _SEPARATOR.join(self.lower)
+            offsets = array('q')
+            position = 0
+            for content in self.lower:
+                offsets.append(position)
+                position += len(content) + 1
+            self._offsets = offsets
+        return self._text, self._offsets
+
+
+class _Rule:
+    __slots__ = ('cost', 'select', 'match')
+
+    def __init__(self, cost, select, match):
+        self.cost = cost  # relative cost per row, cheap rules run first
+        self.select = select  # (columns, rows) -> rows that pass
+        self.match = match  # record -> bool
+
+
+class MessageFilter:
+    """
+    A compiled filter expression. An empty expression matches everything.
+    """
+    def __init__(self, expression, rules):
+        self.expression = expression
+        self.rules = sorted(rules, key=lambda rule: rule.cost)
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def select(self, columns):
+        """
+        Returns the indices of matching rows of a RecordColumns, in order.
+        """
+        rows = range(len(columns))
+        for rule in self.rules:
+            if not rows:
+                break
+            rows = rule.select(columns, rows)
+        return list(rows)
+
+    def apply(self, records):
+        """
+        Returns the matching records of a list.
+        """
+        if not self.rules:
+            return list(records)
+        columns = records if isinstance(records, RecordColumns) else RecordColumns(records)
+        return [columns.records[i] for i in self.select(columns)]
+
+    def matches(self, record):
+        """
+        Tests a single record, for messages arriving one by one.
+        """
+        return all(rule.match(record) for rule in self.rules)
+
+
+def compile_filter(expression):
+    """
+    Parses a filter expression (see the module docstring) into a
+    MessageFilter. Raises ValueError on a term it cannot read.
+    """
+    try:
+        terms = shlex.split(expression or '', posix=True)
+    except ValueError as e:
+        raise ValueError(f"Filter: {e}") from None
+
+    rules = []
+    for term in terms:
+        negate = term.startswith('-') and len(term) > 1
+        body = term[1:] if negate else term
+        key, _, value = body.partition(':')
+        key = key.lower()
+
+        if value and key in ('re', 'regex'):
+            try:
+                pattern = re.compile(value, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"Filter '{term}': bad regex ({e})") from None
+            rules.append(_regex_rule(pattern, negate))
+        elif value and key in ('after', 'before'):
+            if negate:
+                raise ValueError(f"Filter '{term}': use the other bound instead of negating a date")
+            date = parse_date(value)
+            if date is None:
+                raise ValueError(f"Filter '{term}': invalid date, use YYYY-MM-DD")
+            min_id, max_id = date_bounds(date, None) if key == 'after' else date_bounds(None, date)
+            rules.append(_id_range_rule(min_id, max_id))
+        elif value and key == 'channel':
+            ids = value.replace(',', ' ').split()
+            if not ids or not all(i.isdigit() for i in ids):
+                raise ValueError(f"Filter '{term}': channel IDs must be numeric")
+            rules.append(_channel_rule({int(i) for i in ids}, negate))
+        elif value and key == 'has':
+            if value.lower() not in ('attachment', 'attachments', 'file'):
+                raise ValueError(f"Filter '{term}': only has:attachment is known locally")
+            rules.append(_attachment_rule(not negate))
+        elif _LENGTH_TERM.match(body):
+            if negate:
+                raise ValueError(f"Filter '{term}': use the opposite comparison instead of negating")
+            operator, number = _LENGTH_TERM.match(body).groups()
+            rules.append(_length_rule(operator, int(number)))
+        elif body:
+            rules.append(_keyword_rule(body.lower(), negate))
+    return MessageFilter(expression, rules)
+
+
+# --- Rules ---
+
+def _id_range_rule(min_id, max_id):
+    low = min_id if min_id is not None else -1
+    high = max_id if max_id is not None else 1 << 63
+
+    def select(columns, rows):
+        ids = columns.ids
+        return [i for i in rows if low < ids[i] < high]
+    return _Rule(1, select, lambda record: low < record.id < high)
+
+
+def _channel_rule(channel_ids, negate):
+    def select(columns, rows):
+        channels = columns.channel_ids
+        if negate:
+            return [i for i in rows if channels[i] not in channel_ids]
+        return [i for i in rows if channels[i] in channel_ids]
+    return _Rule(1, select, lambda record: (record.channel_id in channel_ids) != negate)
+
+
+def _attachment_rule(wanted):
+    def select(columns, rows):
+        attachments = columns.attachments
+        return [i for i in rows if bool(attachments[i]) == wanted]
+    return _Rule(1, select, lambda record: record.attachments == wanted)
+
+
+_OPERATORS = {
+    '>': lambda a, b: a > b, '>=': lambda a, b: a >= b,
+    '<': lambda a, b: a < b, '<=': lambda a, b: a <= b, '=': lambda a, b: a == b,
+}
+
+
+def _length_rule(operator, number):
+    compare = _OPERATORS[operator]
+    # Turned into a closed range so the per-row test is plain comparisons
+    low, high = {'>': (number + 1, None), '>=': (number, None), '<': (0, number - 1),
+                 '<=': (0, number), '=': (number, number)}[operator]
+    high = high if high is not None else 1 << 62
+
+    def select(columns, rows):
+        lengths = columns.lengths
+        return [i for i in rows if low <= lengths[i] <= high]
+    return _Rule(1, select, lambda record: compare(len(record.content), number))
+
+
+def _keyword_rule(word, negate):
+    def select(columns, rows):
+        lower = columns.lower
+        # A rare word is found faster in the joined text than row by row
+        if len(rows) * 4 >= len(columns):
+            text, offsets = columns.text()
+            if text.count(word) * 8 < len(rows):
+                found = _rows_containing(text, offsets, word)
+                if negate:
+                    return [i for i in rows if i not in found]
+                return sorted(found) if isinstance(rows, range) else [i for i in rows if i in found]
+        if negate:
+            return [i for i in rows if word not in lower[i]]
+        return [i for i in rows if word in lower[i]]
+    return _Rule(2, select, lambda record: (word in record.content.lower()) != negate)
+
+
+def _rows_containing(text, offsets, word):
+    """
+    Rows whose content contains word: one str.find pass over the joined
+    text, skipping to the next row after each hit.
+    """
+    found = set()
+    find = text.find
+    position = find(word)
+    while position != -1:
+        row = bisect_right(offsets, position) - 1
+        found.add(row)
+        if row + 1 >= len(offsets):
+            break
+        position = find(word, offsets[row + 1])
+    return found
+
+
+def _regex_rule(pattern, negate):
+    search = pattern.search
+
+    def select(columns, rows):
+        records = columns.records
+        return [i for i in rows if (search(records[i].content) is None) == negate]
+    return _Rule(3, select, lambda record: (search(record.content) is None) == negate)
@@ -3,11 +3,13 @@ import threading
 import time
 from datetime import datetime
 from tkinter import messagebox
-from api_client import DiscordClient
+from api_client import DiscordClient, SEARCH_HAS_FILTERS
 from deleter import MessageDeleter
-from utils import parse_date
-from token_finder import find_tokens, validate_token_format
-import webbrowser
+from filters import compile_filter, RecordColumns
+from journal import JobJournal
+from message_index import MessageIndex
+from ui_events import UIEventQueue
+from utils import parse_date, date_bounds
 
 # --- CONSTANTS & THEME ---
 THEME_COLORS = {
@@ -26,9 +28,203 @@ THEME_COLORS = {
     "scroll_bg": "#2b2d31"      # Scroll container
 }
 
+# Worker threads hand results to the Tk loop through a queue drained on this timer
+UI_DRAIN_INTERVAL_MS = 50
+UI_FRAME_BUDGET_MS = 8
+METRICS_REFRESH_MS = 1000
+
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("dark-blue")
 
+class SelectionState:
+    """
+    Selection flags for scanned messages, one byte per row (by position in
+    scanned_messages). Kept apart from the widgets so select-all/none stays
+    a single bytearray operation even at 100k rows.
+    """
+    def __init__(self):
+        self.flags = bytearray()
+        self.count = 0
+
+    def __len__(self):
+        return len(self.flags)
+
+    def extend(self, n):
+        self.flags.extend(bytes(n))
+
+    def clear(self):
+        self.flags = bytearray()
+        self.count = 0
+
+    def is_selected(self, index):
+        return self.flags[index] == 1
+
+    def set(self, index, selected):
+        if self.flags[index] != selected:
+            self.flags[index] = int(selected)
+            self.count += 1 if selected else -1
+
+    def select_all(self):
+        self.flags = bytearray(b'\x01') * len(self.flags)
+        self.count = len(self.flags)
+
+    def select_none(self):
+        self.flags = bytearray(len(self.flags))
+        self.count = 0
+
+    def indices(self):
+        """Yields the selected row indices in order."""
+        i = self.flags.find(1)
+        while i != -1:
+            yield i
+            i = self.flags.find(1, i + 1)
+
+
+class VirtualTimeline(ctk.CTkFrame):
+    """
+    Message list that only builds widgets for the rows on screen. A fixed
+    pool of row cards is re-filled as the list scrolls, so the widget count
+    does not grow with the number of scanned messages.
+    """
+    ROW_HEIGHT = 72
+    ROW_PAD = 4
+    PREVIEW_CHARS = 160
+
+    def __init__(self, master, on_selection_change=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.messages = []
+        self.selection = SelectionState()
+        self.on_selection_change = on_selection_change
+        self.username = 'You'
+        self.top = 0
+        self.rows = []
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent", corner_radius=0)
+        self.viewport.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.viewport.bind("<Configure>", lambda e: self._on_resize())
+        self.bind_all("<MouseWheel>", self._on_wheel, add="+")
+        self.bind_all("<Button-4>", self._on_wheel, add="+")
+        self.bind_all("<Button-5>", self._on_wheel, add="+")
+
+    # --- Data ---
+
+    def set_data(self, messages, selection):
+        self.messages = messages
+        self.selection = selection
+        self.top = 0
+        self.refresh()
+
+    def refresh(self):
+        """Re-renders the visible rows (call after the data or selection changes)."""
+        self._clamp_top()
+        self._render()
+
+    # --- Scrolling ---
+
+    def _visible_count(self):
+        return max(1, self.viewport.winfo_height() // self.ROW_HEIGHT)
+
+    def _clamp_top(self):
+        max_top = max(0, len(self.messages) - self._visible_count())
+        self.top = min(max(0, self.top), max_top)
+
+    def scroll_to(self, top):
+        self.top = int(top)
+        self.refresh()
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(float(args[0]) * len(self.messages))
+        elif action == "scroll":
+            amount = int(args[0])
+            step = self._visible_count() if args[1] == "pages" else 1
+            self.scroll_to(self.top + amount * step)
+
+    def _on_wheel(self, event):
+        # Wheel events are bound app-wide, only react when over the list
+        if not str(event.widget).startswith(str(self)):
+            return
+        if event.num == 4:
+            steps = -1
+        elif event.num == 5:
+            steps = 1
+        else:
+            # Windows reports multiples of 120, macOS small deltas
+            steps = -event.delta // 120 if abs(event.delta) >= 120 else -event.delta
+        self.scroll_to(self.top + steps * 3)
+
+    # --- Rendering ---
+
+    def _on_resize(self):
+        needed = self._visible_count() + 1
+        while len(self.rows) < needed:
+            self.rows.append(self._build_row())
+        self.refresh()
+
+    def _build_row(self):
+        card = ctk.CTkFrame(self.viewport, fg_color=THEME_COLORS["bg_card"], corner_radius=6,
+                            height=self.ROW_HEIGHT - self.ROW_PAD)
+        card.pack_propagate(False)
+        row = {'card': card, 'index': None, 'var': ctk.BooleanVar(value=False)}
+
+        def on_toggle():
+            if row['index'] is not None:
+                self.selection.set(row['index'], row['var'].get())
+                if self.on_selection_change:
+                    self.on_selection_change()
+
+        chk = ctk.CTkCheckBox(card, text="", width=24, variable=row['var'], command=on_toggle, checkbox_width=20, checkbox_height=20, corner_radius=4, border_color="gray")
+        chk.pack(side="left", padx=(12, 5), pady=12)
+
+        info_frame = ctk.CTkFrame(card, fg_color="transparent")
+        info_frame.pack(side="left", fill="both", expand=True, padx=5, pady=5)
+
+        top_row = ctk.CTkFrame(info_frame, fg_color="transparent")
+        top_row.pack(fill="x")
+        row['author'] = ctk.CTkLabel(top_row, text="", font=ctk.CTkFont(weight="bold"), text_color=THEME_COLORS["text_main"])
+        row['author'].pack(side="left")
+        row['time'] = ctk.CTkLabel(top_row, text="", font=ctk.CTkFont(size=11), text_color=THEME_COLORS["text_muted"])
+        row['time'].pack(side="left", padx=10)
+        row['id'] = ctk.CTkLabel(top_row, text="", font=ctk.CTkFont(family="Consolas", size=10), text_color="#555")
+        row['id'].pack(side="right", padx=5)
+
+        # Fixed-height rows, so content is a single-line preview
+        row['content'] = ctk.CTkLabel(info_frame, text="", anchor="w", justify="left", text_color="#dcddde")
+        row['content'].pack(fill="x", pady=(2, 0))
+        return row
+
+    def _render(self):
+        total = len(self.messages)
+        visible = self._visible_count()
+
+        for k, row in enumerate(self.rows):
+            index = self.top + k
+            if index >= total or k > visible:
+                row['index'] = None
+                row['card'].place_forget()
+                continue
+
+            msg = self.messages[index]
+            row['index'] = index
+            row['var'].set(self.selection.is_selected(index))
+            row['author'].configure(text=self.username)
+            row['time'].configure(text=msg.created_at.strftime("%B %d, %Y at %I:%M %p"))
+            row['id'].configure(text=f"ID: {msg.id}")
+            row['content'].configure(text=msg.preview(self.PREVIEW_CHARS))
+
+            row['card'].place(relx=0.01, y=k * self.ROW_HEIGHT, relwidth=0.98)
+
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + visible) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+
 class DiscordToolGUI(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -45,16 +241,29 @@ class DiscordToolGUI(ctk.CTk):
         # State Variables
         self.client = None
         self.deleter = None
+        self.async_deleter = None  # drives scans/deletes on self.runner so STOP is immediate
+        self.runner = None  # event loop thread, started at login
+        self.current_task = None
         self.token = ""
-        self.scanned_messages = []
+        self.scanned_messages = []  # rows shown in the timeline
+        self.all_messages = []  # the whole last scan, scanned_messages is a refined view of it
+        self.scan_columns = None  # RecordColumns of all_messages, built on the first refine
         self.is_scanning = False
-        self.selected_ids = set()
-        self.check_vars = {} 
+        self.selection = SelectionState()
         self.logged_in_user = None  # Store logged in user info 
+        self.journal = JobJournal()
+        self.index = MessageIndex()
+        self.current_job_id = None  # journal job being resumed, None for a fresh scan
+        self.scan_job = None  # create_job arguments of the last scan, used when it is deleted from
+        self._metrics_job = None  # pending metrics_label refresh
+
+        self.events = UIEventQueue(frame_budget_ms=UI_FRAME_BUDGET_MS)
 
         # --- INIT UI COMPONENTS ---
         self._init_sidebar()
         self._init_main_area()
+        self.after(UI_DRAIN_INTERVAL_MS, self._drain_ui_events)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def _init_sidebar(self):
         """Initialize the Sidebar (Left Panel)"""
@@ -130,6 +339,11 @@ class DiscordToolGUI(ctk.CTk):
         self.status_text = ctk.CTkLabel(self.lbl_status, text="Not Logged In", text_color=THEME_COLORS["text_muted"])
         self.status_text.pack(side="left", pady=8)
 
+        # Request metrics of both clients (filled in after login)
+        self.metrics_label = ctk.CTkLabel(self.sidebar_frame, text="", text_color=THEME_COLORS["text_muted"],
+                                          font=("Arial", 10), justify="left", anchor="w", wraplength=240)
+        self.metrics_label.grid(row=6, column=0, padx=20, pady=(0, 10), sticky="nw")
+
         # 3. Footer / About
         footer_label = ctk.CTkLabel(self.sidebar_frame, text="Designed for Discord Users", text_color=THEME_COLORS["text_muted"], font=("Arial", 10))
         footer_label.grid(row=7, column=0, padx=20, pady=20)
@@ -161,6 +375,14 @@ class DiscordToolGUI(ctk.CTk):
         self.entry_filter = ctk.CTkEntry(self.controls_frame, placeholder_text="Keyword Filter (Optional)", width=200, fg_color=THEME_COLORS["input_bg"], border_color="#1e1f22")
         self.entry_filter.grid(row=0, column=3, padx=10, pady=0)
 
+        # Date range (a local index query, or search bounds when search filters are set)
+        date_frame = ctk.CTkFrame(self.controls_frame, fg_color="transparent")
+        date_frame.grid(row=0, column=4, padx=(0, 10), pady=0)
+        self.entry_after = ctk.CTkEntry(date_frame, placeholder_text="After YYYY-MM-DD", width=120, fg_color=THEME_COLORS["input_bg"], border_color="#1e1f22")
+        self.entry_after.pack(side="left", padx=(0, 5))
+        self.entry_before = ctk.CTkEntry(date_frame, placeholder_text="Before YYYY-MM-DD", width=120, fg_color=THEME_COLORS["input_bg"], border_color="#1e1f22")
+        self.entry_before.pack(side="left")
+
         self.scan_btn = ctk.CTkButton(
             self.controls_frame, 
             text="SCAN MESSAGES", 
@@ -169,7 +391,33 @@ class DiscordToolGUI(ctk.CTk):
             hover_color=THEME_COLORS["success_hover"],
             font=ctk.CTkFont(weight="bold")
         )
-        self.scan_btn.grid(row=0, column=6, padx=20, pady=0)
+        self.scan_btn.grid(row=0, column=6, padx=(20, 10), pady=0)
+
+        self.resume_btn = ctk.CTkButton(
+            self.controls_frame, 
+            text="RESUME JOB", 
+            command=self.resume_last_job,
+            fg_color="#3b3d42", 
+            hover_color="#4e5058",
+            width=110
+        )
+        self.resume_btn.grid(row=0, column=7, padx=(0, 20), pady=0)
+
+        # Search filters, sent to the search API instead of filtering locally
+        search_frame = ctk.CTkFrame(self.controls_frame, fg_color="transparent")
+        search_frame.grid(row=1, column=2, columnspan=3, sticky="w", padx=5, pady=(0, 15))
+        self.has_var = ctk.StringVar(value="Any content")
+        self.menu_has = ctk.CTkOptionMenu(search_frame, variable=self.has_var, values=["Any content"] + [f"Has {h}" for h in SEARCH_HAS_FILTERS], width=140, fg_color=THEME_COLORS["input_bg"], button_color="#3b3d42", button_hover_color="#4e5058")
+        self.menu_has.pack(side="left", padx=(0, 10))
+        self.entry_channels = ctk.CTkEntry(search_frame, placeholder_text="Server channel IDs (comma separated, optional)", width=320, fg_color=THEME_COLORS["input_bg"], border_color="#1e1f22")
+        self.entry_channels.pack(side="left")
+
+        # Refines the scanned messages locally, without new API calls
+        self.entry_refine = ctk.CTkEntry(search_frame, placeholder_text='Refine: words -spam re:... after:YYYY-MM-DD channel:ID has:attachment len>20', width=420, fg_color=THEME_COLORS["input_bg"], border_color="#1e1f22")
+        self.entry_refine.pack(side="left", padx=(10, 5))
+        self.entry_refine.bind("<Return>", self.apply_refine)
+        self.refine_btn = ctk.CTkButton(search_frame, text="REFINE", width=70, fg_color="#4e5058", hover_color="#6d6f78", command=self.apply_refine)
+        self.refine_btn.pack(side="left")
 
         # 2. Stats & Selection Bar
         self.stats_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent", height=40)
@@ -193,10 +441,10 @@ class DiscordToolGUI(ctk.CTk):
         self.progress_bar.set(0)
         self.progress_bar.grid_remove()
 
-        # 4. Timeline Scroll Area
-        self.timeline_scroll = ctk.CTkScrollableFrame(self.main_frame, corner_radius=0, fg_color="transparent", label_text="")
-        self.timeline_scroll.grid(row=3, column=0, sticky="nsew", padx=0, pady=(5, 0))
-        self.timeline_scroll.grid_columnconfigure(0, weight=1)
+        # 4. Timeline (virtualized, only visible rows have widgets)
+        self.timeline = VirtualTimeline(self.main_frame, on_selection_change=self.update_delete_btn, corner_radius=0, fg_color="transparent")
+        self.timeline.grid(row=3, column=0, sticky="nsew", padx=0, pady=(5, 0))
+        self.timeline.set_data(self.scanned_messages, self.selection)
 
         # 5. Bottom Action Bar
         self.action_bar = ctk.CTkFrame(self.main_frame, height=60, fg_color=THEME_COLORS["bg_sidebar"], corner_radius=0)
@@ -218,8 +466,32 @@ class DiscordToolGUI(ctk.CTk):
         )
         self.del_btn.pack(side="right", padx=20, pady=12)
 
+        self.stop_btn = ctk.CTkButton(
+            self.action_bar, 
+            text="STOP", 
+            command=self.stop_task, 
+            state="disabled", 
+            fg_color="#3b3d42", 
+            hover_color="#4e5058",
+            width=80,
+            height=35
+        )
+        self.stop_btn.pack(side="right", pady=12)
+
     # --- LOGIC METHODS ---
 
+    def _drain_ui_events(self):
+        try:
+            self.events.drain(self.update_timeline, self._on_progress_event)
+        finally:
+            self.after(UI_DRAIN_INTERVAL_MS, self._drain_ui_events)
+
+    def _on_progress_event(self, kind, *values):
+        if kind == "delete":
+            self.update_status(*values)
+        elif kind == "scan":
+            self.log(f"Scanning... {values[0]} new messages fetched")
+
     def log(self, text):
         # Update status bar instead of text box
         time_str = datetime.now().strftime('%H:%M:%S')
@@ -240,9 +512,9 @@ class DiscordToolGUI(ctk.CTk):
             if user:
                 self.client = client
                 self.token = token
-                self.after(0, lambda: self.on_login_success(user))
+                self.events.post_call(self.on_login_success, user)
             else:
-                self.after(0, self.on_login_fail)
+                self.events.post_call(self.on_login_fail)
 
         threading.Thread(target=run_auth, daemon=True).start()
 
@@ -251,8 +523,25 @@ class DiscordToolGUI(ctk.CTk):
         self.status_indicator.configure(text="●", text_color=THEME_COLORS["success"])
         self.status_text.configure(text=f"{user['username']}#{user['discriminator']}", text_color=THEME_COLORS["text_main"])
         self.logged_in_user = user  # Store user info
-        self.deleter = MessageDeleter(self.client)
+        self.timeline.username = user['username']
+        self.deleter = MessageDeleter(self.client, self.journal, self.index)
+        # Same account and rate limit buckets as the blocking client.
+        # aiohttp/asyncio are loaded here rather than before the window shows.
+        from async_client import AsyncDiscordClient, LoopThread
+        if self.runner is None:
+            self.runner = LoopThread()
+        async_client = AsyncDiscordClient(self.token, scheduler=self.client.scheduler, metrics=self.client.metrics,
+                                          retry_policy=self.client.retry_policy, breaker=self.client.breaker)
+        async_client.user_id = self.client.user_id
+        self.async_deleter = MessageDeleter(async_client, self.journal, self.index)
         self.log(f"Logged in as {user['username']}")
+        if self._metrics_job:
+            self.after_cancel(self._metrics_job)
+        self._refresh_metrics()
+
+    def _refresh_metrics(self):
+        self.metrics_label.configure(text=self.client.metrics.summary_line().replace(" | ", "\n"))
+        self._metrics_job = self.after(METRICS_REFRESH_MS, self._refresh_metrics)
 
     def on_login_fail(self):
         self.btn_login.configure(state="normal", text="Login")
@@ -266,11 +555,12 @@ class DiscordToolGUI(ctk.CTk):
         
         def run_search():
             try:
+                from token_finder import find_tokens
                 tokens = find_tokens()
-                self.after(0, lambda: self.on_tokens_found(tokens))
+                self.events.post_call(self.on_tokens_found, tokens)
             except Exception as e:
-                self.after(0, lambda: self.log(f"Error: {e}"))
-                self.after(0, lambda: self.btn_auto_token.configure(state="normal", text="Auto-Find"))
+                self.events.post_call(self.log, f"Error: {e}")
+                self.events.post_call(self.btn_auto_token.configure, state="normal", text="Auto-Find")
 
         threading.Thread(target=run_search, daemon=True).start()
 
@@ -321,51 +611,6 @@ class DiscordToolGUI(ctk.CTk):
             ctk.CTkLabel(card, text=token[:20]+"...", text_color=THEME_COLORS["text_muted"]).pack(side="left", padx=5)
             ctk.CTkButton(card, text="Select", width=80, command=lambda t=token, s=source: select(t, s), fg_color=THEME_COLORS["primary"]).pack(side="right", padx=10)
 
-    def add_message_card(self, msg):
-        # Modern Message Card
-        card = ctk.CTkFrame(self.timeline_scroll, fg_color=THEME_COLORS["bg_card"], corner_radius=6)
-        card.pack(fill="x", pady=4, padx=10)
-
-        # Left: Checkbox
-        var = ctk.BooleanVar(value=False)
-        self.check_vars[msg['id']] = var
-        
-        def on_toggle():
-            if var.get(): self.selected_ids.add(msg['id'])
-            else: self.selected_ids.discard(msg['id'])
-            self.update_delete_btn()
-
-        chk = ctk.CTkCheckBox(card, text="", width=24, variable=var, command=on_toggle, checkbox_width=20, checkbox_height=20, corner_radius=4, border_color="gray")
-        chk.pack(side="left", padx=(12, 5), pady=12)
-
-        # Info Container
-        info_frame = ctk.CTkFrame(card, fg_color="transparent")
-        info_frame.pack(side="left", fill="both", expand=True, padx=5, pady=5)
-
-        # Top Row: Author + Timestamp
-        top_row = ctk.CTkFrame(info_frame, fg_color="transparent")
-        top_row.pack(fill="x")
-        
-        tstamp = msg.get('timestamp', 'Unknown Date')
-        try:
-             # Try clean up timestamp
-             dt = datetime.strptime(tstamp, "%Y-%m-%dT%H:%M:%S.%f%z")
-             tstamp = dt.strftime("%B %d, %Y at %I:%M %p")
-        except: pass
-
-        # Get username from logged in user (since all messages are from token owner)
-        username = self.logged_in_user['username'] if self.logged_in_user else 'You'
-        ctk.CTkLabel(top_row, text=username, font=ctk.CTkFont(weight="bold"), text_color=THEME_COLORS["text_main"]).pack(side="left")
-        ctk.CTkLabel(top_row, text=tstamp, font=ctk.CTkFont(size=11), text_color=THEME_COLORS["text_muted"]).pack(side="left", padx=10)
-        ctk.CTkLabel(top_row, text=f"ID: {msg['id']}", font=ctk.CTkFont(family="Consolas", size=10), text_color="#555").pack(side="right", padx=5)
-
-        # Content
-        content = msg.get('content', '')
-        if not content and msg.get('attachments'):
-            content = "[Attachment]"
-        
-        ctk.CTkLabel(info_frame, text=content, anchor="w", justify="left", wraplength=700, text_color="#dcddde").pack(fill="x", pady=(2, 0))
-
     def start_scan(self):
         if not self.client:
             messagebox.showerror("Error", "Please login first")
@@ -376,6 +621,22 @@ class DiscordToolGUI(ctk.CTk):
             self.log("Invalid ID")
             return
 
+        after_str = self.entry_after.get().strip()
+        before_str = self.entry_before.get().strip()
+        after = parse_date(after_str) if after_str else None
+        before = parse_date(before_str) if before_str else None
+        if (after_str and not after) or (before_str and not before):
+            self.log("Invalid date, use YYYY-MM-DD")
+            return
+
+        is_dm = (self.radio_var.get() == 1)
+        has_choice = self.has_var.get()
+        has = [has_choice[len("Has "):]] if has_choice.startswith("Has ") else None
+        channel_ids = [c for c in self.entry_channels.get().replace(',', ' ').split()] if not is_dm else []
+        if not all(c.isdigit() for c in channel_ids):
+            self.log("Invalid channel ID")
+            return
+
         self.is_scanning = True
         self.scan_btn.configure(state="disabled", text="Scanning...")
         self.progress_bar.grid()
@@ -383,55 +644,151 @@ class DiscordToolGUI(ctk.CTk):
         self.progress_bar.start()
         
         # Clear
-        self.scanned_messages = []
-        for w in self.timeline_scroll.winfo_children(): w.destroy()
-        self.selected_ids.clear()
-        self.check_vars.clear()
-        self.update_delete_btn()
+        self.clear_timeline()
         
-        is_dm = (self.radio_var.get() == 1)
         query = self.entry_filter.get().strip() or None
+        min_id, max_id = date_bounds(after, before)
+        filters = {'min_id': min_id, 'max_id': max_id, 'has': has, 'channel_ids': channel_ids}
+        # The index holds whole contexts; a narrowed search goes straight to the API
+        pushdown = bool(has or channel_ids)
+        # The journal job is created when deleting, with only the selected messages
+        self.current_job_id = None
+        self.scan_job = (ctx_id, is_dm, query, filters if pushdown else None)
         
-        def run_scan():
+        import asyncio  # already loaded by async_client at login
+        async def run_scan():
             try:
-                def cb(new_msgs):
-                     self.after(0, lambda: self.update_timeline(new_msgs))
+                fetched = [0]
+                def cb(batch):
+                    fetched[0] += len(batch)
+                    self.events.post_progress("scan", fetched[0])
                 
-                msgs = self.deleter.scan_messages(
-                    context_id=ctx_id, 
-                    is_dm=is_dm, 
-                    content_query=query, 
-                    progress_callback=cb
-                )
-                self.after(0, lambda: self.on_scan_complete(msgs))
+                if pushdown:
+                    # Every filter is a search parameter; the hits are indexed too
+                    msgs = []
+                    async for window in self.async_deleter.aiter_scan(ctx_id, is_dm, content_query=query, progress_callback=cb, **filters):
+                        msgs.extend(window)
+                        self.index.add_messages(self.client.user_id, ctx_id, window)
+                else:
+                    # Fetch only what is newer than the last scan of this context,
+                    # then apply keyword/date filters as a local index query
+                    await self.async_deleter.index_scan_async(context_id=ctx_id, is_dm=is_dm, progress_callback=cb)
+                    msgs = self.index.query(self.client.user_id, ctx_id, keyword=query, after=after, before=before)
+                
+                self.events.post_rows(msgs)
+                self.events.post_call(self.on_scan_complete, msgs)
+            except asyncio.CancelledError:
+                self.events.post_call(self.log, "Scan stopped")
+                self.events.post_call(self.stop_loading_ui)
+                raise
             except Exception as e:
-                self.after(0, lambda: self.log(f"Scan failed: {e}"))
-                self.after(0, self.stop_loading_ui)
+                self.events.post_call(self.log, f"Scan failed: {e}")
+                self.events.post_call(self.stop_loading_ui)
 
-        threading.Thread(target=run_scan, daemon=True).start()
+        self.run_task(run_scan())
+
+    def clear_timeline(self):
+        self.scanned_messages = []
+        self.all_messages = []
+        self.scan_columns = None
+        self.selection = SelectionState()
+        self.timeline.set_data(self.scanned_messages, self.selection)
+        self.update_delete_btn()
+
+    def resume_last_job(self):
+        if not self.client:
+            messagebox.showerror("Error", "Please login first")
+            return
+        
+        jobs = self.journal.list_jobs()
+        if not jobs:
+            messagebox.showinfo("Resume", "No unfinished jobs.")
+            return
+        
+        job = jobs[0]
+        kind = "DM" if job['is_dm'] else "Server"
+        counts = job['counts']
+        summary = (f"Resume job #{job['job_id']} ({kind} {job['context_id']})?\n"
+                   f"Deleted: {counts.get('deleted', 0)}, Pending: {counts.get('pending', 0)}, Failed: {counts.get('failed', 0)}")
+        if not messagebox.askyesno("Resume Job", summary): return
+
+        self.is_scanning = True
+        self.scan_btn.configure(state="disabled", text="Resuming...")
+        self.progress_bar.grid()
+        self.progress_bar.configure(mode="indeterminate")
+        self.progress_bar.start()
+        self.clear_timeline()
+        self.current_job_id = job['job_id']
+        self.scan_job = (job['context_id'], bool(job['is_dm']), job['content_query'], job['filters'] or None)
+        
+        def run_resume():
+            try:
+                msgs = self.deleter.resume_job(job['job_id'])
+                self.events.post_rows(msgs)
+                self.events.post_call(self.on_scan_complete, msgs)
+            except Exception as e:
+                self.events.post_call(self.log, f"Resume failed: {e}")
+                self.events.post_call(self.stop_loading_ui)
+
+        threading.Thread(target=run_resume, daemon=True).start()
 
     def update_timeline(self, new_msgs):
         self.scanned_messages.extend(new_msgs)
+        self.selection.extend(len(new_msgs))
         self.lbl_count.configure(text=f"({len(self.scanned_messages)} found)")
-        for msg in new_msgs:
-            self.add_message_card(msg)
+        self.timeline.refresh()
     
     def on_scan_complete(self, msgs):
         self.stop_loading_ui()
+        self.all_messages = list(self.scanned_messages)
+        self.scan_columns = None
         if msgs:
             self.del_btn.configure(state="normal")
             self.log(f"Scan complete. Found {len(msgs)} messages.")
         else:
             self.log("No messages found.")
 
+    def apply_refine(self, event=None):
+        """
+        Shows the scanned messages matching the refine expression (all of
+        them if it is empty). Runs over the last scan only, no API calls.
+        Deleting journals only the refined rows that are selected.
+        """
+        if self.is_scanning:
+            self.log("Wait for the scan to finish before refining.")
+            return
+        try:
+            flt = compile_filter(self.entry_refine.get().strip())
+        except ValueError as e:
+            self.log(str(e))
+            return
+
+        start = time.perf_counter()
+        if self.scan_columns is None:
+            self.scan_columns = RecordColumns(self.all_messages)
+        rows = flt.select(self.scan_columns)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        self.scanned_messages = [self.all_messages[i] for i in rows]
+        self.selection = SelectionState()
+        self.selection.extend(len(self.scanned_messages))
+        self.timeline.set_data(self.scanned_messages, self.selection)
+        self.update_delete_btn()
+        if flt:
+            self.lbl_count.configure(text=f"({len(self.scanned_messages)} of {len(self.all_messages)} shown)")
+            self.log(f"Refined to {len(self.scanned_messages)} of {len(self.all_messages)} messages in {elapsed:.0f} ms.")
+        else:
+            self.lbl_count.configure(text=f"({len(self.all_messages)} found)")
+
     def stop_loading_ui(self):
         self.is_scanning = False
+        self.stop_btn.configure(state="disabled")
         self.scan_btn.configure(state="normal", text="SCAN MESSAGES")
         self.progress_bar.stop()
         self.progress_bar.grid_remove()
 
     def start_delete(self):
-        msgs_to_del = [m for m in self.scanned_messages if m['id'] in self.selected_ids]
+        msgs_to_del = [self.scanned_messages[i] for i in self.selection.indices()]
         if not msgs_to_del: return
 
         count = len(msgs_to_del)
@@ -441,47 +798,86 @@ class DiscordToolGUI(ctk.CTk):
         self.progress_bar.grid()
         self.progress_bar.configure(mode="determinate")
         self.progress_bar.set(0)
+        job_id = self.current_job_id
+        if job_id is None:
+            # Only what is deleted goes into the journal, so resuming never
+            # deletes messages the user left unselected
+            job_id = self.journal.create_job(*self.scan_job)
+            self.journal.record_scanned(job_id, msgs_to_del)
+            self.journal.mark_scan_complete(job_id)
+        else:
+            # Resumed job: rows left unselected or refined away are not deleted later either
+            chosen = {msg.id for msg in msgs_to_del}
+            self.journal.skip_messages(job_id, [msg.id for msg in self.all_messages if msg.id not in chosen])
+            self.current_job_id = None
         
-        def run_del():
+        import asyncio  # already loaded by async_client at login
+        async def run_del():
             def cb(deleted, failed, total):
-                self.after(0, lambda: self.update_status(deleted, failed, total))
+                self.events.post_progress("delete", deleted, failed, total)
             
-            self.deleter.execute_deletion(msgs_to_del, dry_run=False, progress_callback=cb, skip_confirm=True)
-            self.after(0, self.on_del_complete)
-
-        threading.Thread(target=run_del, daemon=True).start()
+            try:
+                await self.async_deleter.delete_messages_async(msgs_to_del, progress_callback=cb, job_id=job_id)
+            except asyncio.CancelledError:
+                self.events.post_call(self.on_del_complete, stopped=True)
+                raise
+            except Exception as e:
+                self.events.post_call(self.log, f"Deletion failed: {e}")
+            self.events.post_call(self.on_del_complete)
+
+        self.run_task(run_del())
+
+    def run_task(self, coro):
+        """
+        Runs a scan/delete coroutine on the event loop thread; STOP cancels it.
+        """
+        self.current_task = self.runner.submit(coro)
+        self.stop_btn.configure(state="normal")
+
+    def stop_task(self):
+        if self.current_task and not self.current_task.done():
+            self.current_task.cancel()
+        self.stop_btn.configure(state="disabled")
+
+    def on_close(self):
+        self.stop_task()
+        if self.runner:
+            try:
+                self.runner.submit(self.async_deleter.client.close()).result(timeout=5)
+            except Exception:
+                pass
+            self.runner.stop()
+        self.destroy()
 
     def update_status(self, d, f, t):
         if t > 0: self.progress_bar.set(d/t)
         self.log(f"Deleting: {d}/{t} (Failed: {f})")
 
-    def on_del_complete(self):
-        self.log("Deletion complete")
+    def on_del_complete(self, stopped=False):
+        self.stop_btn.configure(state="disabled")
+        self.log("Deletion stopped" if stopped else "Deletion complete")
         self.del_btn.configure(state="disabled", text="DELETE SELECTED")
         self.progress_bar.grid_remove()
         
         # Remove deleted from UI
         # Basic refresh: clear all and re-add remaining? Or just clear checked.
         # For now, just clearing selection
-        self.selected_ids.clear()
-        for var in self.check_vars.values(): var.set(False)
-        self.update_delete_btn()
+        self.select_none()
         
-        messagebox.showinfo("Done", "Deletion process finished.")
+        messagebox.showinfo("Done", "Deletion stopped." if stopped else "Deletion process finished.")
 
     def select_all(self):
-        for mid, var in self.check_vars.items():
-            var.set(True)
-            self.selected_ids.add(mid)
+        self.selection.select_all()
+        self.timeline.refresh()
         self.update_delete_btn()
 
     def select_none(self):
-        for var in self.check_vars.values(): var.set(False)
-        self.selected_ids.clear()
+        self.selection.select_none()
+        self.timeline.refresh()
         self.update_delete_btn()
 
     def update_delete_btn(self):
-        c = len(self.selected_ids)
+        c = self.selection.count
         if c > 0:
             self.del_btn.configure(state="normal", text=f"DELETE ({c})")
         else:
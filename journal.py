@@ -0,0 +1,212 @@
+import json
+import sqlite3
+import threading
+import time
+from records import MessageRecord
+from utils import logger
+
+DEFAULT_JOURNAL = "discord_jobs.db"
+
+# Per-message states. A 404 on delete is treated as success, same as the
+# deleter's accounting, so it is stored as 'deleted'.
+STATUS_PENDING = "pending"
+STATUS_DELETED = "deleted"
+STATUS_FAILED = "failed"
+# Left out of the delete by the user (e.g. unselected in the GUI)
+STATUS_SKIPPED = "skipped"
+
+# Where a job's messages come from: the API (context_id is a channel or
+# server ID) or a data package (context_id is the zip's path)
+KIND_API = "api"
+KIND_DATA_PACKAGE = "data_package"
+
+
+class JobJournal:
+    """
+    On-disk checkpoint of scan and deletion jobs, so an interrupted job can be
+    resumed without scanning again from the start.
+    """
+    def __init__(self, path=DEFAULT_JOURNAL):
+        self.path = path
+        self._lock = threading.Lock()
+        # Shared between the GUI thread and worker threads, guarded by _lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                context_id TEXT NOT NULL,
+                is_dm INTEGER NOT NULL,
+                content_query TEXT,
+                filters TEXT,
+                kind TEXT NOT NULL DEFAULT 'api',
+                created_at REAL NOT NULL,
+                scan_cursor INTEGER,
+                scan_complete INTEGER NOT NULL DEFAULT 0,
+                finished INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                job_id INTEGER NOT NULL,
+                id INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                content TEXT,
+                attachments INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pending',
+                PRIMARY KEY (job_id, id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_status ON messages (job_id, status);
+        """)
+        self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def create_job(self, context_id, is_dm, content_query=None, filters=None, kind=KIND_API):
+        """
+        Starts a new job and returns its ID.
+        filters: the other search filters of the scan (min_id, max_id, has,
+        channel_ids), kept so a resumed scan asks for exactly the same messages.
+        kind: KIND_API, or KIND_DATA_PACKAGE with the package path as context_id.
+        """
+        filters = {k: v for k, v in (filters or {}).items() if v}
+        with self._lock:
+            cur = self.conn.execute(
+                "INSERT INTO jobs (context_id, is_dm, content_query, filters, kind, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (str(context_id), int(bool(is_dm)), content_query, json.dumps(filters) if filters else None, kind,
+                 time.time())
+            )
+            self.conn.commit()
+            return cur.lastrowid
+
+    def get_job(self, job_id):
+        """
+        Returns the job row as a dict, or None if it does not exist.
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._job_dict(row) if row else None
+
+    def list_jobs(self, unfinished_only=True):
+        """
+        Returns jobs (newest first) with their per-status message counts.
+        """
+        query = "SELECT * FROM jobs"
+        if unfinished_only:
+            query += " WHERE finished = 0"
+        query += " ORDER BY job_id DESC"
+        with self._lock:
+            jobs = [self._job_dict(row) for row in self.conn.execute(query)]
+        for job in jobs:
+            job['counts'] = self.counts(job['job_id'])
+        return jobs
+
+    @staticmethod
+    def _job_dict(row):
+        job = dict(row)
+        job['filters'] = json.loads(job['filters']) if job.get('filters') else {}
+        return job
+
+    def counts(self, job_id):
+        """
+        Returns a {status: count} dict for a job.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT status, COUNT(*) FROM messages WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+    def record_scanned(self, job_id, messages):
+        """
+        Stores a page of scanned messages and advances the scan cursor to the
+        oldest ID seen, so a resumed scan continues below it.
+        """
+        if not messages:
+            return
+        rows = [(job_id, m.id, m.channel_id, m.content, int(m.attachments)) for m in messages]
+        oldest = min(row[1] for row in rows)
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO messages (job_id, id, channel_id, content, attachments) "
+                "VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self.conn.execute(
+                "UPDATE jobs SET scan_cursor = MIN(COALESCE(scan_cursor, ?), ?) WHERE job_id = ?",
+                (oldest, oldest, job_id)
+            )
+            self.conn.commit()
+
+    def mark_scan_complete(self, job_id):
+        with self._lock:
+            self.conn.execute("UPDATE jobs SET scan_complete = 1 WHERE job_id = ?", (job_id,))
+            self.conn.commit()
+
+    def record_result(self, job_id, message_id, success):
+        """
+        Records the outcome of one delete.
+        """
+        status = STATUS_DELETED if success else STATUS_FAILED
+        with self._lock:
+            self.conn.execute(
+                "UPDATE messages SET status = ? WHERE job_id = ? AND id = ?",
+                (status, job_id, int(message_id))
+            )
+            self.conn.commit()
+
+    def record_results(self, job_id, message_ids, success):
+        """
+        Records the same outcome for several deletes (a bulk delete) in one commit.
+        """
+        status = STATUS_DELETED if success else STATUS_FAILED
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE messages SET status = ? WHERE job_id = ? AND id = ?",
+                [(status, job_id, int(message_id)) for message_id in message_ids]
+            )
+            self.conn.commit()
+
+    def skip_messages(self, job_id, message_ids):
+        """
+        Marks messages that still need deleting as skipped: they are no
+        longer returned by remaining_messages and do not keep the job open.
+        """
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE messages SET status = ? WHERE job_id = ? AND id = ? AND status IN (?, ?)",
+                [(STATUS_SKIPPED, job_id, int(message_id), STATUS_PENDING, STATUS_FAILED) for message_id in message_ids]
+            )
+            self.conn.commit()
+
+    def remaining_messages(self, job_id):
+        """
+        Returns the messages of a job that still need deleting (pending or
+        failed), newest first, as MessageRecords.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, channel_id, content, attachments FROM messages "
+                "WHERE job_id = ? AND status IN (?, ?) ORDER BY id DESC",
+                (job_id, STATUS_PENDING, STATUS_FAILED)
+            ).fetchall()
+        return [MessageRecord(*row) for row in rows]
+
+    def finish_if_done(self, job_id):
+        """
+        Marks the job finished once its scan is complete and nothing is left
+        to delete. Returns True if the job is finished.
+        """
+        job = self.get_job(job_id)
+        if not job or not job['scan_complete']:
+            return False
+        counts = self.counts(job_id)
+        if counts.get(STATUS_PENDING, 0) or counts.get(STATUS_FAILED, 0):
+            return False
+        with self._lock:
+            self.conn.execute("UPDATE jobs SET finished = 1 WHERE job_id = ?", (job_id,))
+            self.conn.commit()
+        logger.info(f"Job {job_id} finished")
+        return True
@@ -1,13 +1,17 @@
+import os
 import sys
+import zipfile
 from auth import get_user_token
 from api_client import DiscordClient
 from deleter import MessageDeleter
+from journal import JobJournal, KIND_DATA_PACKAGE
+from batch import parse_contexts, load_contexts, run_batch
 from utils import print_info, print_warning, print_error, print_success, parse_date, logger
 
 def main():
     print_info("=== Discord Bulk Message Tool ===")
     print_warning("SAFETY NOTICE: Automating user accounts is against Discord TOS.")
-    print_warning("Use this tool at your own risk. Delays are implemented for safety.")
+    print_warning("Use this tool at your own risk. Requests are paced by Discord's rate limits.")
     print("")
     
     # 1. Auth
@@ -24,18 +28,35 @@ def main():
         
     print_success(f"Logged in as {user_info['username']}#{user_info['discriminator']}")
     
+    journal = JobJournal()
+    
     # 2. Configuration
     while True:
         print("\n--- Menu ---")
         print("1. Delete messages from a DM (Direct Message)")
         print("2. Delete messages from a specific Server (Guild)")
-        print("3. Exit")
+        print("3. Delete messages listed in a Discord data package (zip)")
+        print("4. Resume an unfinished job")
+        print("5. Batch: several DMs/Servers at once")
+        print("6. Exit")
         
-        choice = input("Select an option (1-3): ").strip()
+        choice = input("Select an option (1-6): ").strip()
         
-        if choice == '3':
+        if choice == '6':
             print("Exiting.")
             break
+        
+        if choice == '5':
+            delete_batch(client, journal)
+            continue
+        
+        if choice == '4':
+            resume_job(client, journal)
+            continue
+        
+        if choice == '3':
+            delete_from_package(client, journal)
+            continue
             
         context_id = input("Enter the ID (Channel ID for DM, Server ID for Server): ").strip()
         if not context_id.isdigit():
@@ -45,22 +66,41 @@ def main():
         content_query = input("Optional: Filter by keyword (press Enter to skip): ").strip()
         if not content_query: content_query = None
         
+        stream = input("Delete while scanning (streaming, skips the review step)? (y/N): ").strip().lower() == 'y'
+        if stream:
+            confirm = input("Every matching message will be deleted as soon as it is found. Continue? (y/N): ")
+            if confirm.lower() != 'y':
+                print_warning("Deletion cancelled.")
+                continue
+        
         # 3. Execution
-        deleter = MessageDeleter(client)
+        deleter = MessageDeleter(client, journal)
         is_dm = (choice == '1')
+        job_id = journal.create_job(context_id, is_dm, content_query)
+        print_info(f"Started job #{job_id} (resume it from the menu if interrupted).")
         
         try:
+            if stream:
+                deleter.run_pipeline(
+                    context_id=context_id,
+                    is_dm=is_dm,
+                    content_query=content_query,
+                    job_id=job_id
+                )
+                continue
+            
             messages = deleter.scan_messages(
                 context_id=context_id, 
                 is_dm=is_dm, 
-                content_query=content_query
+                content_query=content_query,
+                job_id=job_id
             )
             
             if not messages:
                 print_info("No messages found matching criteria.")
                 continue
                 
-            deleter.execute_deletion(messages)
+            deleter.execute_deletion(messages, job_id=job_id)
             
         except KeyboardInterrupt:
             print_warning("\nOperation cancelled by user.")
@@ -68,6 +108,112 @@ def main():
             print_error(f"An unexpected error occurred: {e}")
             logger.error(f"Main loop error: {e}", exc_info=True)
 
+def delete_from_package(client, journal):
+    """
+    Deletes messages enumerated from a data package instead of the search API.
+    """
+    path = input("Path to the data package zip: ").strip().strip('"')
+    if not os.path.isfile(path):
+        print_error("File not found.")
+        return
+    
+    print("1. All DMs and group DMs")
+    print("2. One Server (Guild)")
+    print("3. Everything in the package")
+    scope = input("Select scope (1-3): ").strip()
+    is_dm = None
+    guild_id = None
+    if scope == '1':
+        is_dm = True
+    elif scope == '2':
+        guild_id = input("Server ID: ").strip()
+        if not guild_id.isdigit():
+            print_error("Invalid ID format. Must be numeric.")
+            return
+    
+    content_query = input("Optional: Filter by keyword (press Enter to skip): ").strip() or None
+    
+    deleter = MessageDeleter(client, journal)
+    job_id = journal.create_job(path, bool(is_dm), content_query, kind=KIND_DATA_PACKAGE)
+    print_info(f"Started job #{job_id} (resume it from the menu if interrupted).")
+    try:
+        messages = deleter.scan_data_package(path, is_dm=is_dm, guild_id=guild_id, content_query=content_query,
+                                             job_id=job_id)
+        if not messages:
+            print_info("No messages found matching criteria.")
+            return
+        deleter.execute_deletion(messages, job_id=job_id)
+    except KeyboardInterrupt:
+        print_warning("\nOperation cancelled by user. Progress is saved in the job journal.")
+    except (OSError, zipfile.BadZipFile) as e:
+        print_error(f"Could not read data package: {e}")
+
+def delete_batch(client, journal):
+    """
+    Streams deletes for a list of DMs and servers concurrently.
+    """
+    print("Enter a file with one 'dm:<channel_id>' or 'guild:<server_id>' per line,")
+    source = input("or the entries themselves separated by commas: ").strip().strip('"')
+    try:
+        if os.path.isfile(source):
+            contexts = load_contexts(source)
+        else:
+            contexts = parse_contexts(source.split(','))
+    except (OSError, ValueError) as e:
+        print_error(str(e))
+        return
+    if not contexts:
+        print_error("No contexts given.")
+        return
+    
+    content_query = input("Optional: Filter by keyword (press Enter to skip): ").strip() or None
+    
+    print_info(f"{len(contexts)} contexts: " + ", ".join(f"{'dm' if is_dm else 'guild'}:{c}" for c, is_dm in contexts))
+    confirm = input("Every matching message in all of them will be deleted as soon as it is found. Continue? (y/N): ")
+    if confirm.lower() != 'y':
+        print_warning("Deletion cancelled.")
+        return
+    
+    try:
+        run_batch(client, contexts, journal, content_query=content_query)
+    except KeyboardInterrupt:
+        print_warning("\nOperation cancelled by user. Progress is saved in the job journal.")
+
+def resume_job(client, journal):
+    """
+    Lists unfinished jobs and continues the one the user picks.
+    """
+    jobs = journal.list_jobs()
+    if not jobs:
+        print_info("No unfinished jobs.")
+        return
+    
+    print("\n--- Unfinished Jobs ---")
+    for job in jobs:
+        kind = "DM" if job['is_dm'] else "Server"
+        if job['kind'] == KIND_DATA_PACKAGE:
+            kind = "Data package"
+        counts = job['counts']
+        scan_state = "scanned" if job['scan_complete'] else "scan interrupted"
+        print(f"#{job['job_id']}: {kind} {job['context_id']} ({scan_state}, "
+              f"deleted {counts.get('deleted', 0)}, pending {counts.get('pending', 0)}, failed {counts.get('failed', 0)})")
+    
+    job_id = input("Job number to resume: ").strip().lstrip('#')
+    if not job_id.isdigit():
+        print_error("Invalid job number.")
+        return
+    
+    deleter = MessageDeleter(client, journal)
+    try:
+        messages = deleter.resume_job(int(job_id))
+        if not messages:
+            journal.finish_if_done(int(job_id))
+            print_info("Nothing left to delete for this job.")
+            return
+        deleter.execute_deletion(messages, job_id=int(job_id))
+    except KeyboardInterrupt:
+        print_warning("\nOperation cancelled by user. Progress is saved in the job journal.")
+
 if __name__ == "__main__":
     try:
         main()
@@ -0,0 +1,188 @@
+import sqlite3
+import threading
+import time
+from records import MessageRecord
+from utils import logger, datetime_to_snowflake
+
+DEFAULT_INDEX = "discord_index.db"
+# A context whose last full scan is older than this is scanned in full again,
+# so messages deleted elsewhere (another tool, the Discord app) drop out
+RESYNC_AGE = 24 * 3600
+
+
+class MessageIndex:
+    """
+    Local SQLite index of scanned messages, keyed by message ID.
+
+    Each (author, context) pair keeps a high-water mark: the newest message
+    ID seen by a complete scan. A re-scan only asks the API for messages
+    above it, and keyword/date filters run as local queries. Every
+    RESYNC_AGE the whole context is scanned again and prune drops the
+    indexed messages it no longer returns.
+    """
+    def __init__(self, path=DEFAULT_INDEX):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY,
+                author_id TEXT NOT NULL,
+                context_id TEXT NOT NULL,
+                channel_id INTEGER NOT NULL,
+                content TEXT,
+                attachments INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_context ON messages (author_id, context_id, id);
+            CREATE TABLE IF NOT EXISTS scan_state (
+                author_id TEXT NOT NULL,
+                context_id TEXT NOT NULL,
+                high_water INTEGER NOT NULL,
+                -- Time of the last full (not incremental) scan
+                scanned_at REAL NOT NULL,
+                PRIMARY KEY (author_id, context_id)
+            );
+        """)
+        # Full-text index for keyword filters, when this SQLite build has FTS5
+        try:
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(content, content='messages', content_rowid='id')"
+            )
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+        self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def high_water(self, author_id, context_id):
+        """
+        Returns the newest message ID covered by a complete scan, or None.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT high_water FROM scan_state WHERE author_id = ? AND context_id = ?",
+                (str(author_id), str(context_id))
+            ).fetchone()
+        return row[0] if row else None
+
+    def needs_resync(self, author_id, context_id, max_age=RESYNC_AGE):
+        """
+        True when the context was never fully scanned, or not within max_age seconds.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT scanned_at FROM scan_state WHERE author_id = ? AND context_id = ?",
+                (str(author_id), str(context_id))
+            ).fetchone()
+        return row is None or time.time() - row[0] > max_age
+
+    def set_high_water(self, author_id, context_id, message_id, full=False):
+        """
+        Moves the high-water mark up to message_id. full: the scan covered the
+        whole context, which also restarts the RESYNC_AGE clock.
+        """
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO scan_state (author_id, context_id, high_water, scanned_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (author_id, context_id) DO UPDATE SET "
+                "high_water = MAX(high_water, excluded.high_water), "
+                "scanned_at = CASE WHEN ? THEN excluded.scanned_at ELSE scanned_at END",
+                (str(author_id), str(context_id), int(message_id), time.time(), int(full))
+            )
+            self.conn.commit()
+
+    def add_messages(self, author_id, context_id, messages):
+        """
+        Inserts scanned records; already indexed IDs are left as they are.
+        """
+        rows = [(m.id, str(author_id), str(context_id), m.channel_id, m.content, int(m.attachments)) for m in messages]
+        if not rows:
+            return
+        with self._lock:
+            known = {
+                row[0] for row in self.conn.execute(
+                    f"SELECT id FROM messages WHERE id IN ({','.join('?' * len(rows))})", [r[0] for r in rows]
+                )
+            }
+            rows = [r for r in rows if r[0] not in known]
+            self.conn.executemany(
+                "INSERT INTO messages (id, author_id, context_id, channel_id, content, attachments) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            if self.has_fts:
+                self.conn.executemany(
+                    "INSERT INTO messages_fts (rowid, content) VALUES (?, ?)", [(r[0], r[4] or '') for r in rows]
+                )
+            self.conn.commit()
+
+    def remove(self, message_ids):
+        """
+        Drops deleted messages from the index.
+        """
+        ids = [int(i) for i in message_ids]
+        if not ids:
+            return
+        with self._lock:
+            if self.has_fts:
+                self.conn.executemany(
+                    "INSERT INTO messages_fts (messages_fts, rowid, content) "
+                    "SELECT 'delete', id, COALESCE(content, '') FROM messages WHERE id = ?", [(i,) for i in ids]
+                )
+            self.conn.executemany("DELETE FROM messages WHERE id = ?", [(i,) for i in ids])
+            self.conn.commit()
+
+    def prune(self, author_id, context_id, kept_ids):
+        """
+        After a full scan of a context: removes its indexed messages that the
+        scan did not return (deleted since they were indexed). Returns how many.
+        """
+        kept = set(kept_ids)
+        with self._lock:
+            stale = [
+                row[0] for row in self.conn.execute(
+                    "SELECT id FROM messages WHERE author_id = ? AND context_id = ?", (str(author_id), str(context_id))
+                ) if row[0] not in kept
+            ]
+        self.remove(stale)
+        return len(stale)
+
+    def query(self, author_id, context_id, keyword=None, after=None, before=None):
+        """
+        Returns indexed messages of a context as MessageRecords, newest first.
+        keyword: words the content must contain (full-text when available).
+        after / before: datetimes, applied as an ID range on the primary key.
+        """
+        sql = "SELECT m.id, m.channel_id, m.content, m.attachments FROM messages m"
+        where = ["m.author_id = ?", "m.context_id = ?"]
+        params = [str(author_id), str(context_id)]
+
+        if keyword:
+            if self.has_fts:
+                sql += " JOIN messages_fts f ON f.rowid = m.id"
+                where.append("messages_fts MATCH ?")
+                # Quote each word so user input is never parsed as FTS syntax
+                params.append(' '.join('"' + word.replace('"', '""') + '"' for word in keyword.split()))
+            else:
+                where.append("m.content LIKE ?")
+                params.append(f"%{keyword}%")
+        if after:
+            where.append("m.id >= ?")
+            params.append(datetime_to_snowflake(after))
+        if before:
+            where.append("m.id < ?")
+            params.append(datetime_to_snowflake(before))
+
+        sql += " WHERE " + " AND ".join(where) + " ORDER BY m.id DESC"
+        with self._lock:
+            try:
+                rows = self.conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                logger.error(f"Index query failed: {e}")
+                return []
+        return [MessageRecord(*row) for row in rows]
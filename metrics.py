@@ -0,0 +1,213 @@
+"""
+Request metrics of a Discord client: per-route counts, a status code
+histogram, a latency histogram, retries, time lost to 429s and bytes
+transferred. Read them with snapshot(), summary_line() or as Prometheus
+text (prometheus_text / write_prometheus).
+"""
+
+import os
+import re
+import threading
+from collections import Counter
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ID_SEGMENT = re.compile(r'/\d+')
+
+
+def route_label(method, endpoint):
+    """'DELETE /channels/1/messages/2' -> 'DELETE /channels/{id}/messages/{id}'."""
+    return f"{method} {_ID_SEGMENT.sub('/{id}', endpoint.split('?')[0])}"
+
+
+class RequestMetrics:
+    """
+    Thread-safe counters fed by the clients' _request loops.
+
+    Hooks added with add_hook(fn) are called with a dict for every finished
+    request ({'route', 'status', 'seconds', 'bytes_sent', 'bytes_received'})
+    and every retry ({'route', 'retry', 'reason'}).
+    """
+    def __init__(self, scheduler=None, latency_buckets=LATENCY_BUCKETS):
+        self.scheduler = scheduler  # its total_wait is reported as pacing time
+        self.latency_buckets = tuple(latency_buckets)
+        self._lock = threading.Lock()
+        self._hooks = []
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter()
+            self.statuses = Counter()
+            self.latency_counts = [0] * (len(self.latency_buckets) + 1)  # last one is +Inf
+            self.latency_sum = 0.0
+            self.route_seconds = Counter()  # latency sum per route
+            self.retries = Counter()
+            self.rate_limited = 0
+            self.rate_limit_sleep = 0.0
+            self.bytes_sent = 0
+            self.bytes_received = 0
+
+    def add_hook(self, fn):
+        self._hooks.append(fn)
+
+    def _emit(self, event):
+        for hook in self._hooks:
+            hook(event)
+
+    # --- Recording ---
+
+    def observe_request(self, method, endpoint, status, seconds, bytes_sent=0, bytes_received=0):
+        """
+        Records one request. status is None when no response arrived.
+        """
+        route = route_label(method, endpoint)
+        status = str(status) if status is not None else 'error'
+        bucket = next((i for i, bound in enumerate(self.latency_buckets) if seconds <= bound), len(self.latency_buckets))
+        with self._lock:
+            self.requests[route] += 1
+            self.statuses[status] += 1
+            self.latency_counts[bucket] += 1
+            self.latency_sum += seconds
+            self.route_seconds[route] += seconds
+            self.bytes_sent += bytes_sent
+            self.bytes_received += bytes_received
+        if self._hooks:
+            self._emit({'route': route, 'status': status, 'seconds': seconds,
+                        'bytes_sent': bytes_sent, 'bytes_received': bytes_received})
+
+    def observe_retry(self, method, endpoint, reason):
+        """
+        Records a retry; reason is e.g. '429', '5xx' or 'network'.
+        """
+        with self._lock:
+            self.retries[reason] += 1
+        if self._hooks:
+            self._emit({'route': route_label(method, endpoint), 'retry': True, 'reason': reason})
+
+    def observe_rate_limit(self, seconds):
+        """
+        Records a 429 and the time the route is held back for it.
+        """
+        with self._lock:
+            self.rate_limited += 1
+            self.rate_limit_sleep += seconds
+
+    # --- Reading ---
+
+    def latency_quantile(self, q):
+        """
+        Approximate latency quantile (seconds): the upper bound of the bucket
+        holding it. Returns None before the first request.
+        """
+        with self._lock:
+            counts = list(self.latency_counts)
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                return self.latency_buckets[i] if i < len(self.latency_buckets) else float('inf')
+        return float('inf')
+
+    def mean_latency(self, route=None):
+        """
+        Mean request latency in seconds, of one route label or of every
+        request. None before the first such request.
+        """
+        with self._lock:
+            if route is not None:
+                count = self.requests[route]
+                return self.route_seconds[route] / count if count else None
+            total = sum(self.latency_counts)
+            return self.latency_sum / total if total else None
+
+    def snapshot(self):
+        """
+        Returns every metric as a plain, JSON-serializable dict.
+        """
+        with self._lock:
+            snapshot = {
+                'requests': sum(self.requests.values()),
+                'requests_by_route': dict(self.requests),
+                'statuses': dict(self.statuses),
+                'latency_buckets': {str(b): c for b, c in zip(self.latency_buckets + ('+Inf',), self.latency_counts)},
+                'latency_sum': round(self.latency_sum, 3),
+                'retries': sum(self.retries.values()),
+                'retries_by_reason': dict(self.retries),
+                'rate_limited': self.rate_limited,
+                'rate_limit_sleep': round(self.rate_limit_sleep, 3),
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received,
+            }
+        snapshot['scheduler_wait'] = round(self.scheduler.total_wait, 3) if self.scheduler else 0.0
+        snapshot['latency_p50'] = self.latency_quantile(0.5)
+        snapshot['latency_p99'] = self.latency_quantile(0.99)
+        return snapshot
+
+    def summary_line(self):
+        """
+        One short line for a status bar.
+        """
+        s = self.snapshot()
+        p50 = f"{s['latency_p50'] * 1000:.0f}ms" if s['latency_p50'] not in (None, float('inf')) else "-"
+        received = s['bytes_received'] / (1024 * 1024)
+        return (f"{s['requests']} req | {s['rate_limited']} x 429 | {s['retries']} retries | "
+                f"p50 <= {p50} | waited {s['scheduler_wait']:.1f}s | {received:.1f} MB")
+
+    def prometheus_text(self, prefix="discord_tool"):
+        """
+        Renders the metrics in the Prometheus text exposition format.
+        """
+        s = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                label_text = "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}" if labels else ""
+                lines.append(f"{prefix}_{name}{label_text} {value}")
+
+        metric("requests_total", "counter", "Requests sent, by route.",
+               [({'route': r}, c) for r, c in sorted(s['requests_by_route'].items())])
+        metric("responses_total", "counter", "Responses by HTTP status ('error' if none arrived).",
+               [({'status': k}, c) for k, c in sorted(s['statuses'].items())])
+
+        # Histogram buckets are cumulative in this format
+        metric("request_duration_seconds", "histogram", "Request latency.", [])
+        cumulative = 0
+        for bound, count in s['latency_buckets'].items():
+            cumulative += count
+            lines.append(f'{prefix}_request_duration_seconds_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{prefix}_request_duration_seconds_sum {s['latency_sum']}")
+        lines.append(f"{prefix}_request_duration_seconds_count {cumulative}")
+
+        metric("retries_total", "counter", "Requests retried, by reason.",
+               [({'reason': k}, c) for k, c in sorted(s['retries_by_reason'].items())])
+        metric("rate_limited_total", "counter", "429 responses received.", [({}, s['rate_limited'])])
+        metric("rate_limit_sleep_seconds_total", "counter", "Time routes were held back after 429s.",
+               [({}, s['rate_limit_sleep'])])
+        metric("scheduler_wait_seconds_total", "counter", "Time spent waiting for rate limit buckets.",
+               [({}, s['scheduler_wait'])])
+        metric("bytes_sent_total", "counter", "Request body bytes sent.", [({}, s['bytes_sent'])])
+        metric("bytes_received_total", "counter", "Response body bytes received.", [({}, s['bytes_received'])])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, prefix="discord_tool"):
+        """
+        Writes prometheus_text() to path atomically (for node_exporter's
+        textfile collector, which may read the file at any time).
+        """
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text(prefix))
+        os.replace(tmp, path)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,544 @@
+"""
+Local stand-in for the parts of the Discord API this tool uses, for
+benchmarking without a live account.
+
+Implements /users/@me, guild and channel messages/search, channel message
+history, message DELETE and bulk-delete, and the channel/guild/member
+lookups behind the Manage Messages check over seeded histories, with per-bucket
+X-RateLimit-* headers, 429 responses carrying retry_after, a global limit,
+injected latency and injected failures (random 5xx responses, or a full
+outage via start_outage).
+
+Run standalone:
+    python mock_server.py --messages 100000 --port 8089
+then point DiscordClient(token, base_url="http://127.0.0.1:8089/api/v9") at it.
+"""
+
+import argparse
+import bisect
+import json
+import random
+import re
+import threading
+import time
+from array import array
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+DISCORD_EPOCH = 1420070400000
+MOCK_TOKEN = "mock-token-" + "x" * 48
+USER_ID = "200000000000000001"
+OTHER_USER_ID = "200000000000000002"
+DM_CHANNEL_ID = "300000000000000001"
+GUILD_ID = "400000000000000001"
+MOD_ROLE_ID = "600000000000000001"
+SEARCH_PAGE_SIZE = 25
+SEARCH_MAX_OFFSET = 5000
+
+# (limit, reset_after seconds) per route, roughly what Discord serves to user accounts
+DEFAULT_LIMITS = {
+    "search": (5, 5.0),
+    "delete": (5, 5.0),
+    "history": (5, 5.0),
+    "bulk_delete": (1, 1.0),
+    "lookup": (5, 5.0),
+    "user": (10, 1.0),
+}
+GLOBAL_LIMIT = 50  # per second
+
+VIEW_CHANNEL = 1 << 10
+MANAGE_MESSAGES = 1 << 13
+BULK_DELETE_MAX_AGE_MS = 14 * 86400 * 1000
+
+
+class History:
+    """
+    Message IDs of one context, split by author. IDs are kept as sorted
+    int64 arrays so million-message histories stay cheap to hold and to
+    range-query with bisect.
+    """
+    def __init__(self, own_ids, other_ids, channel_ids):
+        self.own = array('q', sorted(own_ids))
+        self.other = array('q', sorted(other_ids))
+        self.channel_ids = channel_ids
+
+    def channel_of(self, message_id):
+        return self.channel_ids[message_id % len(self.channel_ids)]
+
+    @staticmethod
+    def content_of(message_id):
+        # Deterministic content so keyword searches have something to match
+        return (f"mock message {message_id}" + (" secret" if message_id % 10 == 0 else "")
+                + (" https://example.com" if message_id % 13 == 0 else ""))
+
+    @staticmethod
+    def has_of(message_id):
+        """Kinds for the 'has' search filter: every 7th message has a file
+        (every 14th an image), every 13th a link with its embed."""
+        kinds = set()
+        if message_id % 7 == 0:
+            kinds.add('file')
+            if message_id % 14 == 0:
+                kinds.add('image')
+        if message_id % 13 == 0:
+            kinds.update(('link', 'embed'))
+        return kinds
+
+    def range(self, ids, min_id=None, max_id=None):
+        lo = bisect.bisect_right(ids, min_id) if min_id is not None else 0
+        hi = bisect.bisect_left(ids, max_id) if max_id is not None else len(ids)
+        return lo, max(lo, hi)
+
+    def page(self, before=None, limit=100, channel_id=None):
+        """Messages of every author older than `before`, newest first, as
+        (id, is_own) pairs; only those of channel_id if given."""
+        i = bisect.bisect_left(self.own, before) if before is not None else len(self.own)
+        j = bisect.bisect_left(self.other, before) if before is not None else len(self.other)
+        page = []
+        while len(page) < limit and (i or j):
+            if j == 0 or (i and self.own[i - 1] > self.other[j - 1]):
+                i -= 1
+                message_id, own = self.own[i], True
+            else:
+                j -= 1
+                message_id, own = self.other[j], False
+            if channel_id is None or self.channel_of(message_id) == channel_id:
+                page.append((message_id, own))
+        return page
+
+    def remove(self, message_id):
+        """Deletes an own message. Returns 'deleted', 'forbidden' or 'missing'."""
+        i = bisect.bisect_left(self.own, message_id)
+        if i < len(self.own) and self.own[i] == message_id:
+            self.own.pop(i)
+            return 'deleted'
+        j = bisect.bisect_left(self.other, message_id)
+        if j < len(self.other) and self.other[j] == message_id:
+            return 'forbidden'
+        return 'missing'
+
+
+def _seed_ids(rng, count, start_ms, span_ms):
+    """Random, unique snowflakes spread over a time span."""
+    ids = set()
+    while len(ids) < count:
+        ms = start_ms + rng.randrange(span_ms)
+        ids.add(((ms - DISCORD_EPOCH) << 22) | rng.randrange(1 << 22))
+    return ids
+
+
+class MockDiscordState:
+    """
+    Seeded message histories plus rate limit bookkeeping, shared by all
+    request handler threads.
+    """
+    def __init__(self, messages=1000, own_ratio=0.5, guild_channels=5, seed=1,
+                 latency=0.0, jitter=0.0, rate_scale=1.0, limits=None, error_rate=0.0, span_days=5 * 365,
+                 manage_messages=False):
+        rng = random.Random(seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.outage_until = 0.0
+        self.rng = random.Random(seed + 1)
+        self.lock = threading.Lock()
+        self.limits = {k: (limit, reset * rate_scale) for k, (limit, reset) in (limits or DEFAULT_LIMITS).items()}
+        self.global_window = 1.0 * rate_scale
+        self.buckets = {}
+        self.global_sent = deque()
+        self.stats = {'requests': 0, 'rate_limited': 0, 'deleted': 0, 'errors': 0}
+
+        span_ms = int(span_days * 86400 * 1000)
+        start_ms = int(time.time() * 1000) - span_ms
+        own_count = int(messages * own_ratio)
+        guild_channel_ids = [str(500000000000000001 + i) for i in range(max(1, guild_channels))]
+        # With manage_messages the user holds a moderator role, which the last
+        # channel (if there are several) takes away again with an overwrite
+        self.manage_messages = manage_messages
+        self.guild_channel_ids = guild_channel_ids
+        self.restricted_channel = guild_channel_ids[-1] if len(guild_channel_ids) > 1 else None
+
+        def build(channels):
+            ids = list(_seed_ids(rng, messages, start_ms, span_ms))
+            rng.shuffle(ids)
+            return History(ids[:own_count], ids[own_count:], channels)
+
+        self.dm = build([DM_CHANNEL_ID])
+        self.guild = build(guild_channel_ids)
+        self.channels = {DM_CHANNEL_ID: self.dm}
+        self.channels.update({cid: self.guild for cid in guild_channel_ids})
+
+    # --- Rate limiting ---
+
+    def take(self, bucket):
+        """
+        Consumes one request from a bucket. Returns (allowed, headers, retry_after, is_global).
+        """
+        limit, reset_after = self.limits[bucket.split(':')[0]]
+        now = time.monotonic()
+        with self.lock:
+            self.stats['requests'] += 1
+            while self.global_sent and now - self.global_sent[0] >= self.global_window:
+                self.global_sent.popleft()
+            if len(self.global_sent) >= GLOBAL_LIMIT:
+                self.stats['rate_limited'] += 1
+                retry = self.global_window - (now - self.global_sent[0])
+                return False, {}, retry, True
+            self.global_sent.append(now)
+
+            window_start, used = self.buckets.get(bucket, (now, 0))
+            if now - window_start >= reset_after:
+                window_start, used = now, 0
+            used += 1
+            self.buckets[bucket] = (window_start, used)
+            remaining_time = max(0.0, reset_after - (now - window_start))
+            headers = {
+                'X-RateLimit-Bucket': bucket.split(':')[0] + "-mockhash",
+                'X-RateLimit-Limit': str(limit),
+                'X-RateLimit-Remaining': str(max(0, limit - used)),
+                'X-RateLimit-Reset-After': f"{remaining_time:.3f}",
+            }
+            if used > limit:
+                self.stats['rate_limited'] += 1
+                return False, headers, remaining_time, False
+            return True, headers, 0.0, False
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self.rng.uniform(0, self.jitter))
+
+    # --- Failures ---
+
+    def start_outage(self, seconds):
+        """
+        Answers every request with a 503 for the given number of seconds.
+        """
+        self.outage_until = time.monotonic() + seconds
+
+    def injected_error(self):
+        """
+        Returns a 5xx status to fail the current request with, or None.
+        """
+        with self.lock:
+            if time.monotonic() < self.outage_until:
+                status = 503
+            elif self.error_rate and self.rng.random() < self.error_rate:
+                status = self.rng.choice((500, 502))
+            else:
+                return None
+            self.stats['errors'] += 1
+            return status
+
+    # --- Endpoints ---
+
+    def search(self, history, query, channel_filter=None):
+        author = query.get('author_id', [None])[0]
+        content = query.get('content', [None])[0]
+        has = query.get('has', [])
+        min_id = int(query['min_id'][0]) if 'min_id' in query else None
+        max_id = int(query['max_id'][0]) if 'max_id' in query else None
+        offset = int(query.get('offset', ['0'])[0])
+        if offset > SEARCH_MAX_OFFSET:
+            return 400, {'message': 'Invalid Form Body', 'code': 50035}
+
+        sources = [(history.own, USER_ID)]
+        if author != USER_ID:
+            sources = [] if author else [(history.own, USER_ID), (history.other, OTHER_USER_ID)]
+
+        with self.lock:
+            if len(sources) == 1 and not content and not channel_filter and not has:
+                # Fast path: the answer is a slice of one sorted array, newest first
+                ids, author_id = sources[0]
+                lo, hi = history.range(ids, min_id, max_id)
+                total = hi - lo
+                start = hi - offset
+                page = [(ids[i], author_id) for i in range(start - 1, max(lo, start - SEARCH_PAGE_SIZE) - 1, -1)]
+            else:
+                hits = []
+                for ids, author_id in sources:
+                    lo, hi = history.range(ids, min_id, max_id)
+                    hits.extend((ids[i], author_id) for i in range(lo, hi))
+                # Whole words, as Discord's search tokenizes content
+                words = set(re.findall(r'\w+', content.lower())) if content else None
+                hits = [
+                    h for h in hits
+                    if (not words or words <= set(re.findall(r'\w+', history.content_of(h[0]))))
+                    and (not channel_filter or history.channel_of(h[0]) in channel_filter)
+                    and all(kind in history.has_of(h[0]) for kind in has)
+                ]
+                # Newest first, like Discord's default sort
+                hits.sort(reverse=True)
+                total = len(hits)
+                page = hits[offset:offset + SEARCH_PAGE_SIZE]
+
+        return 200, {
+            'total_results': total,
+            'messages': [[self.message_json(history, mid, author_id)] for mid, author_id in page],
+        }
+
+    def message_json(self, history, message_id, author_id):
+        ms = (message_id >> 22) + DISCORD_EPOCH
+        kinds = history.has_of(message_id)
+        attachments = []
+        if 'file' in kinds:
+            name, mime = ('image.png', 'image/png') if 'image' in kinds else ('notes.txt', 'text/plain')
+            attachments.append({'id': str(message_id + 1), 'filename': name, 'content_type': mime})
+        embeds = [{'type': 'link', 'url': 'https://example.com'}] if 'embed' in kinds else []
+        return {
+            'id': str(message_id),
+            'channel_id': history.channel_of(message_id),
+            'content': history.content_of(message_id),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(ms / 1000)) + f".{ms % 1000:03d}000+00:00",
+            'attachments': attachments,
+            'embeds': embeds,
+            'author': {'id': author_id, 'username': 'mockuser' if author_id == USER_ID else 'someone'},
+        }
+
+    def history(self, channel_id, query):
+        history = self.channels.get(channel_id)
+        if history is None:
+            return 404, {'message': 'Unknown Channel', 'code': 10003}
+        before = int(query['before'][0]) if 'before' in query else None
+        limit = min(100, max(1, int(query.get('limit', ['50'])[0])))
+        with self.lock:
+            page = history.page(before, limit, channel_id if history is self.guild else None)
+        return 200, [self.message_json(history, mid, USER_ID if own else OTHER_USER_ID) for mid, own in page]
+
+    def channel_json(self, channel_id):
+        if channel_id == DM_CHANNEL_ID:
+            return 200, {'id': channel_id, 'type': 1, 'recipients': [{'id': OTHER_USER_ID, 'username': 'someone'}]}
+        if channel_id not in self.guild_channel_ids:
+            return 404, {'message': 'Unknown Channel', 'code': 10003}
+        overwrites = []
+        if channel_id == self.restricted_channel:
+            overwrites.append({'id': MOD_ROLE_ID, 'type': 0, 'allow': '0', 'deny': str(MANAGE_MESSAGES)})
+        return 200, {'id': channel_id, 'type': 0, 'guild_id': GUILD_ID, 'permission_overwrites': overwrites}
+
+    def guild_json(self, guild_id):
+        if guild_id != GUILD_ID:
+            return 404, {'message': 'Unknown Guild', 'code': 10004}
+        return 200, {'id': GUILD_ID, 'owner_id': OTHER_USER_ID, 'roles': [
+            {'id': GUILD_ID, 'name': '@everyone', 'permissions': str(VIEW_CHANNEL | 1 << 11 | 1 << 16)},
+            {'id': MOD_ROLE_ID, 'name': 'Moderator', 'permissions': str(MANAGE_MESSAGES)},
+        ]}
+
+    def member_json(self, guild_id, user_id):
+        if guild_id != GUILD_ID or user_id not in (USER_ID, OTHER_USER_ID):
+            return 404, {'message': 'Unknown Member', 'code': 10007}
+        roles = [MOD_ROLE_ID] if user_id == USER_ID and self.manage_messages else []
+        return 200, {'user': {'id': user_id}, 'roles': roles}
+
+    def bulk_delete(self, channel_id, body):
+        """
+        Deletes 2 to 100 messages under 14 days old, all or nothing, if the
+        user may manage messages in the channel. Unknown IDs are skipped.
+        """
+        if channel_id not in self.guild_channel_ids:
+            status = 404 if channel_id != DM_CHANNEL_ID else 403
+            return status, {'message': 'Unknown Channel' if status == 404 else 'Cannot execute action on a DM channel',
+                            'code': 10003 if status == 404 else 50003}
+        if not self.manage_messages or channel_id == self.restricted_channel:
+            return 403, {'message': 'Missing Permissions', 'code': 50013}
+        try:
+            ids = [int(m) for m in body['messages']]
+        except (KeyError, TypeError, ValueError):
+            return 400, {'message': 'Invalid Form Body', 'code': 50035}
+        if not 2 <= len(ids) <= 100:
+            return 400, {'message': 'Invalid Form Body', 'code': 50035}
+        oldest_ms = int(time.time() * 1000) - BULK_DELETE_MAX_AGE_MS
+        if any((message_id >> 22) + DISCORD_EPOCH < oldest_ms for message_id in ids):
+            return 400, {'message': 'You can only bulk delete messages that are under 14 days old.', 'code': 50034}
+        with self.lock:
+            for message_id in ids:
+                if self.guild.channel_of(message_id) == channel_id and self.guild.remove(message_id) == 'deleted':
+                    self.stats['deleted'] += 1
+        return 204, None
+
+    def delete(self, channel_id, message_id):
+        history = self.channels.get(channel_id)
+        if history is None or history.channel_of(message_id) != channel_id:
+            return 404
+        with self.lock:
+            result = history.remove(message_id)
+            if result == 'deleted':
+                self.stats['deleted'] += 1
+        return {'deleted': 204, 'forbidden': 403, 'missing': 404}[result]
+
+
+class MockDiscordHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # set by make_server
+
+    ROUTES = [
+        ('GET', re.compile(r'^/api/v\d+/users/@me$'), 'user'),
+        ('GET', re.compile(r'^/api/v\d+/guilds/(\d+)/messages/search$'), 'guild_search'),
+        ('GET', re.compile(r'^/api/v\d+/channels/(\d+)/messages/search$'), 'channel_search'),
+        ('GET', re.compile(r'^/api/v\d+/channels/(\d+)/messages$'), 'history'),
+        ('DELETE', re.compile(r'^/api/v\d+/channels/(\d+)/messages/(\d+)$'), 'delete'),
+        ('POST', re.compile(r'^/api/v\d+/channels/(\d+)/messages/bulk-delete$'), 'bulk_delete'),
+        ('GET', re.compile(r'^/api/v\d+/channels/(\d+)$'), 'channel'),
+        ('GET', re.compile(r'^/api/v\d+/guilds/(\d+)$'), 'guild'),
+        ('GET', re.compile(r'^/api/v\d+/guilds/(\d+)/members/(\d+)$'), 'member'),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def send_json(self, status, body=None, headers=None):
+        payload = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if body is not None:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_html(self, status, text):
+        payload = text.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def dispatch(self, method):
+        state = self.state
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        # Read the body first so the connection stays usable whatever the answer
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+        state.delay()
+
+        error = state.injected_error()
+        if error:
+            # Like a proxy in front of the API: HTML, not JSON
+            return self.send_html(error, f"<html><body><h1>{error} Service Unavailable</h1></body></html>")
+
+        if self.headers.get('Authorization') != MOCK_TOKEN:
+            return self.send_json(401, {'message': '401: Unauthorized', 'code': 0})
+
+        for route_method, pattern, name in self.ROUTES:
+            match = pattern.match(url.path)
+            if route_method == method and match:
+                break
+        else:
+            return self.send_json(404, {'message': 'Unknown route', 'code': 0})
+
+        major = match.group(1) if match.groups() else ''
+        kind = {'guild_search': 'search', 'channel_search': 'search', 'channel': 'lookup', 'guild': 'lookup',
+                'member': 'lookup'}.get(name, name)
+        allowed, headers, retry_after, is_global = state.take(f"{kind}:{major}")
+        if not allowed:
+            headers = dict(headers)
+            headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+            if is_global:
+                headers['X-RateLimit-Global'] = 'true'
+            headers['X-RateLimit-Scope'] = 'global' if is_global else 'user'
+            return self.send_json(429, {
+                'message': 'You are being rate limited.',
+                'retry_after': round(retry_after, 3),
+                'global': is_global,
+            }, headers)
+
+        if name == 'user':
+            return self.send_json(200, {'id': USER_ID, 'username': 'mockuser', 'discriminator': '0001'}, headers)
+        if name == 'guild_search':
+            if match.group(1) != GUILD_ID:
+                return self.send_json(404, {'message': 'Unknown Guild', 'code': 10004}, headers)
+            channel_filter = query.get('channel_id')
+            status, body = state.search(state.guild, query, channel_filter)
+            return self.send_json(status, body, headers)
+        if name == 'channel_search':
+            history = state.channels.get(match.group(1))
+            if history is None:
+                return self.send_json(404, {'message': 'Unknown Channel', 'code': 10003}, headers)
+            status, body = state.search(history, query, [match.group(1)] if history is state.guild else None)
+            return self.send_json(status, body, headers)
+        if name == 'history':
+            status, body = state.history(match.group(1), query)
+            return self.send_json(status, body, headers)
+        if name == 'bulk_delete':
+            try:
+                body = json.loads(raw_body or b'null')
+            except ValueError:
+                body = None
+            status, body = state.bulk_delete(match.group(1), body)
+            return self.send_json(status, body, headers)
+        if name in ('channel', 'guild'):
+            status, body = (state.channel_json if name == 'channel' else state.guild_json)(match.group(1))
+            return self.send_json(status, body, headers)
+        if name == 'member':
+            status, body = state.member_json(match.group(1), match.group(2))
+            return self.send_json(status, body, headers)
+        if name == 'delete':
+            status = state.delete(match.group(1), int(match.group(2)))
+            if status == 204:
+                return self.send_json(204, None, headers)
+            return self.send_json(status, {'message': 'Unknown Message' if status == 404 else 'Missing Access'}, headers)
+
+
+def make_server(state, host="127.0.0.1", port=0):
+    """
+    Builds (but does not start) a threaded HTTP server for the given state.
+    The API base URL is http://host:port/api/v9.
+    """
+    handler = type('BoundMockDiscordHandler', (MockDiscordHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_server(state, host="127.0.0.1", port=0):
+    """
+    Starts a mock server in a background thread. Returns (server, base_url).
+    """
+    server = make_server(state, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/api/v9"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Discord API endpoints used by this tool.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--messages", type=int, default=1000, help="messages per context (1k to 1M)")
+    parser.add_argument("--own-ratio", type=float, default=0.5, help="share of messages sent by the mock user")
+    parser.add_argument("--guild-channels", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="added seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per request")
+    parser.add_argument("--rate-scale", type=float, default=1.0, help="multiplier for rate limit windows")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 5xx")
+    parser.add_argument("--span-days", type=float, default=5 * 365, help="seeded messages are spread over this many days")
+    parser.add_argument("--manage-messages", action="store_true",
+                        help="give the user Manage Messages in the guild (all channels but the last)")
+    args = parser.parse_args()
+
+    state = MockDiscordState(args.messages, args.own_ratio, args.guild_channels, args.seed,
+                             args.latency, args.jitter, args.rate_scale, error_rate=args.error_rate,
+                             span_days=args.span_days, manage_messages=args.manage_messages)
+    server = make_server(state, args.host, args.port)
+    print(f"Mock Discord API on http://{args.host}:{server.server_port}/api/v9")
+    print(f"Token: {MOCK_TOKEN}")
+    print(f"DM channel: {DM_CHANNEL_ID}  Guild: {GUILD_ID}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
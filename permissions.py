@@ -0,0 +1,75 @@
+"""
+Discord permission bits and the per-channel permission computation from
+Discord's documentation: guild owner and ADMINISTRATOR get everything,
+otherwise the @everyone role and the member's roles are combined, then the
+channel's @everyone, role and member overwrites are applied in that order.
+
+Used to find the channels where the bulk delete endpoint is available.
+"""
+
+ADMINISTRATOR = 1 << 3
+VIEW_CHANNEL = 1 << 10
+MANAGE_MESSAGES = 1 << 13
+READ_MESSAGE_HISTORY = 1 << 16
+ALL_PERMISSIONS = (1 << 64) - 1
+
+# permission_overwrites 'type' values
+ROLE_OVERWRITE = 0
+MEMBER_OVERWRITE = 1
+
+
+def base_permissions(guild, member, user_id):
+    """
+    Guild-wide permissions of a member, from GET /guilds/{id} and
+    GET /guilds/{id}/members/{user_id}.
+    """
+    if str(guild.get('owner_id')) == str(user_id):
+        return ALL_PERMISSIONS
+    roles = {str(role['id']): int(role.get('permissions') or 0) for role in guild.get('roles') or []}
+    permissions = roles.get(str(guild['id']), 0)  # @everyone shares the guild's ID
+    for role_id in member.get('roles') or []:
+        permissions |= roles.get(str(role_id), 0)
+    if permissions & ADMINISTRATOR:
+        return ALL_PERMISSIONS
+    return permissions
+
+
+def channel_permissions(guild, member, channel, user_id):
+    """
+    Permissions of a member in one channel of the guild (GET /channels/{id}).
+    """
+    permissions = base_permissions(guild, member, user_id)
+    if permissions & ADMINISTRATOR:
+        return ALL_PERMISSIONS
+
+    overwrites = channel.get('permission_overwrites') or []
+    guild_id = str(guild['id'])
+    member_roles = {str(role_id) for role_id in member.get('roles') or []}
+
+    def apply(permissions, allow, deny):
+        return (permissions & ~deny) | allow
+
+    for overwrite in overwrites:
+        if str(overwrite['id']) == guild_id:
+            permissions = apply(permissions, int(overwrite.get('allow') or 0), int(overwrite.get('deny') or 0))
+
+    allow = deny = 0
+    for overwrite in overwrites:
+        if overwrite.get('type') == ROLE_OVERWRITE and str(overwrite['id']) in member_roles:
+            allow |= int(overwrite.get('allow') or 0)
+            deny |= int(overwrite.get('deny') or 0)
+    permissions = apply(permissions, allow, deny)
+
+    for overwrite in overwrites:
+        if overwrite.get('type') == MEMBER_OVERWRITE and str(overwrite['id']) == str(user_id):
+            permissions = apply(permissions, int(overwrite.get('allow') or 0), int(overwrite.get('deny') or 0))
+    return permissions
+
+
+def can_bulk_delete(guild, member, channel, user_id):
+    """
+    True if the member may use the bulk delete endpoint in the channel:
+    it needs Manage Messages there (and to see the channel at all).
+    """
+    needed = MANAGE_MESSAGES | VIEW_CHANNEL
+    return channel_permissions(guild, member, channel, user_id) & needed == needed
@@ -0,0 +1,253 @@
+"""
+Dry-run planner: estimates what deleting a scan result will take before
+anything is deleted.
+
+plan_deletion() replays the job's deletes, in order, through a
+RateLimitScheduler (the class both clients pace real requests with) running
+on a simulated clock, against buckets that behave like the ones Discord (or
+the mock server) reports. Bucket parameters and request latency are taken
+from what the client has observed so far, falling back to Discord's usual
+delete limit. The plan counts requests per route, the total wall-clock time
+and the time spent on each channel.
+
+split_deletes() decides which messages go out as bulk deletes; the deleter
+sends its units in the same shape.
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+from api_client import RateLimitScheduler, BULK_DELETE_MAX
+from metrics import route_label
+from utils import datetime_to_snowflake
+
+DELETE_ROUTE = "DELETE /channels/{id}/messages/{id}"
+BULK_DELETE_ROUTE = "POST /channels/{id}/messages/bulk-delete"
+
+# Discord's usual message delete bucket for user accounts: 5 per 5 seconds per channel
+DEFAULT_DELETE_LIMIT = (5, 5.0)
+# Not documented; assumed one bulk delete per second per channel until one is observed
+DEFAULT_BULK_LIMIT = (1, 1.0)
+
+# Discord refuses to bulk delete messages older than 14 days. The margin
+# leaves room for the time a long job takes to reach a planned group.
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(hours=1)
+DEFAULT_LATENCY = 0.3  # seconds per request, until the client has timed some
+
+
+class _SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SimulatedBucket:
+    """
+    Server side of one rate limit bucket: a fixed window that starts with
+    its first request, as Discord and mock_server.py count them. Also
+    enforces the recorded limits when a cassette is replayed (cassette.py).
+    """
+    def __init__(self, name, limit, window):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.start = None
+        self.used = 0
+
+    def take(self, now):
+        """
+        Returns (allowed, headers) for a request arriving at now.
+        """
+        if self.start is None or now - self.start >= self.window:
+            self.start, self.used = now, 0
+        self.used += 1
+        headers = {
+            'X-RateLimit-Bucket': self.name,
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(max(0, self.limit - self.used)),
+            'X-RateLimit-Reset-After': f"{self.window - (now - self.start):.3f}",
+        }
+        return self.used <= self.limit, headers
+
+
+class DeletionPlan:
+    """
+    Result of plan_deletion. channels maps channel ID to
+    {'messages', 'requests', 'seconds'}; seconds is the share of the total
+    time spent deleting that channel's messages.
+    """
+    def __init__(self, messages, requests, seconds, rate_limited, channels, limit, window, latency, observed):
+        self.messages = messages
+        self.requests = requests  # route label -> expected requests
+        self.seconds = seconds
+        self.rate_limited = rate_limited
+        self.channels = channels
+        self.limit = limit
+        self.window = window
+        self.latency = latency
+        self.observed = observed  # bucket parameters came from real responses
+
+    @property
+    def total_requests(self):
+        return sum(self.requests.values())
+
+    def summary_lines(self, max_channels=10):
+        source = "observed" if self.observed else "default"
+        lines = [
+            f"Plan: {self.messages} messages in {len(self.channels)} channel{'s' if len(self.channels) != 1 else ''}, "
+            f"~{self.total_requests} requests, ~{format_duration(self.seconds)}",
+            f"Delete bucket: {self.limit} per {self.window:g}s per channel ({source}), "
+            f"~{self.latency * 1000:.0f} ms per request",
+        ]
+        lines += [f"  {route}: {count} requests" for route, count in self.requests.items()]
+        busiest = sorted(self.channels.items(), key=lambda item: -item[1]['seconds'])
+        for channel_id, channel in busiest[:max_channels]:
+            lines.append(f"  channel {channel_id}: {channel['messages']} messages, "
+                         f"{channel['requests']} requests, ~{format_duration(channel['seconds'])}")
+        if len(busiest) > max_channels:
+            lines.append(f"  ... and {len(busiest) - max_channels} more channels")
+        return lines
+
+    def as_dict(self):
+        return {
+            'messages': self.messages,
+            'requests': self.total_requests,
+            'requests_by_route': dict(self.requests),
+            'seconds': round(self.seconds, 1),
+            'rate_limited': self.rate_limited,
+            'channels': {cid: dict(c, seconds=round(c['seconds'], 1)) for cid, c in self.channels.items()},
+            'bucket': {'limit': self.limit, 'window': self.window, 'observed': self.observed},
+            'latency': round(self.latency, 3),
+        }
+
+
+def plan_deletion(messages, client=None, limit=None, window=None, latency=None, bulk_channels=()):
+    """
+    Estimates deleting messages (MessageRecords, in the order the job would
+    delete them) one request at a time, as execute_deletion and run_pipeline
+    do. Recent messages in bulk_channels (channel IDs where the account may
+    bulk delete, as MessageDeleter.plan_deletes finds them) are planned as
+    bulk deletes, like split_deletes groups them.
+
+    client: a DiscordClient or AsyncDiscordClient whose scheduler and
+    metrics provide the observed buckets and latency. limit, window and
+    latency override them for single deletes.
+    """
+    observed = client.scheduler.observed_limits() if client is not None else {}
+    observed_limit = observed.get(DELETE_ROUTE)
+    default_limit, default_window = observed_limit or DEFAULT_DELETE_LIMIT
+    limits = {
+        'DELETE': (limit or default_limit, window or default_window),
+        'POST': observed.get(BULK_DELETE_ROUTE) or DEFAULT_BULK_LIMIT,
+    }
+    if latency is None:
+        latency = (_observed_latency(client.metrics) if client is not None else None) or DEFAULT_LATENCY
+    global_limit = client.scheduler.global_limit if client is not None else RateLimitScheduler.GLOBAL_LIMIT
+
+    clock = _SimulatedClock()
+    scheduler = RateLimitScheduler(global_limit, clock=clock)
+    buckets = {}
+    requests = Counter()
+    channels = {}
+    rate_limited = 0
+
+    for unit in split_deletes(messages, bulk_channels):
+        channel_id = unit[0].channel_id
+        if len(unit) > 1:
+            method, endpoint = 'POST', f"/channels/{channel_id}/messages/bulk-delete"
+        else:
+            method, endpoint = 'DELETE', f"/channels/{channel_id}/messages/{unit[0].id}"
+        bucket = buckets.get((method, channel_id))
+        if bucket is None:
+            bucket = buckets[method, channel_id] = SimulatedBucket(f"planned-{method.lower()}", *limits[method])
+        channel = channels.setdefault(channel_id, {'messages': 0, 'requests': 0, 'seconds': 0.0})
+        started = clock.now
+        while True:
+            delay = scheduler.reserve(method, endpoint)
+            if delay > 0:
+                clock.now += max(delay, 1e-6)  # float rounding could otherwise stall the clock
+                continue
+            allowed, headers = bucket.take(clock.now)
+            clock.now += latency
+            requests[route_label(method, endpoint)] += 1
+            channel['requests'] += 1
+            scheduler.update(method, endpoint, headers)
+            if allowed:
+                break
+            # Same handling as the clients' 429 path
+            rate_limited += 1
+            scheduler.penalize(method, endpoint, float(headers['X-RateLimit-Reset-After']) + 0.5)
+        channel['messages'] += len(unit)
+        channel['seconds'] += clock.now - started
+
+    delete_limit, delete_window = limits['DELETE']
+    return DeletionPlan(len(messages), dict(requests), clock.now, rate_limited, channels, delete_limit, delete_window,
+                        latency, observed_limit is not None)
+
+
+def bulk_cutoff(now=None):
+    """
+    Lowest message ID still young enough for a bulk delete.
+    """
+    return datetime_to_snowflake((now or datetime.now()) - BULK_DELETE_MAX_AGE)
+
+
+def bulk_candidates(messages, now=None):
+    """
+    IDs of the channels holding at least two messages young enough for a
+    bulk delete, the only ones worth a permission check.
+    """
+    cutoff = bulk_cutoff(now)
+    counts = Counter(msg.channel_id for msg in messages if msg.id > cutoff)
+    return {channel_id for channel_id, count in counts.items() if count > 1}
+
+
+def split_deletes(messages, bulk_channels=(), now=None):
+    """
+    Splits messages into delete units, in the order the deleter sends them:
+    lists of 2 to BULK_DELETE_MAX recent messages of one channel in
+    bulk_channels first, then one-message lists for everything else, in
+    their original order.
+    """
+    if not bulk_channels:
+        return [[msg] for msg in messages]
+    cutoff = bulk_cutoff(now)
+    groups = {}
+    singles = []
+    for msg in messages:
+        if msg.channel_id in bulk_channels and msg.id > cutoff:
+            groups.setdefault(msg.channel_id, []).append(msg)
+        else:
+            singles.append(msg)
+
+    units = []
+    for group in groups.values():
+        for i in range(0, len(group), BULK_DELETE_MAX):
+            chunk = group[i:i + BULK_DELETE_MAX]
+            if len(chunk) > 1:
+                units.append(chunk)
+            else:
+                singles.append(chunk[0])
+    return units + [[msg] for msg in singles]
+
+
+def _observed_latency(metrics):
+    latency = metrics.mean_latency(DELETE_ROUTE)
+    if latency is None:
+        # No delete timed yet: searches carry results, the fastest route is closer to a bare DELETE
+        means = [metrics.mean_latency(route) for route in list(metrics.requests)]
+        latency = min(means) if means else None
+    return latency
+
+
+def format_duration(seconds):
+    """90 -> '1m 30s', 4000 -> '1h 06m'."""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
@@ -0,0 +1,102 @@
+"""
+Import-time profile of the entry points.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for
+each entry point and summarizes the output, so a change that drags a heavy
+dependency back into startup shows up before it reaches the PyInstaller
+builds (DiscordTool.spec / DiscordToolGUI.spec bundle gui.py).
+
+Usage:
+    python profile_imports.py                 # gui, cli and main
+    python profile_imports.py gui --top 20
+    python profile_imports.py cli --budget 100   # exit 1 if slower than 100 ms
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ENTRY_POINTS = ("gui", "cli", "main")
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def profile(module, runs=3):
+    """
+    Imports module in fresh interpreters and returns the fastest run as
+    {'total_ms', 'modules': [(name, self_ms, cumulative_ms, depth)]}.
+    """
+    best = None
+    here = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(max(1, runs)):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=here, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+        modules = []
+        for line in proc.stderr.splitlines():
+            match = _LINE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                modules.append((name, int(self_us) / 1000, int(cumulative_us) / 1000, len(indent) // 2))
+        modules = _subtree(modules, module)
+        total = modules[-1][2] if modules else 0.0
+        if best is None or total < best['total_ms']:
+            best = {'total_ms': total, 'modules': modules}
+    return best
+
+
+def _subtree(modules, root):
+    """
+    Keeps only the lines belonging to the import of root. importtime prints
+    children before their parent, so that is everything after the previous
+    top-level line (interpreter startup such as site) up to root itself.
+    """
+    end = max((i for i, m in enumerate(modules) if m[0] == root and m[3] == 0), default=None)
+    if end is None:
+        return []
+    start = end
+    while start > 0 and modules[start - 1][3] > 0:
+        start -= 1
+    return modules[start:end + 1]
+
+
+def report(module, result, top):
+    print(f"\n{module}: {result['total_ms']:.1f} ms")
+    # Direct imports of the entry point, by what they cost including their own imports
+    direct = [m for m in result['modules'] if m[3] == 1]
+    print("  direct imports (cumulative):")
+    for name, _, cumulative, _ in sorted(direct, key=lambda m: m[2], reverse=True)[:top]:
+        print(f"    {cumulative:8.1f} ms  {name}")
+    print("  slowest modules (self):")
+    for name, self_ms, _, _ in sorted(result['modules'], key=lambda m: m[1], reverse=True)[:top]:
+        print(f"    {self_ms:8.1f} ms  {name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile import time of the tool's entry points.")
+    parser.add_argument("modules", nargs="*", default=list(ENTRY_POINTS), help="modules to import (default: gui cli main)")
+    parser.add_argument("--top", type=int, default=10, help="rows per table")
+    parser.add_argument("--runs", type=int, default=3, help="imports per module, the fastest is reported")
+    parser.add_argument("--budget", type=float, help="fail (exit 1) if any module takes longer, in ms")
+    args = parser.parse_args(argv)
+
+    over_budget = []
+    for module in args.modules:
+        result = profile(module, args.runs)
+        report(module, result, args.top)
+        if args.budget is not None and result['total_ms'] > args.budget:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f"\nOver the {args.budget:.0f} ms budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+from utils import get_snowflake_time
+
+
+class MessageRecord:
+    """
+    Compact scan result for one message.
+
+    IDs are stored as ints and the creation time is derived from the
+    snowflake on demand, so a record is four slots instead of a dict of
+    strings. Content is kept once, as received.
+    """
+    __slots__ = ('id', 'channel_id', 'content', 'attachments')
+
+    def __init__(self, id, channel_id, content='', attachments=False):
+        self.id = int(id)
+        self.channel_id = int(channel_id)
+        self.content = content or ''
+        self.attachments = bool(attachments)
+
+    @classmethod
+    def from_api(cls, msg):
+        """Builds a record from a message object returned by the API."""
+        return cls(msg['id'], msg['channel_id'], msg.get('content'), bool(msg.get('attachments')))
+
+    @property
+    def created_at(self):
+        """Creation time (local datetime) decoded from the snowflake."""
+        return get_snowflake_time(self.id)
+
+    def preview(self, length=50):
+        """Single-line, truncated content for display."""
+        content = self.content.replace('\n', ' ')
+        if not content and self.attachments:
+            return "[Attachment]"
+        return content if len(content) <= length else content[:length] + "..."
+
+    def __eq__(self, other):
+        return isinstance(other, MessageRecord) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"MessageRecord(id={self.id}, channel_id={self.channel_id})"
@@ -0,0 +1,160 @@
+"""
+Retry policy and circuit breaker shared by DiscordClient and
+AsyncDiscordClient.
+
+RetryPolicy decides which failures are retried and how long to back off
+(exponential, with full jitter). CircuitBreaker watches consecutive
+failures across every request of a client; once Discord looks down it
+holds all requests back until a probe gets through, so a long outage pauses
+the scan/delete pipeline instead of failing every remaining message.
+"""
+
+import random
+import threading
+import time
+from utils import print_info, print_warning, logger
+
+# Failure kinds, as passed to RetryPolicy.should_retry and the metrics
+SERVER_ERROR = '5xx'
+TIMEOUT = 'timeout'
+CONNECTION = 'connection'  # refused, reset or dropped mid-response
+OTHER = 'other'  # anything else the HTTP library raises (bad URL, too many redirects...)
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class RetryPolicy:
+    """
+    Which failures to retry and how long to wait in between.
+
+    max_attempts counts every try of a request, 429s included. The wait
+    before retry n (0-based) is a random value between 0 and
+    min(max_delay, base_delay * 2**n).
+    """
+    def __init__(self, max_attempts=5, base_delay=1.0, max_delay=30.0, jitter=True,
+                 retry_on=(SERVER_ERROR, TIMEOUT, CONNECTION), retry_statuses=RETRY_STATUSES):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_on = frozenset(retry_on)
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def classify_status(self, status_code):
+        """
+        Returns SERVER_ERROR for retryable statuses, otherwise None.
+        """
+        return SERVER_ERROR if status_code in self.retry_statuses else None
+
+    def should_retry(self, reason, attempt):
+        """
+        True if a request that failed with reason on (0-based) attempt gets another try.
+        """
+        return reason in self.retry_on and attempt + 1 < self.max_attempts
+
+    def backoff(self, attempt):
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, cap) if self.jitter else cap
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failed requests and then holds every
+    request back (reserve() returns a wait) for `cooldown` seconds. After
+    that one probe request is let through: success closes the circuit, a
+    failure opens it again with the cooldown doubled (up to max_cooldown).
+
+    If the outage lasts longer than max_outage seconds, reserve() returns
+    None and requests fail right away (apart from the probes); unfinished
+    deletes stay in the job journal for a resume. Thread-safe, one instance can serve both clients.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    PROBE_POLL = 0.5
+
+    def __init__(self, threshold=5, cooldown=10.0, max_cooldown=120.0, max_outage=900.0):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_outage = max_outage
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = cooldown
+        self.opened_at = None  # start of the current outage
+        self.retry_at = 0.0
+        self._probe_started = None
+        self.trips = 0
+
+    def reserve(self):
+        """
+        Returns 0 if a request may be sent now, seconds to wait otherwise, or
+        None once the outage has outlasted max_outage.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0
+            # Past max_outage requests fail at once, but probes still go out so the circuit can close
+            gave_up = self.max_outage is not None and now - self.opened_at > self.max_outage
+            if now < self.retry_at:
+                return None if gave_up else self.retry_at - now
+            # Cooldown over: one probe at a time (a lost probe is replaced after a cooldown)
+            if self._probe_started is not None and now - self._probe_started < self.cooldown:
+                return None if gave_up else self.PROBE_POLL
+            self.state = self.HALF_OPEN
+            self._probe_started = now
+            return 0
+
+    def wait(self):
+        """
+        Blocks while the circuit is open. Returns False if the outage outlasted max_outage.
+        """
+        while True:
+            delay = self.reserve()
+            if delay is None:
+                return False
+            if delay <= 0:
+                return True
+            time.sleep(delay)
+
+    def record_success(self):
+        with self._lock:
+            recovered = self.state != self.CLOSED
+            self.state = self.CLOSED
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self.opened_at = None
+            self._probe_started = None
+        if recovered:
+            print_info("Discord is reachable again, resuming.")
+            logger.info("Circuit closed")
+
+    def record_failure(self):
+        """
+        Counts a failed request. Returns True if the circuit is open afterwards.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                # The probe failed: back off harder
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            elif self.state == self.CLOSED and self.failures < self.threshold:
+                return False
+            elif self.state == self.OPEN:
+                return True
+            tripped = self.state == self.CLOSED
+            self.state = self.OPEN
+            self.opened_at = self.opened_at or now
+            self.retry_at = now + self.cooldown
+            self._probe_started = None
+            self.trips += tripped
+            cooldown = self.cooldown
+        if tripped:
+            print_warning(f"{self.failures} requests failed in a row. Pausing all requests for {cooldown:g}s...")
+            logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+        else:
+            logger.info(f"Probe failed, next one in {cooldown:g}s")
+        return True
@@ -0,0 +1,41 @@
+import logging
+import os
+import sys
+
+import pytest
+
+# utils.setup_logging leaves loggers that already have handlers alone, so
+# test runs stay out of discord_tool.log and discord_audit.log
+logging.getLogger("DiscordTool").addHandler(logging.NullHandler())
+logging.getLogger("DiscordTool.audit").addHandler(logging.NullHandler())
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_server import MockDiscordState, MOCK_TOKEN, start_server  # noqa: E402
+
+
+@pytest.fixture
+def mock_discord():
+    """
+    Starts mock servers for a test: mock_discord(**state_options) returns
+    (state, base_url). Servers are shut down afterwards.
+    """
+    servers = []
+
+    def start(**options):
+        options.setdefault('rate_scale', 0.02)
+        state = MockDiscordState(**options)
+        server, base_url = start_server(state)
+        servers.append(server)
+        return state, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def mock_token():
+    return MOCK_TOKEN
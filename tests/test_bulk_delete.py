@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+
+from api_client import DiscordClient
+from deleter import MessageDeleter
+from journal import JobJournal
+from mock_server import DM_CHANNEL_ID, GUILD_ID
+from planner import BULK_DELETE_MAX_AGE, BULK_DELETE_ROUTE, DELETE_ROUTE, bulk_candidates, split_deletes
+from records import MessageRecord
+from utils import datetime_to_snowflake
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+def record(age, channel_id=1, offset=0):
+    return MessageRecord(datetime_to_snowflake(NOW - age) + offset, channel_id)
+
+
+# --- split_deletes ---
+
+def test_without_bulk_channels_every_message_is_single():
+    messages = [record(timedelta(hours=i), offset=i) for i in range(5)]
+    assert split_deletes(messages, (), now=NOW) == [[msg] for msg in messages]
+
+
+def test_cutoff_keeps_old_messages_single():
+    recent = [record(timedelta(days=13), offset=i) for i in range(3)]
+    # Within 14 days, but inside the safety margin
+    margin = record(BULK_DELETE_MAX_AGE + timedelta(minutes=10))
+    old = record(timedelta(days=15))
+    units = split_deletes([margin] + recent + [old], {1}, now=NOW)
+    assert units == [recent, [margin], [old]]
+
+
+def test_groups_hold_at_most_100_messages_per_channel():
+    messages = [record(timedelta(minutes=i), channel_id=1 + i % 2, offset=i) for i in range(402)]
+    units = split_deletes(messages, {1, 2}, now=NOW)
+    # 201 per channel: two full groups, and the leftover goes out as a single delete
+    assert sorted(len(unit) for unit in units) == [1, 1, 100, 100, 100, 100]
+    assert [len(unit) for unit in units[-2:]] == [1, 1]
+    for unit in units:
+        assert len({msg.channel_id for msg in unit}) == 1
+    assert sorted(msg.id for unit in units for msg in unit) == sorted(msg.id for msg in messages)
+
+
+def test_bulk_units_come_first_and_singles_keep_order():
+    messages = [record(timedelta(days=20), channel_id=1, offset=1),
+                record(timedelta(hours=1), channel_id=2, offset=2),
+                record(timedelta(hours=2), channel_id=1, offset=3),
+                record(timedelta(hours=3), channel_id=1, offset=4),
+                record(timedelta(days=30), channel_id=1, offset=5)]
+    units = split_deletes(messages, {1}, now=NOW)
+    assert units == [[messages[2], messages[3]], [messages[0]], [messages[1]], [messages[4]]]
+
+
+def test_a_lone_recent_message_is_not_a_candidate():
+    messages = [record(timedelta(hours=1), channel_id=1), record(timedelta(hours=1), channel_id=2, offset=1),
+                record(timedelta(hours=2), channel_id=2, offset=2)]
+    assert bulk_candidates(messages, now=NOW) == {2}
+    units = split_deletes(messages, {1}, now=NOW)
+    assert all(len(unit) == 1 for unit in units)
+    assert sorted(unit[0].id for unit in units) == sorted(msg.id for msg in messages)
+
+
+# --- Against the mock server ---
+
+def deleter_for(mock_discord, mock_token, tmp_path, **options):
+    state, base_url = mock_discord(**options)
+    client = DiscordClient(mock_token, base_url=base_url)
+    client.validate_token()
+    return state, client, MessageDeleter(client, JobJournal(str(tmp_path / "jobs.db")))
+
+
+def run_job(deleter, context_id, is_dm=False, before_delete=None):
+    job_id = deleter.journal.create_job(context_id, is_dm)
+    messages = deleter.scan_messages(context_id, is_dm, job_id=job_id)
+    plan = deleter.plan_deletes(messages)
+    if before_delete:
+        before_delete()
+    result = deleter.execute_deletion(messages, skip_confirm=True, job_id=job_id)
+    return messages, plan, result, deleter.journal.counts(job_id)
+
+
+def test_bulk_deletes_recent_messages_with_manage_messages(mock_discord, mock_token, tmp_path):
+    state, client, deleter = deleter_for(mock_discord, mock_token, tmp_path,
+                                         messages=200, span_days=10, manage_messages=True)
+    messages, plan, result, counts = run_job(deleter, GUILD_ID)
+
+    assert result == (len(messages), 0)
+    assert counts == {'deleted': len(messages)}
+    assert len(state.guild.own) == 0
+    requests = client.metrics.requests
+    assert requests[BULK_DELETE_ROUTE] > 0
+    # Only the channel whose overwrite takes Manage Messages away is deleted one by one
+    restricted = sum(1 for msg in messages if str(msg.channel_id) == state.restricted_channel)
+    assert requests[DELETE_ROUTE] == restricted
+    assert plan.requests[BULK_DELETE_ROUTE] == requests[BULK_DELETE_ROUTE]
+    assert plan.requests[DELETE_ROUTE] == requests[DELETE_ROUTE]
+
+
+def test_old_messages_are_deleted_one_by_one(mock_discord, mock_token, tmp_path):
+    state, client, deleter = deleter_for(mock_discord, mock_token, tmp_path,
+                                         messages=200, span_days=60, manage_messages=True)
+    messages, plan, result, counts = run_job(deleter, GUILD_ID)
+
+    assert result == (len(messages), 0)
+    assert counts == {'deleted': len(messages)}
+    requests = client.metrics.requests
+    bulk_deleted = len(messages) - requests[DELETE_ROUTE]
+    assert 0 < bulk_deleted < len(messages)
+    assert plan.requests == {route: requests[route] for route in plan.requests}
+
+
+def test_no_bulk_deletes_without_manage_messages(mock_discord, mock_token, tmp_path):
+    state, client, deleter = deleter_for(mock_discord, mock_token, tmp_path, messages=100, span_days=10)
+    messages, plan, result, counts = run_job(deleter, GUILD_ID)
+
+    assert result == (len(messages), 0)
+    assert counts == {'deleted': len(messages)}
+    assert client.metrics.requests[BULK_DELETE_ROUTE] == 0
+    assert client.metrics.requests[DELETE_ROUTE] == len(messages)
+    assert BULK_DELETE_ROUTE not in plan.requests
+
+
+def test_refused_bulk_delete_falls_back_to_single_deletes(mock_discord, mock_token, tmp_path):
+    state, client, deleter = deleter_for(mock_discord, mock_token, tmp_path,
+                                         messages=200, span_days=10, manage_messages=True)
+
+    def revoke():
+        state.manage_messages = False
+
+    messages, plan, result, counts = run_job(deleter, GUILD_ID, before_delete=revoke)
+
+    assert plan.requests[BULK_DELETE_ROUTE] > 0
+    assert result == (len(messages), 0)
+    assert counts == {'deleted': len(messages)}
+    assert len(state.guild.own) == 0
+    requests = client.metrics.requests
+    # One refused bulk delete per channel, then every message on its own
+    bulk_channels = {str(msg.channel_id) for msg in messages} - {state.restricted_channel}
+    assert requests[BULK_DELETE_ROUTE] == len(bulk_channels)
+    assert requests[DELETE_ROUTE] == len(messages)
+
+
+def test_large_channel_uses_several_bulk_deletes(mock_discord, mock_token, tmp_path):
+    state, client, deleter = deleter_for(mock_discord, mock_token, tmp_path, messages=440, guild_channels=1,
+                                         span_days=10, manage_messages=True)
+    messages, plan, result, counts = run_job(deleter, GUILD_ID)
+
+    assert len(messages) == 220
+    assert result == (220, 0)
+    assert counts == {'deleted': 220}
+    assert client.metrics.requests[BULK_DELETE_ROUTE] == 3  # 100 + 100 + 20
+    assert client.metrics.requests[DELETE_ROUTE] == 0
+
+
+def test_refusal_stops_bulk_deletes_for_the_rest_of_the_channel(mock_discord, mock_token, tmp_path):
+    state, client, deleter = deleter_for(mock_discord, mock_token, tmp_path, messages=440, guild_channels=1,
+                                         span_days=10, manage_messages=True)
+
+    def revoke():
+        state.manage_messages = False
+
+    messages, plan, result, counts = run_job(deleter, GUILD_ID, before_delete=revoke)
+
+    assert plan.requests[BULK_DELETE_ROUTE] == 3
+    assert result == (220, 0)
+    assert counts == {'deleted': 220}
+    # The first refusal is the only bulk request; the other two groups go one by one
+    assert client.metrics.requests[BULK_DELETE_ROUTE] == 1
+    assert client.metrics.requests[DELETE_ROUTE] == 220
+
+
+def test_dms_are_never_bulk_deleted(mock_discord, mock_token, tmp_path):
+    state, client, deleter = deleter_for(mock_discord, mock_token, tmp_path,
+                                         messages=60, span_days=10, manage_messages=True)
+    messages, plan, result, counts = run_job(deleter, DM_CHANNEL_ID, is_dm=True)
+
+    assert result == (len(messages), 0)
+    assert counts == {'deleted': len(messages)}
+    assert client.metrics.requests[BULK_DELETE_ROUTE] == 0
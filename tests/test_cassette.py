@@ -0,0 +1,64 @@
+import gzip
+
+from api_client import DiscordClient
+from cassette import Cassette, CassetteRecorder, redact, replay_client
+from deleter import MessageDeleter
+from mock_server import DM_CHANNEL_ID, GUILD_ID
+
+
+def test_redact_keeps_structure_and_masks_text():
+    message = {'id': "123", 'channel_id': "456", 'content': "call me at 555", 'timestamp': "2024-01-01T00:00:00",
+               'author': {'id': "789", 'username': "alice"}, 'attachments': [{'filename': "a.png", 'size': 10}],
+               'mention_ids': ["1", "2"], 'pinned': False, 'tags': ["private"]}
+    assert redact(message) == {
+        'id': "123", 'channel_id': "456", 'content': "xxxxxxxxxxxxxx", 'timestamp': "2024-01-01T00:00:00",
+        'author': {'id': "789", 'username': "xxxxx"}, 'attachments': [{'filename': "xxxxx", 'size': 10}],
+        'mention_ids': ["1", "2"], 'pinned': False, 'tags': ["xxxxxxx"],
+    }
+
+
+def record_session(base_url, mock_token, path):
+    client = DiscordClient(mock_token, base_url=base_url, recorder=CassetteRecorder(path, base_url))
+    client.validate_token()
+    deleter = MessageDeleter(client)
+    guild = deleter.scan_messages(GUILD_ID, content_query="secret")
+    dm = deleter.scan_messages(DM_CHANNEL_ID, is_dm=True)
+    client.close()
+    return guild, dm
+
+
+def test_recorded_session_is_redacted(mock_discord, mock_token, tmp_path):
+    state, base_url = mock_discord(messages=300, own_ratio=0.5)
+    path = str(tmp_path / "session.cassette.gz")
+    guild, dm = record_session(base_url, mock_token, path)
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        text = f.read()
+    assert mock_token not in text
+    assert "mock message" not in text and "secret" not in text and "mockuser" not in text
+    assert str(guild[0].id) in text and str(dm[0].id) in text
+    cassette = Cassette.load(path)
+    assert cassette.base_url == base_url
+    assert len(cassette.interactions) == state.stats['requests']
+
+
+def test_replay_returns_the_recorded_messages(mock_discord, mock_token, tmp_path):
+    state, base_url = mock_discord(messages=300, own_ratio=0.5)
+    path = str(tmp_path / "session.cassette.gz")
+    guild, dm = record_session(base_url, mock_token, path)
+    state_requests = state.stats['requests']
+
+    client = replay_client(path, speed=100)
+    client.validate_token()
+    deleter = MessageDeleter(client)
+    replayed_guild = deleter.scan_messages(GUILD_ID, content_query="secret")
+    replayed_dm = deleter.scan_messages(DM_CHANNEL_ID, is_dm=True)
+
+    assert [msg.id for msg in replayed_guild] == [msg.id for msg in guild]
+    assert [msg.id for msg in replayed_dm] == [msg.id for msg in dm]
+    # Content comes back masked, at its original length
+    assert all(set(msg.content) <= {'x'} for msg in replayed_guild + replayed_dm)
+    assert [len(msg.content) for msg in replayed_dm] == [len(msg.content) for msg in dm]
+    assert client.player.unmatched == 0 and client.player.reused == 0
+    assert state.stats['requests'] == state_requests  # nothing reached the server
+    client.close()
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from api_client import DiscordClient
+from mock_server import GUILD_ID
+
+
+def test_requests_share_one_keep_alive_connection(mock_discord, mock_token):
+    state, base_url = mock_discord(messages=50)
+    client = DiscordClient(mock_token, base_url=base_url)
+    client.validate_token()
+    for _ in range(10):
+        assert client.search_messages(guild_id=GUILD_ID, author_id=client.user_id)
+
+    summary = client.timing_summary()
+    assert summary['requests'] == 11
+    assert summary['new_connections'] == 1
+    assert client.last_timing['endpoint'] == f"/guilds/{GUILD_ID}/messages/search"
+    assert client.last_timing['status'] == 200
+    assert client.last_timing['connect'] == 0.0  # reused, no handshake
+
+    # Closing drops the pool; the next request connects again
+    client.close()
+    client.validate_token()
+    assert client.timing_summary()['new_connections'] == 2
+    client.close()
+
+
+def test_concurrent_workers_reuse_pooled_connections(mock_discord, mock_token):
+    state, base_url = mock_discord(messages=50, latency=0.05)
+    client = DiscordClient(mock_token, pool_size=3, base_url=base_url)
+    client.validate_token()
+
+    def burst():
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            return list(pool.map(lambda _: client.search_messages(guild_id=GUILD_ID, author_id=client.user_id),
+                                 range(12)))
+
+    assert all(burst())
+    opened = client.timing_summary()['new_connections']
+    assert 1 <= opened <= 3
+    # Every worker finds a kept-alive connection the second time round
+    assert all(burst())
+    assert client.timing_summary()['new_connections'] == opened
+    client.close()
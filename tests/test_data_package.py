@@ -0,0 +1,102 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+import data_package
+from data_package import _iter_json_array, iter_package_messages, list_channels
+from deleter import MessageDeleter
+from journal import KIND_DATA_PACKAGE, JobJournal
+
+DM_ID = "111111111111111111"
+GUILD_CHANNEL_ID = "222222222222222222"
+OLD_CHANNEL_ID = "333333333333333333"
+GUILD = "999999999999999999"
+
+
+def dm_rows(count):
+    return [{"ID": str(1000 + i), "Timestamp": "2021-01-01 00:00:00", "Contents": f"hello {i} é☃",
+             "Attachments": "https://cdn.example/file.png" if i % 5 == 0 else ""} for i in range(count)]
+
+
+@pytest.fixture
+def package(tmp_path):
+    """A package with a DM (messages.json), a server channel and an old-layout channel (messages.csv)."""
+    path = tmp_path / "package.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("messages/index.json", json.dumps({DM_ID: "Direct Message with someone"}))
+        archive.writestr(f"messages/c{DM_ID}/channel.json", json.dumps({"id": DM_ID, "type": 1}))
+        archive.writestr(f"messages/c{DM_ID}/messages.json", json.dumps(dm_rows(300), indent=2))
+        archive.writestr(f"messages/c{GUILD_CHANNEL_ID}/channel.json",
+                         json.dumps({"id": GUILD_CHANNEL_ID, "type": 0, "name": "general", "guild": {"id": GUILD}}))
+        archive.writestr(f"messages/c{GUILD_CHANNEL_ID}/messages.json",
+                         json.dumps([{"ID": "2001", "Contents": "secret plans", "Attachments": ""},
+                                     {"ID": "2002", "Contents": "lunch?", "Attachments": ""}]))
+        archive.writestr(f"messages/{OLD_CHANNEL_ID}/channel.json",
+                         json.dumps({"id": OLD_CHANNEL_ID, "type": 0, "guild": {"id": GUILD}}))
+        archive.writestr(f"messages/{OLD_CHANNEL_ID}/messages.csv",
+                         "ID,Timestamp,Contents,Attachments\r\n3001,2019-01-01,\"old, secret\",\r\n3002,2019-01-02,x,\r\n")
+    return str(path)
+
+
+def test_channels_are_listed_with_their_kind(package):
+    channels = {c['id']: c for c in list_channels(package)}
+    assert set(channels) == {DM_ID, GUILD_CHANNEL_ID, OLD_CHANNEL_ID}
+    assert channels[DM_ID]['is_dm'] and channels[DM_ID]['name'] == "Direct Message with someone"
+    assert not channels[GUILD_CHANNEL_ID]['is_dm'] and channels[GUILD_CHANNEL_ID]['guild_id'] == GUILD
+
+
+def test_filters_select_channels_and_content(package):
+    def ids(**filters):
+        return sorted(msg.id for batch in iter_package_messages(package, **filters) for msg in batch)
+
+    assert len(ids()) == 304
+    assert ids(is_dm=False) == [2001, 2002, 3001, 3002]
+    assert ids(guild_id=GUILD, content_query="SECRET") == [2001, 3001]
+    assert ids(channel_ids=[OLD_CHANNEL_ID]) == [3001, 3002]
+    dm = [msg for batch in iter_package_messages(package, is_dm=True) for msg in batch]
+    assert sum(msg.attachments for msg in dm) == 60
+    assert dm[1].content == "hello 1 é☃"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_json_array_is_decoded_across_chunk_boundaries(monkeypatch, chunk_size):
+    rows = dm_rows(50) + [12345678901234567890, "a string, with ] and [", None, [1, [2]]]
+    monkeypatch.setattr(data_package, "CHUNK_SIZE", chunk_size)
+    raw = io.BytesIO(("\ufeff" + json.dumps(rows, indent=1)).encode("utf-8"))
+    assert list(_iter_json_array(raw)) == rows
+    assert list(_iter_json_array(io.BytesIO(b" [ ] "))) == []
+
+
+@pytest.mark.parametrize("text", ['{"ID": 1}', '[{"ID": 1}, {"ID": 2}', '[{"ID": 1} {"ID": 2}]', '[{"ID": 1},'])
+def test_malformed_arrays_raise_value_error(text):
+    with pytest.raises(ValueError):
+        list(_iter_json_array(io.BytesIO(text.encode())))
+
+
+def test_damaged_messages_json_keeps_the_rows_before_the_damage(tmp_path):
+    path = tmp_path / "damaged.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(f"messages/c{DM_ID}/channel.json", json.dumps({"id": DM_ID, "type": 1}))
+        archive.writestr(f"messages/c{DM_ID}/messages.json", json.dumps(dm_rows(10))[:-40])
+    messages = [msg for batch in iter_package_messages(str(path)) for msg in batch]
+    assert [msg.id for msg in messages] == [1000 + i for i in range(9)]
+
+
+def test_journaled_package_scan_is_complete_and_resumable(package, tmp_path):
+    journal = JobJournal(str(tmp_path / "jobs.db"))
+    # No client: the package is read without a single API call
+    deleter = MessageDeleter(None, journal)
+    job_id = journal.create_job(package, False, "secret", kind=KIND_DATA_PACKAGE)
+    batches = []
+    messages = deleter.scan_data_package(package, is_dm=False, content_query="secret", job_id=job_id,
+                                         progress_callback=batches.append)
+
+    assert sorted(msg.id for msg in messages) == [2001, 3001]
+    assert len(batches) == 2  # one per channel
+    job = journal.get_job(job_id)
+    assert job['scan_complete'] and job['kind'] == KIND_DATA_PACKAGE
+    journal.record_result(job_id, 2001, True)
+    assert [msg.id for msg in deleter.resume_job(job_id)] == [3001]
+    journal.close()
@@ -0,0 +1,88 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from filters import RecordColumns, compile_filter
+from records import MessageRecord
+from utils import datetime_to_snowflake
+
+WORDS = ["hello", "good", "morning", "spam", "lol", "category", "cat", "concatenate", "2021", "Zebra", "naïve"]
+CHANNELS = [123, 456, 789, 1011]
+
+EXPRESSIONS = [
+    "",
+    "hello",
+    "HELLO good",
+    '"good morning"',
+    "-spam",
+    "cat -category",
+    "zebra",  # rare: found through the joined text
+    "-zebra",
+    're:^lol',
+    r'-re:"\d{4}"',
+    "after:2021-01-01",
+    "before:2022-06-01 after:2021-03-01",
+    "channel:123,456",
+    "-channel:789",
+    "has:attachment",
+    "-has:attachment",
+    "len>20",
+    "len>=5 len<=30",
+    "len<10",
+    "len=0",
+    "hello -spam channel:123 has:attachment len>5 after:2021-01-01",
+]
+
+
+@pytest.fixture(scope="module")
+def records():
+    rng = random.Random(7)
+    start = datetime(2020, 6, 1)
+    records = []
+    for i in range(3000):
+        words = rng.sample(WORDS, rng.randint(0, 4))
+        if rng.random() < 0.01:
+            words.append("Zebra")
+        sent = start + timedelta(minutes=rng.randint(0, 3 * 365 * 24 * 60))
+        records.append(MessageRecord(datetime_to_snowflake(sent) + i, rng.choice(CHANNELS), " ".join(words),
+                                     rng.random() < 0.3))
+    return records
+
+
+@pytest.mark.parametrize("expression", EXPRESSIONS)
+def test_columnar_select_agrees_with_per_record_match(records, expression):
+    flt = compile_filter(expression)
+    expected = [i for i, record in enumerate(records) if flt.matches(record)]
+    assert flt.select(RecordColumns(records)) == expected
+    assert flt.apply(records) == [records[i] for i in expected]
+
+
+def test_columns_extended_after_a_query(records):
+    flt = compile_filter("zebra")
+    columns = RecordColumns(records[:1000])
+    flt.select(columns)  # builds the joined text
+    columns.extend(records[1000:])
+    assert flt.select(columns) == [i for i, record in enumerate(records) if flt.matches(record)]
+
+
+def test_empty_expression_matches_everything(records):
+    flt = compile_filter("   ")
+    assert not flt
+    assert flt.apply(records) == records
+
+
+@pytest.mark.parametrize("expression, message", [
+    ("re:(unclosed", "bad regex"),
+    ("-after:2021-01-01", "use the other bound"),
+    ("-before:2021-01-01", "use the other bound"),
+    ("after:someday", "invalid date"),
+    ("channel:abc", "must be numeric"),
+    ("channel:123,x", "must be numeric"),
+    ("has:link", "only has:attachment"),
+    ("-len>5", "opposite comparison"),
+    ('"unbalanced', "Filter:"),
+])
+def test_bad_terms_raise_value_error(expression, message):
+    with pytest.raises(ValueError, match=message):
+        compile_filter(expression)
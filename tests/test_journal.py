@@ -0,0 +1,120 @@
+import pytest
+
+from api_client import DiscordClient
+from deleter import MessageDeleter
+from journal import KIND_API, KIND_DATA_PACKAGE, JobJournal
+from mock_server import GUILD_ID
+from records import MessageRecord
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = JobJournal(str(tmp_path / "jobs.db"))
+    yield journal
+    journal.close()
+
+
+def records(*ids, channel_id=9):
+    return [MessageRecord(message_id, channel_id, f"message {message_id}") for message_id in ids]
+
+
+def test_remaining_skips_deleted_and_skipped_and_retries_failed(journal):
+    job_id = journal.create_job("123", True)
+    journal.record_scanned(job_id, records(1, 2, 3, 4, 5))
+    journal.record_result(job_id, 1, True)
+    journal.record_result(job_id, 2, False)
+    journal.record_results(job_id, [3], True)
+    journal.skip_messages(job_id, [4])
+    assert [msg.id for msg in journal.remaining_messages(job_id)] == [5, 2]
+    assert journal.counts(job_id) == {'deleted': 2, 'failed': 1, 'pending': 1, 'skipped': 1}
+
+
+def test_skip_leaves_deleted_messages_alone(journal):
+    job_id = journal.create_job("123", True)
+    journal.record_scanned(job_id, records(1, 2))
+    journal.record_result(job_id, 1, True)
+    journal.skip_messages(job_id, [1, 2])
+    assert journal.counts(job_id) == {'deleted': 1, 'skipped': 1}
+
+
+def test_rescanned_messages_keep_their_status(journal):
+    job_id = journal.create_job("123", True)
+    journal.record_scanned(job_id, records(5, 6))
+    journal.record_result(job_id, 6, True)
+    journal.record_scanned(job_id, records(4, 5, 6))
+    assert journal.counts(job_id) == {'deleted': 1, 'pending': 2}
+    assert journal.get_job(job_id)['scan_cursor'] == 4
+
+
+def test_job_finishes_only_when_scanned_and_nothing_is_left(journal):
+    job_id = journal.create_job("123", False, "hello", {'min_id': 10, 'has': ['file'], 'channel_ids': []})
+    journal.record_scanned(job_id, records(1, 2))
+    journal.record_results(job_id, [1, 2], True)
+    assert not journal.finish_if_done(job_id)  # the scan may still find more
+    journal.mark_scan_complete(job_id)
+    journal.record_result(job_id, 2, False)
+    assert not journal.finish_if_done(job_id)
+    journal.record_result(job_id, 2, True)
+    assert journal.finish_if_done(job_id)
+    assert journal.list_jobs() == []
+    job = journal.list_jobs(unfinished_only=False)[0]
+    assert job['filters'] == {'min_id': 10, 'has': ['file']}
+    assert job['content_query'] == "hello"
+    assert job['kind'] == KIND_API
+
+
+def test_unfinished_data_package_job_is_not_rescanned(mock_discord, mock_token, journal):
+    state, base_url = mock_discord(messages=20, own_ratio=1.0)
+    client = DiscordClient(mock_token, base_url=base_url)
+    client.validate_token()
+    deleter = MessageDeleter(client, journal)
+
+    job_id = journal.create_job("C:/data/package.zip", False, kind=KIND_DATA_PACKAGE)
+    journal.record_scanned(job_id, records(1, 2))
+    assert journal.get_job(job_id)['kind'] == KIND_DATA_PACKAGE
+    assert sorted(msg.id for msg in deleter.resume_job(job_id)) == [1, 2]
+    assert sum(client.metrics.requests.values()) == 1  # only validate_token; the package path is not searched
+
+
+# --- Resuming against the mock server ---
+
+def test_resume_deletes_pending_and_failed_and_accepts_404s(mock_discord, mock_token, journal):
+    state, base_url = mock_discord(messages=60, own_ratio=1.0)
+    client = DiscordClient(mock_token, base_url=base_url)
+    client.validate_token()
+    deleter = MessageDeleter(client, journal)
+
+    job_id = journal.create_job(GUILD_ID, False)
+    messages = deleter.scan_messages(GUILD_ID, False, job_id=job_id)
+    deleted, failed, gone, pending = messages[:10], messages[10:15], messages[15:20], messages[20:]
+    assert deleter.execute_deletion(deleted, skip_confirm=True, job_id=job_id) == (10, 0)
+    for msg in failed:
+        journal.record_result(job_id, msg.id, False)
+    # Deleted by other means since: the API answers 404
+    for msg in gone:
+        assert client.delete_message(msg.channel_id, msg.id)
+
+    remaining = deleter.resume_job(job_id)
+    assert {msg.id for msg in remaining} == {msg.id for msg in failed + gone + pending}
+    assert deleter.execute_deletion(remaining, skip_confirm=True, job_id=job_id) == (len(remaining), 0)
+    assert client.metrics.statuses['404'] == len(gone)
+    assert journal.counts(job_id) == {'deleted': len(messages)}
+    assert journal.get_job(job_id)['finished']
+    assert len(state.guild.own) == 0
+
+
+def test_resume_finishes_an_interrupted_scan(mock_discord, mock_token, journal):
+    state, base_url = mock_discord(messages=200, own_ratio=1.0)
+    client = DiscordClient(mock_token, base_url=base_url)
+    client.validate_token()
+    deleter = MessageDeleter(client, journal)
+
+    job_id = journal.create_job(GUILD_ID, False)
+    messages = sorted(deleter.scan_messages(GUILD_ID, False), key=lambda msg: -msg.id)
+    # The scan stopped after the newest 60 messages
+    journal.record_scanned(job_id, messages[:60])
+    assert not journal.get_job(job_id)['scan_complete']
+
+    remaining = deleter.resume_job(job_id)
+    assert {msg.id for msg in remaining} == {msg.id for msg in messages}
+    assert journal.get_job(job_id)['scan_complete']
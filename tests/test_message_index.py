@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from api_client import DiscordClient
+from deleter import MessageDeleter
+from message_index import RESYNC_AGE, MessageIndex
+from mock_server import GUILD_ID
+from utils import datetime_to_snowflake
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = MessageIndex(str(tmp_path / "index.db"))
+    yield index
+    index.close()
+
+
+def deleter_for(mock_discord, mock_token, index, **options):
+    state, base_url = mock_discord(**options)
+    client = DiscordClient(mock_token, base_url=base_url)
+    client.validate_token()
+    return state, client, MessageDeleter(client, index=index)
+
+
+def indexed_ids(index, client):
+    return {msg.id for msg in index.query(client.user_id, GUILD_ID)}
+
+
+def expire(index):
+    """Backdates every full scan past RESYNC_AGE, so the next index_scan re-syncs."""
+    with index._lock:
+        index.conn.execute("UPDATE scan_state SET scanned_at = scanned_at - ?", (RESYNC_AGE + 60,))
+        index.conn.commit()
+
+
+def test_rescan_only_fetches_newer_messages(mock_discord, mock_token, index):
+    state, client, deleter = deleter_for(mock_discord, mock_token, index, messages=200, own_ratio=0.5)
+    assert deleter.index_scan(GUILD_ID) == len(state.guild.own)
+    assert indexed_ids(index, client) == set(state.guild.own)
+    assert index.high_water(client.user_id, GUILD_ID) == max(state.guild.own)
+
+    new_id = datetime_to_snowflake(datetime.now(timezone.utc)) + 1
+    state.guild.own.append(new_id)
+    assert deleter.index_scan(GUILD_ID) == 1
+    assert index.high_water(client.user_id, GUILD_ID) == new_id
+    assert new_id in indexed_ids(index, client)
+
+
+def test_deleting_through_the_deleter_removes_from_the_index(mock_discord, mock_token, index):
+    state, client, deleter = deleter_for(mock_discord, mock_token, index, messages=100, own_ratio=1.0,
+                                         guild_channels=1)
+    deleter.index_scan(GUILD_ID)
+    messages = index.query(client.user_id, GUILD_ID)
+    assert deleter.execute_deletion(messages[:10], skip_confirm=True) == (10, 0)
+    assert indexed_ids(index, client) == {msg.id for msg in messages[10:]}
+
+
+def test_incremental_scan_keeps_messages_deleted_elsewhere(mock_discord, mock_token, index):
+    state, client, deleter = deleter_for(mock_discord, mock_token, index, messages=100, own_ratio=1.0)
+    deleter.index_scan(GUILD_ID)
+    gone = list(state.guild.own[:5])
+    for message_id in gone:
+        state.guild.remove(message_id)
+
+    # Within RESYNC_AGE only newer messages are asked for
+    deleter.index_scan(GUILD_ID)
+    assert set(gone) <= indexed_ids(index, client)
+
+
+def test_resync_prunes_messages_deleted_elsewhere(mock_discord, mock_token, index):
+    state, client, deleter = deleter_for(mock_discord, mock_token, index, messages=100, own_ratio=1.0)
+    deleter.index_scan(GUILD_ID)
+    gone = list(state.guild.own[:5])
+    for message_id in gone:
+        state.guild.remove(message_id)
+
+    expire(index)
+    assert index.needs_resync(client.user_id, GUILD_ID)
+    assert deleter.index_scan(GUILD_ID) == len(state.guild.own)
+    assert indexed_ids(index, client) == set(state.guild.own)
+    assert not index.needs_resync(client.user_id, GUILD_ID)
+    assert index.query(client.user_id, GUILD_ID, keyword="secret")  # the full-text index follows the pruning
+    assert all(msg.id not in gone for msg in index.query(client.user_id, GUILD_ID, keyword="mock"))
+
+
+def test_incremental_scans_do_not_postpone_the_resync(index):
+    assert index.needs_resync(1, GUILD_ID)
+    index.set_high_water(1, GUILD_ID, 50, full=True)
+    assert not index.needs_resync(1, GUILD_ID)
+    expire(index)
+    # An incremental scan moves the mark but not the re-sync clock
+    index.set_high_water(1, GUILD_ID, 60)
+    assert index.high_water(1, GUILD_ID) == 60
+    assert index.needs_resync(1, GUILD_ID)
@@ -0,0 +1,100 @@
+from permissions import (ADMINISTRATOR, ALL_PERMISSIONS, MANAGE_MESSAGES, MEMBER_OVERWRITE, READ_MESSAGE_HISTORY,
+                         ROLE_OVERWRITE, VIEW_CHANNEL, base_permissions, can_bulk_delete, channel_permissions)
+
+GUILD_ID = "100"
+USER_ID = "200"
+OWNER_ID = "300"
+MOD_ROLE = "400"
+OTHER_ROLE = "500"
+
+EVERYONE = VIEW_CHANNEL | READ_MESSAGE_HISTORY
+
+
+def guild(mod_permissions=MANAGE_MESSAGES, everyone=EVERYONE):
+    return {
+        'id': GUILD_ID,
+        'owner_id': OWNER_ID,
+        'roles': [
+            {'id': GUILD_ID, 'permissions': str(everyone)},
+            {'id': MOD_ROLE, 'permissions': str(mod_permissions)},
+            {'id': OTHER_ROLE, 'permissions': '0'},
+        ],
+    }
+
+
+def member(*roles):
+    return {'roles': list(roles)}
+
+
+def channel(*overwrites):
+    return {'id': "900", 'guild_id': GUILD_ID, 'permission_overwrites': list(overwrites)}
+
+
+def overwrite(target, kind, allow=0, deny=0):
+    return {'id': target, 'type': kind, 'allow': str(allow), 'deny': str(deny)}
+
+
+def test_role_grants_manage_messages():
+    assert can_bulk_delete(guild(), member(MOD_ROLE), channel(), USER_ID)
+    assert not can_bulk_delete(guild(), member(), channel(), USER_ID)
+
+
+def test_role_deny_overwrite_removes_role_grant():
+    ch = channel(overwrite(MOD_ROLE, ROLE_OVERWRITE, deny=MANAGE_MESSAGES))
+    assert not can_bulk_delete(guild(), member(MOD_ROLE), ch, USER_ID)
+
+
+def test_member_allow_beats_role_deny():
+    ch = channel(overwrite(MOD_ROLE, ROLE_OVERWRITE, deny=MANAGE_MESSAGES),
+                 overwrite(USER_ID, MEMBER_OVERWRITE, allow=MANAGE_MESSAGES))
+    assert can_bulk_delete(guild(), member(MOD_ROLE), ch, USER_ID)
+
+
+def test_member_deny_beats_role_allow():
+    ch = channel(overwrite(OTHER_ROLE, ROLE_OVERWRITE, allow=MANAGE_MESSAGES),
+                 overwrite(USER_ID, MEMBER_OVERWRITE, deny=MANAGE_MESSAGES))
+    assert not can_bulk_delete(guild(), member(OTHER_ROLE), ch, USER_ID)
+
+
+def test_role_overwrites_apply_after_everyone():
+    ch = channel(overwrite(GUILD_ID, ROLE_OVERWRITE, deny=VIEW_CHANNEL | MANAGE_MESSAGES),
+                 overwrite(OTHER_ROLE, ROLE_OVERWRITE, allow=VIEW_CHANNEL))
+    permissions = channel_permissions(guild(), member(MOD_ROLE, OTHER_ROLE), ch, USER_ID)
+    assert permissions & VIEW_CHANNEL
+    assert not permissions & MANAGE_MESSAGES
+
+
+def test_role_allow_wins_over_another_role_deny():
+    # Role overwrites are combined before being applied: allow is applied last
+    ch = channel(overwrite(MOD_ROLE, ROLE_OVERWRITE, deny=MANAGE_MESSAGES),
+                 overwrite(OTHER_ROLE, ROLE_OVERWRITE, allow=MANAGE_MESSAGES))
+    assert can_bulk_delete(guild(), member(MOD_ROLE, OTHER_ROLE), ch, USER_ID)
+
+
+def test_overwrites_of_other_roles_and_members_are_ignored():
+    ch = channel(overwrite(OTHER_ROLE, ROLE_OVERWRITE, deny=MANAGE_MESSAGES),
+                 overwrite("999", MEMBER_OVERWRITE, deny=MANAGE_MESSAGES))
+    assert can_bulk_delete(guild(), member(MOD_ROLE), ch, USER_ID)
+
+
+def test_hidden_channel_cannot_be_bulk_deleted():
+    ch = channel(overwrite(GUILD_ID, ROLE_OVERWRITE, deny=VIEW_CHANNEL))
+    assert not can_bulk_delete(guild(), member(MOD_ROLE), ch, USER_ID)
+
+
+def test_owner_gets_everything_despite_overwrites():
+    ch = channel(overwrite(OWNER_ID, MEMBER_OVERWRITE, deny=MANAGE_MESSAGES | VIEW_CHANNEL))
+    assert base_permissions(guild(), member(), OWNER_ID) == ALL_PERMISSIONS
+    assert can_bulk_delete(guild(), member(), ch, OWNER_ID)
+
+
+def test_administrator_ignores_overwrites():
+    ch = channel(overwrite(USER_ID, MEMBER_OVERWRITE, deny=MANAGE_MESSAGES | VIEW_CHANNEL))
+    g = guild(mod_permissions=ADMINISTRATOR)
+    assert channel_permissions(g, member(MOD_ROLE), ch, USER_ID) == ALL_PERMISSIONS
+    assert can_bulk_delete(g, member(MOD_ROLE), ch, USER_ID)
+
+
+def test_everyone_role_grants_to_all_members():
+    g = guild(everyone=EVERYONE | MANAGE_MESSAGES)
+    assert can_bulk_delete(g, member(), channel(), USER_ID)
@@ -0,0 +1,73 @@
+import asyncio
+
+from api_client import DiscordClient
+from async_client import AsyncDiscordClient
+from deleter import MessageDeleter
+from journal import JobJournal
+from mock_server import DM_CHANNEL_ID, GUILD_ID
+
+
+def matching(history, channel_id, kind):
+    return {msg_id for msg_id in history.own if history.channel_of(msg_id) == channel_id and kind in history.has_of(msg_id)}
+
+
+def test_async_pipeline_applies_search_filters(mock_discord, mock_token):
+    state, base_url = mock_discord(messages=300, own_ratio=0.5, guild_channels=3)
+    channel_id = state.guild_channel_ids[0]
+    targets = matching(state.guild, channel_id, 'file')
+    untouched = set(state.guild.own) - targets
+    assert targets
+
+    async def run():
+        async with AsyncDiscordClient(mock_token, base_url=base_url) as client:
+            await client.validate_token()
+            deleter = MessageDeleter(client)
+            return await deleter.run_pipeline_async(GUILD_ID, has=['file'], channel_ids=[channel_id])
+
+    assert asyncio.run(run()) == (len(targets), 0)
+    assert set(state.guild.own) == untouched
+
+
+def run_sync(base_url, mock_token, journal, context_id, is_dm, **options):
+    client = DiscordClient(mock_token, base_url=base_url)
+    client.validate_token()
+    job_id = journal.create_job(context_id, is_dm, options.get('content_query'))
+    progress = []
+    result = MessageDeleter(client, journal).run_pipeline(
+        context_id, is_dm, job_id=job_id, progress_callback=lambda *args: progress.append(args), **options)
+    return result, job_id, progress
+
+
+def run_async(base_url, mock_token, journal, context_id, is_dm, **options):
+    async def run():
+        async with AsyncDiscordClient(mock_token, base_url=base_url) as client:
+            await client.validate_token()
+            job_id = journal.create_job(context_id, is_dm, options.get('content_query'))
+            progress = []
+            result = await MessageDeleter(client, journal).run_pipeline_async(
+                context_id, is_dm, job_id=job_id, progress_callback=lambda *args: progress.append(args), **options)
+            return result, job_id, progress
+
+    return asyncio.run(run())
+
+
+def test_sync_and_async_pipelines_delete_the_same_messages(mock_discord, mock_token, tmp_path):
+    journal = JobJournal(str(tmp_path / "jobs.db"))
+    for context_id, is_dm, history in ((GUILD_ID, False, 'guild'), (DM_CHANNEL_ID, True, 'dm')):
+        # Both clients must leave the same state behind: exactly the matches deleted
+        for run in (run_sync, run_async):
+            state, base_url = mock_discord(messages=400, own_ratio=0.5, guild_channels=1)
+            messages = getattr(state, history)
+            targets = {msg_id for msg_id in messages.own if 'secret' in messages.content_of(msg_id)}
+            others = set(messages.other)
+            kept = set(messages.own) - targets
+
+            result, job_id, progress = run(base_url, mock_token, journal, context_id, is_dm,
+                                           content_query="secret", lookahead=1)
+            assert result == (len(targets), 0)
+            assert set(messages.own) == kept
+            assert set(messages.other) == others
+            assert len(progress) == len(targets)
+            assert progress[-1][:2] == (len(targets), 0)
+            assert journal.get_job(job_id)['finished']
+    journal.close()
@@ -0,0 +1,195 @@
+import asyncio
+
+import pytest
+
+from api_client import DiscordClient, RateLimitScheduler
+from async_client import AsyncDiscordClient
+from mock_server import GUILD_ID
+
+DELETE = ("DELETE", "/channels/111/messages/1")
+DELETE_OTHER_MESSAGE = ("DELETE", "/channels/111/messages/2")
+DELETE_OTHER_CHANNEL = ("DELETE", "/channels/222/messages/3")
+SEARCH = ("GET", "/guilds/333/messages/search")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def scheduler(clock):
+    return RateLimitScheduler(global_limit=50, clock=clock)
+
+
+def headers(bucket="delete-hash", limit=5, remaining=4, reset_after=5.0):
+    return {'X-RateLimit-Bucket': bucket, 'X-RateLimit-Limit': str(limit),
+            'X-RateLimit-Remaining': str(remaining), 'X-RateLimit-Reset-After': str(reset_after)}
+
+
+def test_route_key_keeps_only_the_major_id():
+    assert RateLimitScheduler.route_key(*DELETE) == "DELETE /channels/111/messages/{id}"
+    assert RateLimitScheduler.route_key("GET", "/users/@me?x=1") == "GET /users/@me"
+
+
+def test_unknown_route_lets_one_request_through_to_discover_its_bucket(scheduler):
+    assert scheduler.reserve(*DELETE) == 0
+    # The bucket is unknown until the first response: everyone else polls
+    assert scheduler.reserve(*DELETE_OTHER_MESSAGE) == RateLimitScheduler.DISCOVERY_POLL
+    scheduler.update(*DELETE, headers(remaining=4))
+    for _ in range(4):
+        assert scheduler.reserve(*DELETE_OTHER_MESSAGE) == 0
+    assert scheduler.reserve(*DELETE_OTHER_MESSAGE) == pytest.approx(5.0)
+
+
+def test_a_response_without_bucket_headers_ends_discovery(scheduler):
+    assert scheduler.reserve(*SEARCH) == 0
+    scheduler.update(*SEARCH, {})
+    assert scheduler.reserve(*SEARCH) == 0
+
+
+def test_exhausted_bucket_refills_after_its_window(scheduler, clock):
+    scheduler.reserve(*DELETE)
+    scheduler.update(*DELETE, headers(remaining=0, reset_after=2.0))
+    clock.now += 0.5
+    assert scheduler.reserve(*DELETE) == pytest.approx(1.5)
+    clock.now += 1.5
+    for _ in range(5):
+        assert scheduler.reserve(*DELETE) == 0
+    assert scheduler.reserve(*DELETE) == pytest.approx(2.0)
+
+
+def test_buckets_are_per_major_id(scheduler):
+    scheduler.reserve(*DELETE)
+    scheduler.update(*DELETE, headers(remaining=0))
+    assert scheduler.reserve(*DELETE) > 0
+    # Same bucket hash, other channel: discovered and limited separately
+    assert scheduler.reserve(*DELETE_OTHER_CHANNEL) == 0
+    scheduler.update(*DELETE_OTHER_CHANNEL, headers(remaining=3))
+    assert scheduler.reserve(*DELETE_OTHER_CHANNEL) == 0
+
+
+def test_remaining_is_never_raised_within_a_window(scheduler):
+    scheduler.reserve(*DELETE)
+    scheduler.update(*DELETE, headers(remaining=1))
+    assert scheduler.reserve(*DELETE) == 0
+    # A late response from earlier in the same window reports more room than is left
+    scheduler.update(*DELETE, headers(remaining=3))
+    assert scheduler.reserve(*DELETE) > 0
+
+
+def test_global_limit(clock):
+    scheduler = RateLimitScheduler(global_limit=3, clock=clock)
+    for route in (DELETE, DELETE_OTHER_CHANNEL, SEARCH):
+        assert scheduler.reserve(*route) == 0
+    clock.now += 0.25
+    assert scheduler.reserve("GET", "/users/@me") == pytest.approx(0.75)
+    clock.now += 0.75
+    assert scheduler.reserve("GET", "/users/@me") == 0
+
+
+def test_penalize_blocks_the_route_until_retry_after(scheduler, clock):
+    scheduler.reserve(*DELETE)
+    scheduler.update(*DELETE, headers(remaining=4))
+    scheduler.penalize(*DELETE, 8.0)
+    assert scheduler.reserve(*DELETE_OTHER_MESSAGE) == pytest.approx(8.0)
+    assert scheduler.reserve(*DELETE_OTHER_CHANNEL) == 0
+    clock.now += 8.0
+    assert scheduler.reserve(*DELETE) == 0
+
+
+def test_penalize_never_shortens_the_known_reset(scheduler):
+    scheduler.reserve(*DELETE)
+    scheduler.update(*DELETE, headers(remaining=4, reset_after=5.0))
+    scheduler.penalize(*DELETE, 3.0)
+    assert scheduler.reserve(*DELETE) == pytest.approx(5.0)
+
+
+def test_penalize_during_discovery(scheduler, clock):
+    assert scheduler.reserve(*SEARCH) == 0
+    # 429 on the discovery request: no bucket known yet, the route itself is blocked
+    scheduler.penalize(*SEARCH, 2.0)
+    assert scheduler.reserve(*SEARCH) == pytest.approx(2.0)
+    clock.now += 2.0
+    assert scheduler.reserve(*SEARCH) == 0
+
+
+def test_global_penalty_blocks_every_route(scheduler, clock):
+    scheduler.penalize(*DELETE, 1.5, is_global=True)
+    assert scheduler.reserve(*SEARCH) == pytest.approx(1.5)
+    assert scheduler.reserve(*DELETE_OTHER_CHANNEL) == pytest.approx(1.5)
+    clock.now += 1.5
+    assert scheduler.reserve(*SEARCH) == 0
+
+
+def test_release_ends_discovery_without_a_response(scheduler):
+    assert scheduler.reserve(*SEARCH) == 0
+    scheduler.release(*SEARCH)
+    assert scheduler.reserve(*SEARCH) == 0
+
+
+def test_observed_limits(scheduler):
+    scheduler.reserve(*DELETE)
+    scheduler.update(*DELETE, headers(limit=5, remaining=4, reset_after=5.0))
+    assert scheduler.observed_limits() == {"DELETE /channels/{id}/messages/{id}": (5, 5.0)}
+
+
+def test_client_waits_out_a_429_and_retries(mock_discord, mock_token):
+    state, base_url = mock_discord(messages=60, own_ratio=1.0, rate_scale=0.05)
+    channel_id = state.guild_channel_ids[0]
+    ids = [message_id for message_id in state.guild.own if state.guild.channel_of(message_id) == channel_id]
+    # Another client has used up the channel's delete bucket
+    other = DiscordClient(mock_token, base_url=base_url)
+    for message_id in ids[:5]:
+        other.session.delete(f"{base_url}/channels/{channel_id}/messages/{message_id}", headers=other.headers)
+
+    client = DiscordClient(mock_token, base_url=base_url)
+    assert client.delete_message(channel_id, ids[5])
+    assert state.stats['rate_limited'] == 1
+    assert client.metrics.rate_limited == 1
+    assert dict(client.metrics.retries) == {'429': 1}
+    # retry_after plus the scheduler's 0.5s margin
+    assert client.metrics.rate_limit_sleep >= 0.5
+
+
+def test_interrupted_first_request_does_not_wedge_its_route(mock_discord, mock_token, monkeypatch):
+    state, base_url = mock_discord(messages=20)
+    client = DiscordClient(mock_token, base_url=base_url)
+    client.validate_token()
+    send = client.session.request
+
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(client.session, 'request', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        client.search_messages(guild_id=GUILD_ID, author_id=client.user_id)
+    monkeypatch.setattr(client.session, 'request', send)
+
+    assert client.scheduler.reserve("GET", f"/guilds/{GUILD_ID}/messages/search") == 0
+    client.scheduler.release("GET", f"/guilds/{GUILD_ID}/messages/search")
+    assert client.search_messages(guild_id=GUILD_ID, author_id=client.user_id)['total_results'] > 0
+
+
+def test_cancelled_first_request_does_not_wedge_its_route(mock_discord, mock_token):
+    state, base_url = mock_discord(messages=20, latency=0.5)
+
+    async def run():
+        async with AsyncDiscordClient(mock_token, base_url=base_url) as client:
+            await client.validate_token()
+            search = asyncio.ensure_future(client.search_messages(guild_id=GUILD_ID, author_id=client.user_id))
+            await asyncio.sleep(0.1)
+            search.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await search
+            return await asyncio.wait_for(client.search_messages(guild_id=GUILD_ID, author_id=client.user_id), 5)
+
+    assert asyncio.run(run())['total_results'] > 0
@@ -0,0 +1,117 @@
+import time
+
+import pytest
+
+from api_client import DiscordClient
+from deleter import MessageDeleter
+from mock_server import GUILD_ID
+from retry import CONNECTION, SERVER_ERROR, TIMEOUT, CircuitBreaker, RetryPolicy
+
+
+# --- RetryPolicy ---
+
+def test_backoff_is_capped_and_jittered():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    for attempt in range(8):
+        cap = min(5.0, 2 ** attempt)
+        assert all(0 <= policy.backoff(attempt) <= cap for _ in range(50))
+    assert RetryPolicy(base_delay=1.0, max_delay=5.0, jitter=False).backoff(6) == 5.0
+
+
+def test_retry_decisions():
+    policy = RetryPolicy(max_attempts=3, retry_on=(SERVER_ERROR, TIMEOUT))
+    assert policy.classify_status(502) == SERVER_ERROR
+    assert policy.classify_status(404) is None
+    assert policy.should_retry(TIMEOUT, 1)
+    assert not policy.should_retry(TIMEOUT, 2)  # the third try was the last
+    assert not policy.should_retry(CONNECTION, 0)
+
+
+# --- CircuitBreaker ---
+
+def test_breaker_opens_after_threshold_failures():
+    breaker = CircuitBreaker(threshold=3, cooldown=0.2)
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.reserve() == 0
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.trips == 1
+    assert 0 < breaker.reserve() <= 0.2
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(threshold=3, cooldown=0.2)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    assert not breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.reserve() == 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # A second request waits while the probe is out
+    assert breaker.reserve() == CircuitBreaker.PROBE_POLL
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.reserve() == 0
+
+
+def test_failed_probe_reopens_with_a_longer_cooldown():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05, max_cooldown=0.15)
+    breaker.record_failure()
+    for expected in (0.1, 0.15, 0.15):
+        time.sleep(breaker.reserve())
+        assert breaker.reserve() == 0  # the probe
+        assert breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.cooldown == pytest.approx(expected)
+    assert breaker.trips == 1  # one outage, however many probes fail
+
+
+def test_breaker_gives_up_after_max_outage():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05, max_outage=0.08)
+    breaker.record_failure()
+    assert breaker.wait() is True  # cooldown over, this is the probe
+    breaker.record_failure()  # next probe in 0.1s
+    time.sleep(0.05)
+    assert breaker.reserve() is None
+    assert breaker.wait() is False
+    # Probes still go out, so the circuit can close again
+    time.sleep(0.06)
+    assert breaker.reserve() == 0
+
+
+# --- Against the mock server ---
+
+def client_for(base_url, mock_token, **breaker_options):
+    client = DiscordClient(mock_token, base_url=base_url, retry_policy=RetryPolicy(base_delay=0.01, max_delay=0.05),
+                           breaker=CircuitBreaker(**breaker_options))
+    client.validate_token()
+    return client
+
+
+def test_scan_waits_out_an_outage(mock_discord, mock_token):
+    state, base_url = mock_discord(messages=200)
+    client = client_for(base_url, mock_token, threshold=3, cooldown=0.1)
+    state.start_outage(0.5)
+    messages = MessageDeleter(client).scan_messages(GUILD_ID)
+
+    assert {msg.id for msg in messages} == set(state.guild.own)
+    assert client.breaker.trips == 1
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    assert client.metrics.retries[SERVER_ERROR] >= 3
+
+
+def test_transient_errors_are_retried(mock_discord, mock_token):
+    state, base_url = mock_discord(messages=200, seed=3)
+    client = client_for(base_url, mock_token, threshold=50)
+    state.error_rate = 0.3
+    messages = MessageDeleter(client).scan_messages(GUILD_ID)
+
+    assert {msg.id for msg in messages} == set(state.guild.own)
+    assert state.stats['errors'] > 0
+    assert client.breaker.trips == 0
@@ -0,0 +1,162 @@
+from api_client import DiscordClient
+from deleter import SOURCE_HISTORY, SOURCE_SEARCH, MessageDeleter
+from mock_server import DM_CHANNEL_ID, GUILD_ID
+
+
+def deleter_for(mock_discord, mock_token, **options):
+    state, base_url = mock_discord(**options)
+    client = DiscordClient(mock_token, base_url=base_url)
+    client.validate_token()
+    return state, client, MessageDeleter(client)
+
+
+def record_searches(client):
+    """Keeps the arguments of every search the client sends in a list."""
+    searches = []
+    search = client.search_messages
+
+    def recording(**kwargs):
+        searches.append(kwargs)
+        return search(**kwargs)
+
+    client.search_messages = recording
+    return searches
+
+
+# --- Snowflake windows ---
+
+def test_small_range_is_paged_as_one_window(mock_discord, mock_token):
+    state, client, deleter = deleter_for(mock_discord, mock_token, messages=200, own_ratio=0.5)
+    searches = record_searches(client)
+    windows = list(deleter.iter_scan(GUILD_ID))
+
+    assert len(windows) == 1
+    assert {msg.id for msg in windows[0]} == set(state.guild.own)
+    assert len(searches) == 4  # 100 hits, 25 per page
+    assert [s['offset'] for s in searches] == [0, 25, 50, 75]
+
+
+def test_windows_split_above_window_max_results(mock_discord, mock_token):
+    state, client, deleter = deleter_for(mock_discord, mock_token, messages=2400, own_ratio=0.5)
+    searches = record_searches(client)
+    windows = list(deleter.iter_scan(GUILD_ID))
+
+    ids = [msg.id for window in windows for msg in window]
+    assert len(ids) == len(set(ids)) == len(state.guild.own)
+    assert set(ids) == set(state.guild.own)
+    assert len(windows) > 1
+    # No window is paged past its WINDOW_MAX_RESULTS hits
+    assert max(s['offset'] for s in searches) < MessageDeleter.WINDOW_MAX_RESULTS
+    # Newest window first, and windows never overlap
+    for newer, older in zip(windows, windows[1:]):
+        assert min(msg.id for msg in newer) > max(msg.id for msg in older)
+
+
+def test_window_size_follows_the_threshold(mock_discord, mock_token):
+    state, client, deleter = deleter_for(mock_discord, mock_token, messages=400, own_ratio=0.5)
+    deleter.WINDOW_MAX_RESULTS = 50
+    searches = record_searches(client)
+    messages = deleter.scan_messages(GUILD_ID)
+
+    assert {msg.id for msg in messages} == set(state.guild.own)
+    assert max(s['offset'] for s in searches) < 50
+    assert deleter.last_scan_complete
+
+
+def test_explicit_bounds_limit_the_walk(mock_discord, mock_token):
+    state, client, deleter = deleter_for(mock_discord, mock_token, messages=1200, own_ratio=0.5)
+    own = sorted(state.guild.own)
+    min_id, max_id = own[99], own[400]
+    searches = record_searches(client)
+    messages = deleter.scan_messages(GUILD_ID, min_id=min_id, max_id=max_id)
+
+    # Both bounds are exclusive, as in the search API
+    assert sorted(msg.id for msg in messages) == own[100:400]
+    assert all(min_id <= (s['min_id'] or 0) and s['max_id'] <= max_id for s in searches)
+
+
+# --- Results shifting under the offset cursor ---
+
+def test_messages_deleted_during_paging_are_not_skipped(mock_discord, mock_token):
+    state, client, deleter = deleter_for(mock_discord, mock_token, messages=400, own_ratio=0.5)
+    own = sorted(state.guild.own, reverse=True)
+    # Removed from the not yet paged part of the results, which moves every later offset up
+    removed = own[100:103]
+
+    def delete_elsewhere(batch):
+        if removed[0] in state.guild.own:
+            for message_id in removed:
+                state.guild.remove(message_id)
+
+    messages = deleter.scan_messages(GUILD_ID, progress_callback=delete_elsewhere)
+    ids = [msg.id for msg in messages]
+    assert len(ids) == len(set(ids))
+    assert set(ids) == set(own) - set(removed)
+    assert deleter.last_scan_reanchors >= 1
+
+
+def test_messages_sent_during_paging_are_not_returned_twice(mock_discord, mock_token):
+    state, client, deleter = deleter_for(mock_discord, mock_token, messages=400, own_ratio=0.5)
+    own = set(state.guild.own)
+    sent = []
+
+    def send_more(batch):
+        # Newer than anything paged so far: every older hit moves down a place
+        if len(sent) < 3:
+            sent.append(state.guild.own[-1] + 1)
+            state.guild.own.append(sent[-1])
+
+    messages = deleter.scan_messages(GUILD_ID, progress_callback=send_more)
+    ids = [msg.id for msg in messages]
+    assert len(ids) == len(set(ids))
+    assert own <= set(ids) <= own | set(sent)
+    assert deleter.last_scan_reanchors >= 1
+
+
+def test_stable_results_never_reanchor(mock_discord, mock_token):
+    state, client, deleter = deleter_for(mock_discord, mock_token, messages=400, own_ratio=0.5)
+    deleter.scan_messages(GUILD_ID)
+    assert deleter.last_scan_reanchors == 0
+
+
+# --- DM scan source ---
+
+def test_mostly_own_dm_is_read_from_history(mock_discord, mock_token):
+    state, client, deleter = deleter_for(mock_discord, mock_token, messages=400, own_ratio=1.0)
+    messages = deleter.scan_messages(DM_CHANNEL_ID, is_dm=True)
+
+    assert deleter.last_scan_source == SOURCE_HISTORY
+    assert {msg.id for msg in messages} == set(state.dm.own)
+    # Two search probes, then 100 messages per history page
+    assert client.metrics.requests["GET /channels/{id}/messages/search"] == 2
+    assert client.metrics.requests["GET /channels/{id}/messages"] == 5
+
+
+def test_sparse_dm_is_searched(mock_discord, mock_token):
+    state, client, deleter = deleter_for(mock_discord, mock_token, messages=400, own_ratio=0.1)
+    messages = deleter.scan_messages(DM_CHANNEL_ID, is_dm=True)
+
+    assert deleter.last_scan_source == SOURCE_SEARCH
+    assert {msg.id for msg in messages} == set(state.dm.own)
+    assert client.metrics.requests["GET /channels/{id}/messages"] == 0
+
+
+def test_both_sources_find_the_same_messages(mock_discord, mock_token):
+    state, client, deleter = deleter_for(mock_discord, mock_token, messages=600, own_ratio=0.5)
+    own = sorted(state.dm.own)
+    bounds = dict(min_id=own[49], max_id=own[250])
+    for options in ({}, {'content_query': "secret"}, {'has': ['file']}, bounds):
+        found = {}
+        for source in (SOURCE_SEARCH, SOURCE_HISTORY):
+            found[source] = sorted(msg.id for msg in deleter.scan_messages(DM_CHANNEL_ID, is_dm=True, source=source,
+                                                                           **options))
+            assert deleter.last_scan_source == source
+        assert found[SOURCE_SEARCH] == found[SOURCE_HISTORY]
+        assert found[SOURCE_SEARCH]
+
+
+def test_servers_are_always_searched(mock_discord, mock_token):
+    state, client, deleter = deleter_for(mock_discord, mock_token, messages=200, own_ratio=1.0)
+    messages = deleter.scan_messages(GUILD_ID, source=SOURCE_HISTORY)
+    assert deleter.last_scan_source == SOURCE_SEARCH
+    assert {msg.id for msg in messages} == set(state.guild.own)
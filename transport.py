@@ -0,0 +1,138 @@
+"""
+HTTP transport of DiscordClient: a pooled requests.Session whose
+connections record their TCP/TLS setup time, or a ReplayAdapter serving a
+recorded cassette. Kept apart from api_client so requests/urllib3 are only
+imported once a client is created.
+"""
+
+import json
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl
+import requests
+from requests import RequestException, Timeout
+from requests import ConnectionError as RequestsConnectionError
+from requests.exceptions import ChunkedEncodingError
+from requests.adapters import HTTPAdapter, BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from retry import TIMEOUT, CONNECTION, OTHER
+
+# Connection setup time is measured per thread, since urllib3 opens sockets
+# lazily inside the pool and gives no other hook around the handshake.
+_timing_local = threading.local()
+
+
+class _ConnectTimerMixin:
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _timing_local.connect_time = getattr(_timing_local, 'connect_time', 0.0) + (time.perf_counter() - start)
+
+
+class _TimedHTTPConnection(_ConnectTimerMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_ConnectTimerMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connections record how long the TCP/TLS setup took.
+    """
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+def open_session(headers, pool_size=10):
+    """
+    Returns a keep-alive session with one connection pool for http and https.
+    """
+    session = requests.Session()
+    session.headers.update(headers)
+    adapter = PooledAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Transport adapter that answers every request from a
+    cassette.CassettePlayer instead of the network.
+    """
+    def __init__(self, player, base_url):
+        super().__init__()
+        self.player = player
+        self.base_path = urlsplit(base_url).path.rstrip('/')
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        url = urlsplit(request.url)
+        endpoint = url.path[len(self.base_path):] if url.path.startswith(self.base_path) else url.path
+        pairs = parse_qsl(url.query, keep_blank_values=True)
+        body = request.body
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        body = json.loads(body) if body else None
+
+        status, headers, text, delay, error = self.player.respond(request.method, endpoint, pairs, body)
+        if delay > 0:
+            time.sleep(delay)
+        if error:
+            exception = {TIMEOUT: Timeout, CONNECTION: RequestsConnectionError}.get(error, RequestException)
+            raise exception(f"Replayed {error} failure", request=request)
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = text.encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def mount_replay(session, player, base_url):
+    """
+    Routes every request of a session to a CassettePlayer.
+    """
+    adapter = ReplayAdapter(player, base_url)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def reset_connect_time():
+    _timing_local.connect_time = 0.0
+
+
+def connect_time():
+    """Connection setup time spent by this thread since reset_connect_time()."""
+    return getattr(_timing_local, 'connect_time', 0.0)
+
+
+def error_reason(exc):
+    """Failure kind (see retry.py) of a RequestException."""
+    # ConnectTimeout is both a Timeout and a ConnectionError: a timeout
+    if isinstance(exc, Timeout):
+        return TIMEOUT
+    if isinstance(exc, (RequestsConnectionError, ChunkedEncodingError)):
+        return CONNECTION
+    return OTHER
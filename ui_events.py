@@ -0,0 +1,71 @@
+import queue
+import time
+
+EVENT_ROWS = "rows"
+EVENT_PROGRESS = "progress"
+EVENT_CALL = "call"
+
+
+class UIEventQueue:
+    """
+    Thread-safe hand-off from worker threads to the Tk main loop.
+
+    Workers post events from any thread; the Tk side drains them on a timer
+    within a frame budget. Rows are appended in bulk and only the latest
+    value of each progress counter is delivered, so a fast worker cannot
+    flood the main loop with redraws.
+    """
+    def __init__(self, frame_budget_ms=8):
+        self.frame_budget = frame_budget_ms / 1000
+        self._queue = queue.SimpleQueue()
+
+    def post_rows(self, rows):
+        if rows:
+            self._queue.put((EVENT_ROWS, rows))
+
+    def post_progress(self, kind, *values):
+        self._queue.put((EVENT_PROGRESS, (kind, values)))
+
+    def post_call(self, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) on the Tk thread, in order with the other events."""
+        self._queue.put((EVENT_CALL, (fn, args, kwargs)))
+
+    def drain(self, on_rows, on_progress):
+        """
+        Processes queued events until the queue is empty or the frame budget
+        is used up. Rows are batched into one on_rows(list) call, progress
+        updates are coalesced to the latest per kind, and calls run in order
+        (pending rows/progress are flushed first so callbacks see them).
+        Returns the number of events processed.
+        """
+        deadline = time.perf_counter() + self.frame_budget
+        rows = []
+        progress = {}
+        processed = 0
+
+        def flush():
+            if rows:
+                on_rows(list(rows))
+                rows.clear()
+            for kind, values in progress.items():
+                on_progress(kind, *values)
+            progress.clear()
+
+        while time.perf_counter() < deadline:
+            try:
+                event, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            processed += 1
+            if event == EVENT_ROWS:
+                rows.extend(payload)
+            elif event == EVENT_PROGRESS:
+                kind, values = payload
+                progress[kind] = values
+            else:
+                flush()
+                fn, args, kwargs = payload
+                fn(*args, **kwargs)
+
+        flush()
+        return processed
@@ -1,30 +1,71 @@
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from datetime import datetime
-from colorama import Fore, Style, init
 
-# Initialize colorama
-init()
+_colorama = None
+
+def _paint(color, text):
+    """
+    Wraps text in a colorama color. colorama is imported and initialized
+    (it wraps stdout on Windows) on first use instead of at import time.
+    """
+    global _colorama
+    if _colorama is None:
+        import colorama
+        colorama.init()
+        _colorama = colorama
+    return f"{getattr(_colorama.Fore, color)}{text}{_colorama.Style.RESET_ALL}"
+
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+_listeners = []
+
+def _start_writer(handlers):
+    """
+    Returns a QueueHandler whose records are written by a background thread,
+    so a slow disk never blocks the caller. The writer is flushed at exit.
+    """
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    return QueueHandler(log_queue)
+
+@atexit.register
+def _stop_writers():
+    while _listeners:
+        _listeners.pop().stop()
+
+def _level_from_env(name, default):
+    value = os.environ.get(name, "").strip().upper()
+    return logging.getLevelName(value) if isinstance(logging.getLevelName(value), int) else default
 
 # Configure logging
-def setup_logging(log_file="discord_tool.log"):
+def setup_logging(log_file="discord_tool.log", level=None):
     """
     Sets up logging to both console and file.
+    The file is size-rotated and written from a background thread.
+    level defaults to $DISCORD_TOOL_LOG_LEVEL, else INFO.
     """
     logger = logging.getLogger("DiscordTool")
-    logger.setLevel(logging.INFO)
+    logger.setLevel(level or _level_from_env("DISCORD_TOOL_LOG_LEVEL", logging.INFO))
     
     # Check if handlers are already added to avoid duplicates
     if not logger.handlers:
         # File Handler
         try:
-            file_handler = logging.FileHandler(log_file, encoding='utf-8')
-            file_handler.setLevel(logging.INFO)
+            file_handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8')
             file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
             file_handler.setFormatter(file_formatter)
-            logger.addHandler(file_handler)
+            logger.addHandler(_start_writer([file_handler]))
         except Exception as e:
-            print(f"{Fore.RED}Error setting up log file: {e}{Style.RESET_ALL}")
+            print(_paint("RED", f"Error setting up log file: {e}"))
 
         # Console Handler (Cleaner output for CLI)
         console_handler = logging.StreamHandler(sys.stdout)
@@ -37,20 +78,82 @@ def setup_logging(log_file="discord_tool.log"):
 
 logger = setup_logging()
 
+
+class _AuditFormatter(logging.Formatter):
+    """One compact JSON object per line: ts, level, event and the event's fields."""
+    def format(self, record):
+        entry = {'ts': round(record.created, 3), 'level': record.levelname, 'event': record.getMessage()}
+        entry.update(getattr(record, 'fields', {}))
+        return json.dumps(entry, separators=(',', ':'))
+
+def setup_audit_log(log_file="discord_audit.log", level=None):
+    """
+    Per-message audit trail (deletes and their outcome), kept apart from the
+    human-readable log. Successes are INFO and failures WARNING, so WARNING
+    keeps only failures. level defaults to $DISCORD_TOOL_AUDIT_LEVEL, else INFO.
+    """
+    audit_logger = logging.getLogger("DiscordTool.audit")
+    audit_logger.setLevel(level or _level_from_env("DISCORD_TOOL_AUDIT_LEVEL", logging.INFO))
+    audit_logger.propagate = False
+    if not audit_logger.handlers:
+        try:
+            file_handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8')
+            file_handler.setFormatter(_AuditFormatter())
+            audit_logger.addHandler(_start_writer([file_handler]))
+        except Exception as e:
+            logger.error(f"Error setting up audit log: {e}")
+    return audit_logger
+
+audit_logger = setup_audit_log()
+
+def audit(event, level=logging.INFO, **fields):
+    """
+    Writes one audit record, e.g. audit("delete", id=..., channel=..., ok=True).
+    Nothing is built when the level is filtered out.
+    """
+    if audit_logger.isEnabledFor(level):
+        audit_logger.log(level, event, extra={'fields': fields})
+
+def set_log_levels(log_level=None, audit_level=None):
+    """
+    Changes the main and/or audit log level (names like "DEBUG" or numbers).
+    """
+    if log_level is not None:
+        logger.setLevel(log_level)
+    if audit_level is not None:
+        audit_logger.setLevel(audit_level)
+
+_quiet = False
+
+def set_quiet(quiet=True):
+    """
+    Quiet mode for headless runs: the print_* helpers only log to the file,
+    and console log output moves to stderr so stdout stays machine-readable.
+    """
+    global _quiet
+    _quiet = quiet
+    for handler in logger.handlers:
+        if type(handler) is logging.StreamHandler:
+            handler.setStream(sys.stderr if quiet else sys.stdout)
+
 def print_info(message):
-    print(f"{Fore.CYAN}[INFO]{Style.RESET_ALL} {message}")
+    if not _quiet:
+        print(f"{_paint('CYAN', '[INFO]')} {message}")
     logger.info(message)
 
 def print_success(message):
-    print(f"{Fore.GREEN}[SUCCESS]{Style.RESET_ALL} {message}")
+    if not _quiet:
+        print(f"{_paint('GREEN', '[SUCCESS]')} {message}")
     logger.info(message)
 
 def print_warning(message):
-    print(f"{Fore.YELLOW}[WARNING]{Style.RESET_ALL} {message}")
+    if not _quiet:
+        print(f"{_paint('YELLOW', '[WARNING]')} {message}")
     logger.warning(message)
 
 def print_error(message):
-    print(f"{Fore.RED}[ERROR]{Style.RESET_ALL} {message}")
+    if not _quiet:
+        print(f"{_paint('RED', '[ERROR]')} {message}")
     logger.error(message)
 
 def parse_date(date_str):
@@ -64,11 +167,32 @@ def parse_date(date_str):
     except Exception:
         return None
 
+DISCORD_EPOCH = 1420070400000  # ms, first second of 2015
+
 def get_snowflake_time(snowflake):
     """
     Converts a Discord snowflake ID to a datetime object.
     """
     if snowflake is None:
         return None
-    timestamp = ((int(snowflake) >> 22) + 1420070400000) / 1000
+    timestamp = ((int(snowflake) >> 22) + DISCORD_EPOCH) / 1000
     return datetime.fromtimestamp(timestamp)
+
+def datetime_to_snowflake(dt):
+    """
+    Converts a datetime to the lowest snowflake ID created at that moment.
+    Useful as a min_id/max_id bound for search.
+    """
+    if dt is None:
+        return None
+    ms = int(dt.timestamp() * 1000) - DISCORD_EPOCH
+    return max(ms, 0) << 22
+
+def date_bounds(after=None, before=None):
+    """
+    Converts an after/before datetime pair into the exclusive (min_id, max_id)
+    search bounds. Either side may be None.
+    """
+    min_id = datetime_to_snowflake(after) - 1 if after else None
+    max_id = datetime_to_snowflake(before) if before else None
+    return (min_id if min_id and min_id > 0 else None), max_id